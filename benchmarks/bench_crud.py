@@ -0,0 +1,167 @@
+"""Microbenchmarks for crud and the screen helpers on synthetic stores.
+
+Every benchmark runs against a store built by ``benchmarks.generate`` and
+reports the best wall time over a few repeats plus the peak memory of one
+extra run traced with ``tracemalloc``.
+
+    python -m benchmarks.bench_crud --sizes 100 1000 10000
+    python -m benchmarks.bench_crud --sizes 1000000 --benchmarks load_data save_data
+    python -m benchmarks.bench_crud --check
+    python -m benchmarks.bench_crud --output results.json
+
+``--check`` compares against the committed baseline in
+benchmarks/baselines/crud.json and exits with 1 on regressions. Times are
+compared as ``relative_time``, a multiple of a calibration loop run on the
+same machine, so the baseline holds on other machines too. Rewrite it with
+``--save-baseline benchmarks/baselines/crud.json`` after intended changes.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+
+from benchmarks.common import calibrate, compare, load_baseline, save_baseline
+from benchmarks.generate import generate_store
+from twd import crud, here, screen
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines", "crud.json")
+DEFAULT_SIZES = [100, 1000, 10000]
+
+
+def bench_load_data(config, data):
+    return lambda: crud.load_data(config)
+
+
+def bench_save_data(config, data):
+    return lambda: crud.save_data(config, data)
+
+
+def bench_create_entry(config, data):
+    counter = iter(range(10 ** 9))
+    return lambda: crud.create_entry(config, data, f"/bench/new/{next(counter)}", "bench-new")
+
+
+def bench_delete_entry(config, data):
+    victims = list(data)
+    return lambda: crud.delete_entry(config, data, victims.pop())
+
+
+def bench_update_entry(config, data):
+    entry_id = next(iter(data))
+    entry = dict(data[entry_id], alias="bench-renamed")
+    return lambda: crud.update_entry(config, data, entry_id, entry)
+
+
+def bench_here(config, data):
+    # The deepest saved directory above a path a few levels below an entry
+    path = os.path.join(next(iter(data.values()))["path"], "a", "b", "c")
+    return lambda: here.here(config, path)
+
+
+def bench_sort_entries(config, data):
+    return lambda: screen.sort_entries(data, "path", False)
+
+
+def bench_filter_dirs_by_search(config, data):
+    def run():
+        # A first keystroke on a fresh screen, including the index build
+        screen.DIRS = data
+        screen.STORE_CONFIG = config
+        screen.filtered_DIRS = data
+        screen.QUERY_INDEX = None
+        screen.last_query = ""
+        screen.filter_dirs_by_search("atlas")
+
+    return run
+
+
+def bench_shorten_path(config, data):
+    paths = [entry["path"] for entry in data.values()]
+    return lambda: [screen.shorten_path(path, 1) for path in paths]
+
+
+BENCHMARKS = {
+    name[len("bench_"):]: func
+    for name, func in sorted(globals().items())
+    if name.startswith("bench_")
+}
+
+
+def run_benchmark(name, size, repeat, unit):
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {"data_file": os.path.join(tmp, "data")}
+        data = generate_store(size)
+        crud.ensure_data_file_exists(config)
+        crud.save_data(config, data)
+        func = BENCHMARKS[name](config, data)
+
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return {"time": min(times), "relative_time": min(times) / unit, "peak_memory": peak}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TWD crud operations.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--benchmarks", nargs="+", choices=sorted(BENCHMARKS), default=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the best is kept")
+    parser.add_argument("--output", help="Write all results with run metadata to this JSON file")
+    parser.add_argument("--check", action="store_true", help="Compare against the committed baseline")
+    parser.add_argument("--baseline", help="Compare against this baseline JSON file")
+    parser.add_argument("--save-baseline", help="Write the results to this baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Allowed slowdown factor")
+    args = parser.parse_args(argv)
+
+    unit = calibrate()
+    results = {}
+    for size in args.sizes:
+        for name in args.benchmarks:
+            key = f"{name}/{size}"
+            results[key] = run_benchmark(name, size, args.repeat, unit)
+            print(json.dumps({"benchmark": key, **results[key]}), flush=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "timestamp": time.time(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "calibration": unit,
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+
+    baseline_file = args.baseline or (BASELINE_FILE if args.check else None)
+    if baseline_file:
+        regressions = compare(
+            results, load_baseline(baseline_file), args.tolerance, ("relative_time", "peak_memory")
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Frame-time benchmark for the TWD selection screen.
+
+Runs scripted sessions (scrolling, searching, sort toggles and deletes)
+against the headless screen from ``tests.tui_harness`` and reports per-frame
+wall time, curses calls and peak allocations for each store size.
+
+    python -m benchmarks.bench_tui --sizes 100 1000 10000
+    python -m benchmarks.bench_tui --save-baseline tui_baseline.json
+    python -m benchmarks.bench_tui --baseline tui_baseline.json
+
+With ``--baseline`` the exit status is 1 if any scenario got slower or made
+more curses calls than the baseline allows, so it can be used as a gate.
+Compare runs made with the same flags, tracemalloc slows every frame down.
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+from benchmarks.common import compare, load_baseline, save_baseline
+from tests.tui_harness import run_screen, script_keys, make_dirs, summarize
+
+SCENARIOS = {
+    "scroll": script_keys("j" * 50, "k" * 20),
+    "search": script_keys("s", "alias12", [127] * 7, "\n"),
+    "sort": script_keys("oooo", "ll"),
+    "delete": script_keys("d\n" * 5),
+}
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+def run_scenario(name, size, measure_memory=True):
+    dirs = make_dirs(size)
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {"data_file": os.path.join(tmp, "data"), "show_preview": False}
+        with open(config["data_file"], "w") as f:
+            json.dump(dirs, f)
+        _, stdscr = run_screen(config, dirs, list(SCENARIOS[name]), measure_memory=measure_memory)
+    return summarize(stdscr.frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TWD screen frame times.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc, it slows frames down")
+    parser.add_argument("--baseline", help="Compare against this baseline JSON file")
+    parser.add_argument("--save-baseline", help="Write the results to this baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown factor")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        for name in args.scenarios:
+            key = f"{name}/{size}"
+            results[key] = run_scenario(name, size, not args.no_memory)
+            print(json.dumps({"benchmark": key, **results[key]}), flush=True)
+
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+
+    if args.baseline:
+        regressions = compare(
+            results, load_baseline(args.baseline), args.tolerance,
+            ("mean_time", "p95_time", "mean_calls"),
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Helpers shared by the benchmark scripts."""
+
+import json
+import time
+
+
+def compare(results, baseline, tolerance, metrics):
+    """Return a list of human readable regressions against the baseline.
+
+    A metric regresses if it is more than tolerance times its baseline
+    value. Benchmarks missing from the baseline are ignored.
+    """
+    regressions = []
+    for key, summary in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        for metric in metrics:
+            if base.get(metric) and summary[metric] > base[metric] * tolerance:
+                regressions.append(
+                    f"{key}: {metric} {summary[metric]:.6g} > {base[metric]:.6g} x {tolerance}"
+                )
+    return regressions
+
+
+def calibrate(repeat=5):
+    """Return the best time of a fixed workload, the unit of machine-independent timings.
+
+    It does what most benchmarks spend their time on (building, sorting
+    and serializing small dicts), so dividing a timing by it cancels out
+    most of the difference between machines.
+    """
+    rows = [{"id": f"{i:012x}", "alias": f"alias{i % 997}", "created_at": float(i)} for i in range(20000)]
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = json.dumps(sorted(rows, key=lambda row: (row["alias"], row["id"])))
+        json.loads(text)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,81 @@
+"""Deterministic generator for synthetic TWD data files.
+
+Builds stores of any size with realistic paths: a handful of home
+directories, shared organisation and project prefixes, and a varying number
+of nested components below each project. About one in ten aliases repeats
+an existing alias, as happens when the same project name is saved in
+different checkouts.
+
+    python -m benchmarks.generate 100000 /tmp/twd-data --seed 1
+"""
+
+import sys
+import json
+import random
+import argparse
+
+USERS = ["alice", "bob", "carol", "dave", "erin"]
+TOP_DIRS = ["src", "work", "code", "projects"]
+COMPONENTS = [
+    "api", "app", "backend", "build", "cli", "client", "core", "deploy", "docs",
+    "frontend", "infra", "lib", "scripts", "server", "services", "shared", "src",
+    "terraform", "tests", "tools", "ui", "web", "worker",
+]
+WORDS = [
+    "atlas", "beacon", "cinder", "delta", "ember", "falcon", "granite", "harbor",
+    "iris", "juniper", "kestrel", "lumen", "meridian", "nimbus", "orchid", "pioneer",
+    "quartz", "raven", "summit", "tundra", "umber", "vertex", "willow", "zephyr",
+]
+
+
+def generate_store(count, seed=0, start_time=1600000000.0):
+    """Return a data dict with count entries, identical for identical seeds."""
+    rng = random.Random(seed)
+    orgs = [f"{rng.choice(WORDS)}-{i}" for i in range(max(count // 500, 4))]
+    projects = [
+        f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i}" for i in range(max(count // 20, 8))
+    ]
+
+    data = {}
+    aliases = []
+    created_at = start_time
+    while len(data) < count:
+        entry_id = "%012x" % rng.getrandbits(48)
+        if entry_id in data:
+            continue
+        project = rng.choice(projects)
+        parts = [
+            "home",
+            rng.choice(USERS),
+            rng.choice(TOP_DIRS),
+            rng.choice(orgs),
+            project,
+        ]
+        parts += rng.sample(COMPONENTS, rng.randint(0, 4))
+        if aliases and rng.random() < 0.1:
+            alias = rng.choice(aliases)
+        else:
+            alias = f"{project}-{len(aliases)}" if parts[5:] else project
+            aliases.append(alias)
+        created_at += rng.uniform(1, 3600)
+        data[entry_id] = {
+            "path": "/" + "/".join(parts),
+            "alias": alias,
+            "created_at": created_at,
+        }
+    return data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic TWD data file.")
+    parser.add_argument("count", type=int, help="Number of entries")
+    parser.add_argument("output", help="Data file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    with open(args.output, "w") as f:
+        json.dump(generate_store(args.count, args.seed), f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
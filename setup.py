@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="twd_m4sc0",
     version="2.0.3",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
     entry_points={
         "console_scripts": [
             "twd=twd.twd:main",
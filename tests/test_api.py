@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from twd import crud
+from twd.api import Store, read_config
+
+
+class TestStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        self.config = {"data_file": os.path.join(self.root, "twd", "data")}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reading_creates_no_files(self):
+        store = Store(self.config)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.search("alias:web*"), [])
+        self.assertEqual(read_config(os.path.join(self.root, "config")), {})
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_loads_are_cached_until_the_file_changes(self):
+        Store(self.config).add(self.root, "root")
+        store = Store(self.config)
+        with mock.patch("twd.crud.load_data", wraps=crud.load_data) as load_data:
+            for _ in range(3):
+                store.resolve("root")
+            self.assertEqual(load_data.call_count, 1)
+            Store(self.config).add(os.path.join(self.root, "twd"), "other")
+            self.assertIn("other", [entry["alias"] for entry in store.values()])
+            self.assertEqual(load_data.call_count, 3)  # Once more for each store
+
+    def test_batch_saves_once(self):
+        store = Store(self.config)
+        with mock.patch("twd.crud.save_data", wraps=crud.save_data) as save_data:
+            with store.batch():
+                web_id, status = store.add(self.root, "web")
+                store.add(os.path.join(self.root, "twd"), "webapp")
+                store.rename("webapp", "api")
+                self.assertEqual(store.uncommitted, 2)
+            self.assertEqual(save_data.call_count, 1)
+        self.assertEqual(status, "created")
+        self.assertEqual(store.add(self.root)[1], "unchanged")
+        self.assertEqual(sorted(entry["alias"] for entry in crud.load_data(self.config).values()), ["api", "web"])
+
+    def test_resolve(self):
+        store = Store(self.config)
+        with store.batch():
+            web_id, _ = store.add(self.root, "web")
+            store.add(os.path.join(self.root, "twd"), "webapp")
+        self.assertEqual(store.resolve("web"), web_id)  # An exact alias wins over prefixes
+        self.assertEqual(store.resolve(web_id[:6]), web_id)
+        self.assertEqual(len(store.matches("we")), 2)
+        with self.assertRaises(KeyError):
+            store.resolve("we")
+        store.remove("web")
+        with self.assertRaises(KeyError):
+            store.resolve(web_id)
+        store.rename("webapp", "api")
+        self.assertEqual(store.matches("we"), [])
+        self.assertEqual(len(store.matches("ap")), 1)
+        with self.assertRaises(ValueError):
+            store.add(self.root, "no spaces")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from twd import crud
+from twd.batch import parse_command, run_batch
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        self.config = {"data_file": os.path.join(self.root, "data")}
+        crud.ensure_data_file_exists(self.config)
+        for name in ("a", "b", "c"):
+            os.mkdir(os.path.join(self.root, name))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_lines(self, lines, **kwargs):
+        out = io.StringIO()
+        with mock.patch("twd.crud.save_data", wraps=crud.save_data) as save_data:
+            failed = run_batch(self.config, lines, out, **kwargs)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        return failed, results, save_data.call_count
+
+    def test_parse_command_forms(self):
+        self.assertEqual(parse_command("save '/srv/my dir' web"), {"op": "save", "path": "/srv/my dir", "alias": "web"})
+        self.assertEqual(parse_command('{"op": "go", "ref": "web"}'), {"op": "go", "ref": "web"})
+        self.assertEqual(parse_command("list under:/srv alias:w*"), {"op": "list", "query": "under:/srv alias:w*"})
+        self.assertIsNone(parse_command("  # comment"))
+        with self.assertRaises(ValueError):
+            parse_command("rename a b c")
+
+    def test_commands_share_one_load_and_one_save(self):
+        a, b = os.path.join(self.root, "a"), os.path.join(self.root, "b")
+        failed, results, saves = self.run_lines([
+            f"save {a} alpha",
+            json.dumps({"op": "save", "path": b, "alias": "beta"}),
+            "go alp",
+            "rename beta gamma",
+            "delete missing",
+            f"save {a}",
+        ])
+        self.assertEqual(failed, 1)
+        self.assertEqual(saves, 1)
+        self.assertEqual([result["ok"] for result in results], [True, True, True, True, False, True, True])
+        self.assertEqual(results[2]["path"], a)
+        self.assertEqual(results[5]["status"], "unchanged")
+        self.assertEqual(results[-1], {"op": "commit", "ok": True, "ns": "default", "changes": 2})
+        data = crud.load_data(self.config)
+        self.assertEqual(sorted(entry["alias"] for entry in data.values()), ["alpha", "gamma"])
+
+    def test_commit_every(self):
+        lines = [f"save {os.path.join(self.root, name)} {name}" for name in ("a", "b", "c")]
+        failed, results, saves = self.run_lines(lines, commit_every=2)
+        self.assertEqual(failed, 0)
+        self.assertEqual(saves, 2)
+        self.assertEqual([result["op"] for result in results], ["save", "save", "commit", "save", "commit"])
+
+    def test_namespaces_are_committed_separately(self):
+        a = os.path.join(self.root, "a")
+        _, results, _ = self.run_lines([f"save {a} work:alpha", "list"], namespace="home")
+        self.assertEqual(results[1]["entries"], [])
+        self.assertEqual([result["ns"] for result in results[2:]], ["work"])
+        work = crud.load_data(crud.namespace_config(self.config, "work"))
+        self.assertEqual([entry["alias"] for entry in work.values()], ["alpha"])
+
+
+if __name__ == "__main__":
+    unittest.main()
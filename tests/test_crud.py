@@ -0,0 +1,101 @@
+import os
+import time
+import tempfile
+import unittest
+
+from twd import crud
+
+
+class TestCrud(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {"data_file": os.path.join(self.tmp.name, "data")}
+        crud.ensure_data_file_exists(self.config)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_completion_cache_follows_writes(self):
+        data = crud.load_data(self.config)
+        project_id = crud.create_entry(self.config, data, "/srv/project", "project")
+        crud.create_entry(self.config, data, "/srv/proxy", "proxy")
+        crud.create_entry(self.config, data, "/srv/other")
+        self.assertEqual(crud.complete(self.config, "pro"), ["project", "proxy"])
+        self.assertEqual(crud.complete(self.config, project_id[:6]), [project_id])
+
+        crud.delete_entry(self.config, data, project_id)
+        self.assertEqual(crud.complete(self.config, "pro"), ["proxy"])
+        self.assertNotIn("no_alias", crud.complete(self.config, ""))
+
+    def test_completion_cache_rebuilt_when_missing(self):
+        data = crud.load_data(self.config)
+        crud.create_entry(self.config, data, "/srv/project", "project")
+        os.remove(crud.get_index_file(self.config, "completion"))
+        self.assertEqual(crud.complete(self.config, "p"), ["project"])
+
+    def test_iter_entries_limit_matches_full_sort(self):
+        data = {
+            f"{i:012x}": {"path": f"/p/{i % 7}", "alias": f"a{(i * 37) % 100}", "created_at": (i * 13) % 50}
+            for i in range(100)
+        }
+        for criteria in crud.SORT_KEYS:
+            for descending in (False, True):
+                full = list(crud.iter_entries(data, criteria, descending))
+                limited = list(crud.iter_entries(data, criteria, descending, limit=10))
+                key = crud.SORT_KEYS[criteria]
+                self.assertEqual([key(item) for item in limited], [key(item) for item in full[:10]])
+        self.assertEqual(len(list(crud.iter_entries(data, limit=5))), 5)
+
+    def test_namespaces_are_sharded(self):
+        work = crud.namespace_config(self.config, "work")
+        crud.create_entry(work, crud.load_data(work), "/srv/work", "w")
+        crud.create_entry(self.config, crud.load_data(self.config), "/home", "h")
+        self.assertTrue(os.path.exists(crud.get_data_file(work)))
+        self.assertEqual([e["alias"] for e in crud.load_data(work).values()], ["w"])
+        self.assertEqual([e["alias"] for e in crud.load_data(self.config).values()], ["h"])
+
+        manifest = crud.load_manifest(self.config)
+        self.assertEqual(sorted(manifest), ["default", "work"])
+        self.assertEqual(manifest["work"]["entries"], 1)
+        self.assertEqual(manifest["work"]["file"], crud.get_data_file(work))
+
+    def test_save_skips_unneeded_sidecars(self):
+        data = crud.load_data(self.config)
+        crud.create_entry(self.config, data, "/srv/project", "project")
+        for name in ("namespaces", "expiry"):
+            self.assertFalse(os.path.exists(crud.get_index_file(self.config, name)), name)
+
+        work = crud.namespace_config(self.config, "work")
+        crud.create_entry(work, crud.load_data(work), "/srv/work", "w")
+        manifest_file = crud.get_manifest_file(self.config)
+        before = os.stat(manifest_file).st_mtime_ns
+        time.sleep(0.01)
+        data = crud.load_data(work)
+        work_id = next(iter(data))
+        crud.update_entry(work, data, work_id, dict(data[work_id], alias="renamed"))
+        self.assertEqual(os.stat(manifest_file).st_mtime_ns, before)
+
+    def test_dedupe_keeps_oldest_entry_with_latest_alias(self):
+        target = os.path.join(self.tmp.name, "target")
+        link = os.path.join(self.tmp.name, "link")
+        os.mkdir(target)
+        os.symlink(target, link)
+        data = {
+            "aaaaaaaaaaaa": {"path": link, "alias": "old", "created_at": 1},
+            "bbbbbbbbbbbb": {"path": target, "alias": "new", "created_at": 2},
+            "cccccccccccc": {"path": target, "alias": "no_alias", "created_at": 3},
+            "dddddddddddd": {"path": "/elsewhere", "alias": "other", "created_at": 4},
+        }
+        crud.save_data(self.config, data)
+        crud.update_tags(self.config, "aaaaaaaaaaaa", add=["infra"])
+        crud.update_tags(self.config, "cccccccccccc", add=["prod"])
+        self.assertEqual(crud.dedupe_entries(self.config, crud.load_data(self.config)), 2)
+        self.assertEqual(crud.load_tags(self.config).by_entry(), {"aaaaaaaaaaaa": ["infra", "prod"]})
+        data = crud.load_data(self.config)
+        self.assertEqual(sorted(data), ["aaaaaaaaaaaa", "dddddddddddd"])
+        self.assertEqual(data["aaaaaaaaaaaa"]["alias"], "new")
+        self.assertEqual(data["aaaaaaaaaaaa"]["path"], os.path.realpath(target))
+
+
+if __name__ == "__main__":
+    unittest.main()
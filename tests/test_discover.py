@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from twd import crud, discover
+
+
+class TestDiscover(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(os.path.realpath(self.tmp.name), "src")
+        self.config = {"data_file": os.path.join(self.tmp.name, "data")}
+        for path, marker in [
+            ("app", ".git"),
+            ("libs/core", "pyproject.toml"),
+            ("libs/core/vendor/inner", "package.json"),
+            ("web/node_modules/left-pad", "package.json"),
+            ("other/app", "go.mod"),
+            ("a/b/c/d/deep", "Cargo.toml"),
+        ]:
+            os.makedirs(os.path.join(self.root, path), exist_ok=True)
+            marker_path = os.path.join(self.root, path, marker)
+            if marker == ".git":
+                os.mkdir(marker_path)
+            else:
+                open(marker_path, "w").close()
+        os.symlink(self.root, os.path.join(self.root, "libs", "loop"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, relative):
+        return os.path.join(self.root, relative)
+
+    def test_walk_finds_project_roots(self):
+        found, _ = discover.walk([self.root], workers=4)
+        self.assertEqual(
+            found,
+            sorted(self.path(p) for p in ["app", "libs/core", "other/app", "a/b/c/d/deep"]),
+        )
+
+    def test_depth_and_ignore(self):
+        found, _ = discover.walk([self.root], max_depth=2, ignore=discover.DEFAULT_IGNORE + ["other"])
+        self.assertEqual(found, [self.path("app"), self.path("libs/core")])
+
+    def test_rerun_only_lists_changed_directories(self):
+        _, cache = discover.walk([self.root])
+        os.makedirs(self.path("libs/new"))
+        open(self.path("libs/new/setup.py"), "w").close()
+        with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+            found, _ = discover.walk([self.root], cache=cache)
+        self.assertIn(self.path("libs/new"), found)
+        self.assertEqual(
+            sorted(call.args[0] for call in scandir.call_args_list),
+            [self.path("libs"), self.path("libs/new")],
+        )
+
+    def test_discover_saves_once_with_unique_aliases(self):
+        crud.ensure_data_file_exists(self.config)
+        crud.create_entry(self.config, crud.load_data(self.config), self.path("app"), "app")
+        with mock.patch("twd.crud.save_data", wraps=crud.save_data) as save_data:
+            found, added = discover.discover(self.config, [self.root])
+        self.assertEqual(found, 4)
+        self.assertEqual(save_data.call_count, 1)
+        self.assertEqual(
+            sorted((alias, path) for _, alias, path in added),
+            [("app-2", self.path("other/app")), ("core", self.path("libs/core")), ("deep", self.path("a/b/c/d/deep"))],
+        )
+        self.assertEqual(len(crud.load_data(self.config)), 4)
+        self.assertEqual(discover.discover(self.config, [self.root]), (4, []))
+
+    def test_merge_cache_drops_removed_directories(self):
+        cache = {"/r": [1, False, ["a", "b"]], "/r/a": [1, False, ["x"]], "/r/a/x": [1, False, []], "/r/b": [1, False, []]}
+        merged = discover.merge_cache(cache, {"/r": [2, False, ["b"]]})
+        self.assertEqual(sorted(merged), ["/r", "/r/b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
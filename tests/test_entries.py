@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+from twd import crud
+from twd.entries import Entry, EntryView, entry_hook
+
+
+class TestEntry(unittest.TestCase):
+    def test_reads_like_a_dict(self):
+        entry = Entry("/srv", "web", 1.5)
+        self.assertEqual(entry, {"path": "/srv", "alias": "web", "created_at": 1.5})
+        self.assertEqual(entry["alias"], "web")
+        self.assertIsNone(entry.get("missing"))
+        self.assertEqual(dict(entry, alias="api")["alias"], "api")
+        self.assertEqual(entry.replace(alias="api"), Entry("/srv", "api", 1.5))
+
+    def test_extra_fields_round_trip(self):
+        raw = {"path": "/srv", "alias": "web", "created_at": 1.0, "tags": ["x"]}
+        entry = json.loads(json.dumps(raw), object_hook=entry_hook)
+        self.assertIsInstance(entry, Entry)
+        self.assertEqual(entry["tags"], ["x"])
+        self.assertEqual(json.loads(json.dumps(entry, default=dict)), raw)
+
+    def test_aliases_are_interned(self):
+        first = Entry("/a", "".join(["no_", "alias"]), 0)
+        second = Entry("/b", "".join(["no", "_alias"]), 0)
+        self.assertIs(first.alias, second.alias)
+
+    def test_smaller_than_dict(self):
+        entry = Entry("/srv", "web", 1.5)
+        self.assertLess(sys.getsizeof(entry), sys.getsizeof(dict(entry)))
+
+
+class TestEntryView(unittest.TestCase):
+    def setUp(self):
+        self.store = {str(i): Entry(f"/p{i}", f"a{i}", i) for i in range(5)}
+
+    def test_view_selects_without_copying(self):
+        view = EntryView(self.store, ["3", "1"])
+        self.assertEqual(list(view), ["3", "1"])
+        self.assertIs(view["3"], self.store["3"])
+        self.assertNotIn("2", view)
+        with self.assertRaises(KeyError):
+            view["2"]
+        self.assertEqual(view.id_at(1), "1")
+
+    def test_delete_only_touches_view(self):
+        view = EntryView(EntryView(self.store), ["0", "4"])
+        self.assertIs(view.store, self.store)
+        del view["0"]
+        self.assertEqual(list(view), ["4"])
+        self.assertIn("0", self.store)
+
+
+class TestCrudEntries(unittest.TestCase):
+    def test_load_data_returns_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"data_file": os.path.join(tmp, "data")}
+            crud.ensure_data_file_exists(config)
+            data = crud.load_data(config)
+            entry_id = crud.create_entry(config, data, "/srv", "web")
+            crud.update_entry(config, data, entry_id, dict(data[entry_id], alias="api"))
+            loaded = crud.load_data(config)
+            self.assertIsInstance(loaded[entry_id], Entry)
+            self.assertEqual(loaded[entry_id]["alias"], "api")
+
+
+if __name__ == "__main__":
+    unittest.main()
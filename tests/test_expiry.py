@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from twd import api, crud, expiry
+from twd.query import parse_duration
+
+
+class TestExpiry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {"data_file": os.path.join(self.tmp.name, "data")}
+        self.store = api.Store(self.config)
+        self.temporary, _ = self.store.add(self.tmp.name, "temp", ttl=60)
+        self.permanent, _ = self.store.add("/", "root")
+        self.now = self.store[self.temporary]["created_at"]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sweep_removes_only_expired_entries_in_one_save(self):
+        self.assertEqual(expiry.sweep(self.config, now=self.now + 30), [])
+        with mock.patch("twd.crud.save_data", wraps=crud.save_data) as save_data:
+            self.assertEqual(expiry.sweep(self.config, now=self.now + 61), [self.temporary])
+        self.assertEqual(save_data.call_count, 1)
+        self.assertEqual(list(crud.load_data(self.config)), [self.permanent])
+        self.assertEqual(expiry.load_deadlines(self.config), [])
+
+    def test_renewed_entry_is_kept(self):
+        api.Store(self.config).add(self.tmp.name, ttl=3600)
+        self.assertEqual(expiry.sweep(self.config, now=self.now + 61), [])
+        self.assertIn(self.temporary, crud.load_data(self.config))
+        self.assertEqual(api.Store(self.config).add(self.tmp.name, ttl=0)[1], "renewed")
+        self.assertNotIn("expires_at", crud.load_data(self.config)[self.temporary])
+        self.assertEqual(expiry.load_deadlines(self.config), [])
+
+    def test_store_ignores_expired_entries_without_writing(self):
+        with mock.patch("time.time", return_value=self.now + 61):
+            with mock.patch("twd.crud.save_data") as save_data:
+                store = api.Store(self.config)
+                self.assertEqual(list(store), [self.permanent])
+                with self.assertRaises(KeyError):
+                    store.resolve("temp")
+        save_data.assert_not_called()
+        self.assertIn(self.temporary, crud.load_data(self.config))
+
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("90"), 90)
+        self.assertEqual(parse_duration("30m"), 1800)
+        self.assertEqual(parse_duration("2h"), 7200)
+        self.assertEqual(parse_duration("1w"), 7 * 86400)
+        for value in ("-5", "soon", "2y"):
+            with self.assertRaises(ValueError):
+                parse_duration(value)
+
+    def test_here_sweeps_expired_entries(self):
+        from twd.here import here
+        self.assertEqual(here(self.config, self.tmp.name), "temp")
+        with mock.patch("time.time", return_value=self.now + 61):
+            self.assertEqual(here(self.config, self.tmp.name), "root")
+            self.assertEqual(crud.complete(self.config, "te"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
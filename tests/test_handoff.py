@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@unittest.skipIf(shutil.which("bash") is None, "bash is required")
+class TestShellHandoff(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.home = os.path.join(self.tmp.name, "home")
+        self.scratch = os.path.join(self.tmp.name, "scratch")
+        os.makedirs(os.path.join(self.home, ".twd"))
+        os.makedirs(self.scratch)
+        self.env = dict(
+            os.environ,
+            HOME=self.home,
+            TMPDIR=self.scratch,
+            PYTHONPATH=REPO_ROOT,
+            PATH=os.path.dirname(sys.executable) + os.pathsep + os.environ.get("PATH", ""),
+        )
+        self.function = subprocess.run(
+            [sys.executable, "-m", "twd", "--shell", "twd"],
+            env=self.env, capture_output=True, text=True, check=True,
+        ).stdout
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def jump(self, alias):
+        script = f'eval "$TWD_FUNCTION"; cd /; twd {alias} >/dev/null; pwd'
+        env = dict(self.env, TWD_FUNCTION=self.function)
+        return subprocess.Popen(["bash", "-c", script], env=env, stdout=subprocess.PIPE, text=True)
+
+    def test_parallel_jumps(self):
+        targets = {}
+        data = {}
+        for i in range(24):
+            target = os.path.join(self.tmp.name, f"target{i}")
+            os.makedirs(target)
+            targets[f"jump{i:02d}"] = target
+            data[f"{i:012x}"] = {"path": target, "alias": f"jump{i:02d}", "created_at": 0}
+        with open(os.path.join(self.home, ".twd", "data"), "w") as f:
+            json.dump(data, f)
+
+        for _ in range(2):
+            processes = {alias: self.jump(alias) for alias in targets}
+            for alias, process in processes.items():
+                out, _ = process.communicate(timeout=60)
+                self.assertEqual(out.strip(), targets[alias])
+
+        # Nothing should have gone through the shared temp directory
+        self.assertEqual(os.listdir(self.scratch), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from twd import crud
+from twd.here import find_line, here
+
+
+class TestHere(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.tmp.name)
+        self.config = {"data_file": os.path.join(self.root, "data")}
+        crud.ensure_data_file_exists(self.config)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_line_bisects_sorted_lines(self):
+        paths = sorted(f"/srv/p{i}".encode() for i in range(50)) + [b"/srv/p9/x", b"/srv/p9 x"]
+        index = b"".join(path + b"\t" + path[5:] + b"\n" for path in sorted(paths))
+        for path in paths:
+            self.assertEqual(find_line(index, path), path[5:].decode())
+        for missing in (b"/", b"/srv/p", b"/srv/p99", b"/zzz"):
+            self.assertIsNone(find_line(index, missing))
+        self.assertIsNone(find_line(b"", b"/srv"))
+
+    def test_deepest_bookmark_wins(self):
+        data = crud.load_data(self.config)
+        crud.create_entry(self.config, data, os.path.join(self.root, "src"), "src")
+        crud.create_entry(self.config, data, os.path.join(self.root, "src", "api"), "api")
+        self.assertEqual(here(self.config, os.path.join(self.root, "src", "api", "pkg")), "api")
+        self.assertEqual(here(self.config, os.path.join(self.root, "src", "apix")), "src")
+        self.assertIsNone(here(self.config, self.root))
+
+    def test_index_follows_writes(self):
+        data = crud.load_data(self.config)
+        entry_id = crud.create_entry(self.config, data, os.path.join(self.root, "src"))
+        self.assertEqual(here(self.config, os.path.join(self.root, "src")), entry_id)
+        crud.delete_entry(self.config, data, entry_id)
+        self.assertIsNone(here(self.config, os.path.join(self.root, "src")))
+
+    def test_stale_index_is_rebuilt(self):
+        data = crud.load_data(self.config)
+        crud.create_entry(self.config, data, os.path.join(self.root, "src"), "src")
+        os.remove(crud.get_index_file(self.config, "here"))
+        self.assertEqual(here(self.config, os.path.join(self.root, "src")), "src")
+
+    def test_deleted_data_file_has_no_bookmarks(self):
+        data = crud.load_data(self.config)
+        entry_id = crud.create_entry(self.config, data, os.path.join(self.root, "src"), "src", tags=["infra"])
+        for name in ("history", "discover"):
+            open(crud.get_index_file(self.config, name), "w").close()
+        crud.delete_data_file(self.config)
+        self.assertIsNone(here(self.config, os.path.join(self.root, "src")))
+        for name in crud.INDEX_NAMES:
+            self.assertFalse(os.path.exists(crud.get_index_file(self.config, name)), name)
+        self.assertNotIn(entry_id, crud.load_data(self.config))
+
+
+if __name__ == "__main__":
+    unittest.main()
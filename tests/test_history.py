@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+
+from twd.history import History, open_history, get_history_file
+
+
+class TestHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "history")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_newest_first(self):
+        with History(self.path, capacity=10) as history:
+            for i in range(3):
+                history.append(f"/dir{i}", when=i)
+            self.assertEqual(list(history), [("/dir2", 2), ("/dir1", 1), ("/dir0", 0)])
+
+    def test_ring_keeps_only_capacity_records(self):
+        with History(self.path, capacity=4) as history:
+            for i in range(10):
+                history.append(f"/dir{i}")
+            self.assertEqual(len(history), 4)
+            self.assertEqual([path for path, _ in history], ["/dir9", "/dir8", "/dir7", "/dir6"])
+        self.assertEqual(os.path.getsize(self.path), 32 + 4 * 512)
+
+    def test_reopen_keeps_records_and_layout(self):
+        with History(self.path, capacity=4, slot_size=64) as history:
+            history.append("/a")
+        with History(self.path, capacity=100) as history:
+            history.append("/b")
+            self.assertEqual(history.capacity, 4)
+            self.assertEqual([path for path, _ in history], ["/b", "/a"])
+
+    def test_path_too_long_is_skipped(self):
+        with History(self.path, capacity=4, slot_size=32) as history:
+            self.assertFalse(history.append("/" + "x" * 40))
+            self.assertEqual(len(history), 0)
+
+    def test_recent_is_distinct_and_excludes(self):
+        with History(self.path) as history:
+            for path in ["/a", "/b", "/a", "/c", "/c"]:
+                history.append(path)
+            self.assertEqual([path for path, _ in history.recent()], ["/c", "/a", "/b"])
+            self.assertEqual([path for path, _ in history.recent(1, exclude={"/c"})], ["/a"])
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"x" * 64)
+        with self.assertRaises(ValueError):
+            History(self.path)
+
+    def test_open_history_uses_config(self):
+        config = {"data_file": os.path.join(self.tmp.name, "data"), "history_size": 8}
+        with open_history(config) as history:
+            self.assertEqual(history.capacity, 8)
+        self.assertTrue(os.path.exists(get_history_file(config)))
+        self.assertIsNone(open_history(dict(config, history_size=0)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import random
+import unittest
+
+from twd.ids import AliasIndex, IdIndex
+
+
+class TestIdIndex(unittest.TestCase):
+    def test_prefixes_are_shortest_and_unique(self):
+        rng = random.Random(7)
+        ids = ["%012x" % rng.getrandbits(48) for _ in range(2000)]
+        index = IdIndex(ids, min_length=1)
+        for entry_id in ids:
+            prefix = index.unique_prefix(entry_id)
+            self.assertEqual(index.resolve(prefix), [entry_id])
+            self.assertGreater(len(index.resolve(prefix[:-1])), 1 if len(prefix) > 1 else 0)
+
+    def test_incremental_updates(self):
+        index = IdIndex(["abc111", "abd222"], min_length=1)
+        self.assertEqual(index.unique_prefix("abc111"), "abc")
+        index.add("abc199")
+        self.assertEqual(index.unique_prefix("abc111"), "abc11")
+        index.remove("abc199")
+        index.remove("abd222")
+        self.assertEqual(index.unique_prefix("abc111"), "a")
+        self.assertEqual(IdIndex(["abc111"]).unique_prefix("abc111"), "abc1")
+
+    def test_alias_index_prefix_match(self):
+        data = {
+            "1": {"alias": "web", "path": "/a", "created_at": 0},
+            "2": {"alias": "api", "path": "/b", "created_at": 0},
+            "3": {"alias": "webapp", "path": "/c", "created_at": 0},
+        }
+        index = AliasIndex(data)
+        self.assertEqual(index.match("web"), ["1", "3"])
+        self.assertEqual(index.match("x"), [])
+        index.remove("web", "1")
+        index.add("website", "4")
+        self.assertEqual(index.match("web"), ["3", "4"])
+
+
+if __name__ == "__main__":
+    unittest.main()
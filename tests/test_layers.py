@@ -0,0 +1,76 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from twd import api, crud
+
+
+class TestLayers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.team = os.path.join(self.tmp.name, "team")
+        self.site = os.path.join(self.tmp.name, "site")
+        self.write_layer(self.team, {
+            "aaaaaaaaaaaa": {"path": "/srv/api", "alias": "api", "created_at": 1.0},
+            "bbbbbbbbbbbb": {"path": "/srv/web", "alias": "web", "created_at": 1.0},
+        })
+        self.write_layer(self.site, {
+            "aaaaaaaaaaaa": {"path": "/srv/other", "alias": "other", "created_at": 1.0},
+            "cccccccccccc": {"path": "/srv/web", "alias": "site-web", "created_at": 1.0},
+            "dddddddddddd": {"path": "/srv/db", "alias": "db", "created_at": 1.0},
+        })
+        self.config = {
+            "data_file": os.path.join(self.tmp.name, "user", "data"),
+            "layers": [self.team, self.site],
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_layer(self, layer, entries):
+        with open(layer, "w") as f:
+            json.dump(entries, f)
+
+    def test_earlier_layers_win_and_the_merge_is_cached(self):
+        shared = crud.load_shared(self.config)
+        self.assertEqual(sorted(shared), ["aaaaaaaaaaaa", "bbbbbbbbbbbb", "dddddddddddd"])
+        self.assertEqual(shared["aaaaaaaaaaaa"]["alias"], "api")
+
+        with mock.patch("twd.crud.log") as log:
+            crud.load_shared(self.config)
+        log.info.assert_not_called()  # Read from data.layers
+
+        self.write_layer(self.site, {"eeeeeeeeeeee": {"path": "/srv/cache", "alias": "cache", "created_at": 1.0}})
+        os.utime(self.site, ns=(0, 0))  # A changed mtime, whatever the clock resolution
+        self.assertEqual(sorted(crud.load_shared(self.config)), ["aaaaaaaaaaaa", "bbbbbbbbbbbb", "eeeeeeeeeeee"])
+
+    def test_store_merges_layers_and_only_writes_the_user_layer(self):
+        with open(self.team) as f:
+            team = f.read()
+        store = api.Store(self.config)
+        self.assertEqual(len(store), 3)
+        user_id, _ = store.add("/srv/mine", "mine")
+        store.rename("web", "www")  # Saved as a copy that hides the shared entry
+        with self.assertRaises(ValueError):
+            store.remove("db")
+
+        with open(self.team) as f:
+            self.assertEqual(f.read(), team)
+        user = crud.load_data(self.config)
+        self.assertEqual(sorted(user), sorted([user_id, "bbbbbbbbbbbb"]))
+        store = api.Store(self.config)
+        self.assertEqual(store["bbbbbbbbbbbb"]["alias"], "www")
+        self.assertEqual(store.resolve("db"), "dddddddddddd")
+
+        store.remove("www")  # Removing the copy shows the shared entry again
+        self.assertEqual(store["bbbbbbbbbbbb"]["alias"], "web")
+        self.assertEqual(list(crud.load_data(self.config)), [user_id])
+
+    def test_other_namespaces_have_no_layers(self):
+        self.assertEqual(len(api.Store(self.config, "work")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import os
+import json
+import tempfile
+import unittest
+
+from twd import crud, paths
+from twd.entries import Entry
+from twd.paths import PathTrie
+from twd.screen import shorten_path
+
+
+class TestPaths(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            "000000000001": Entry("/home/user/src/company/api", "api", 1.0),
+            "000000000002": Entry("/home/user/src/company/web", "web", 2.0, {"expires_at": 5.0}),
+            "000000000003": Entry("/home/user/src/company", "company", 3.0),
+            "000000000004": Entry("/", "root", 4.0),
+            "000000000005": Entry("/home/user/odd/", "odd", 5.0),
+        }
+
+    def test_encode_stores_each_directory_once(self):
+        encoded = paths.encode(self.data)
+        self.assertEqual([name for _, name in encoded["dirs"]], ["home", "user", "src", "company", "api", "web"])
+        self.assertEqual(encoded["entries"]["000000000004"]["dir"], -1)
+        self.assertEqual(encoded["entries"]["000000000005"]["path"], "/home/user/odd/")  # Kept as it is
+        decoded = paths.decode(json.loads(json.dumps(encoded)))
+        self.assertEqual(decoded, self.data)
+
+    def test_compact_data_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"data_file": os.path.join(tmp, "data")}
+            data = {
+                f"{i:012d}": Entry(f"/home/user/src/company/team{i % 10}/project{i}", f"p{i}", float(i))
+                for i in range(200)
+            }
+            crud.save_data(config, data)
+            plain_size = os.path.getsize(config["data_file"])
+            config["compact_paths"] = True
+            crud.save_data(config, data)
+            self.assertLess(os.path.getsize(config["data_file"]), plain_size)
+            with open(config["data_file"]) as f:
+                content = f.read()
+            self.assertEqual(content.count('"company"'), 1)
+            self.assertEqual(crud.load_data(config), data)
+            del config["compact_paths"]  # Compact files are read either way
+            self.assertEqual(crud.load_data(config), data)
+
+    def test_trie_subtree_walk(self):
+        trie = PathTrie(self.data)
+        self.assertEqual(sorted(trie.under("/home/user/src/company")), ["000000000001", "000000000002", "000000000003"])
+        self.assertEqual(trie.under("/home/user/src/comp"), [])
+        self.assertEqual(len(trie.under("/")), 5)
+        trie.remove("000000000002", "/home/user/src/company/web")
+        self.assertIsNone(trie.node("/home/user/src/company/web"))
+        self.assertEqual(trie.node("/home/user/src/company/api").path, "/home/user/src/company/api")
+
+    def test_shorten_components(self):
+        path = "/home/user/src/company/team/api"
+        parts = paths.components(path)
+        self.assertEqual(paths.join(paths.shorten(parts, 1)), shorten_path(path, 1))
+        self.assertEqual(shorten_path(path, 1), "/home/user/.../team/api")
+        self.assertEqual(shorten_path(path, 2), "/home/.../api")
+        self.assertEqual(shorten_path("/a/b/", 2), "/a/b/")
+        self.assertEqual(paths.display_length(paths.shorten(parts, 2)), len("/home/.../api"))
+        self.assertEqual(paths.display_length([]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import time
+import tempfile
+import unittest
+
+from twd.preview import DirectoryPreview, read_git_branch
+
+
+def wait_for(preview, path, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = preview.request(path)
+        if result is not None:
+            return result
+        time.sleep(0.01)
+    raise AssertionError(f"Preview for {path} did not load")
+
+
+class TestPreview(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lists_directories_first(self):
+        os.mkdir(os.path.join(self.root, "b_dir"))
+        open(os.path.join(self.root, "a_file"), "w").close()
+        preview = DirectoryPreview()
+        result = wait_for(preview, self.root)
+        preview.stop()
+        self.assertEqual(result["items"], ["b_dir/", "a_file"])
+        self.assertFalse(result["truncated"])
+
+    def test_truncates_and_evicts(self):
+        dirs = []
+        for i in range(3):
+            path = os.path.join(self.root, f"d{i}")
+            os.mkdir(path)
+            for j in range(5):
+                open(os.path.join(path, f"f{j}"), "w").close()
+            dirs.append(path)
+        preview = DirectoryPreview(cache_size=2, max_items=3)
+        for path in dirs:
+            result = wait_for(preview, path)
+            self.assertEqual(len(result["items"]), 3)
+            self.assertTrue(result["truncated"])
+        preview.stop()
+        self.assertEqual(len(preview._cache), 2)
+        self.assertNotIn(dirs[0], [path for path, _ in preview._cache])
+
+    def test_git_branch(self):
+        os.makedirs(os.path.join(self.root, ".git"))
+        with open(os.path.join(self.root, ".git", "HEAD"), "w") as f:
+            f.write("ref: refs/heads/feature/x\n")
+        sub = os.path.join(self.root, "src")
+        os.mkdir(sub)
+        self.assertEqual(read_git_branch(sub), "feature/x")
+
+
+if __name__ == "__main__":
+    unittest.main()
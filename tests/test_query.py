@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from twd.query import QueryIndex, parse_query
+
+
+def at(day):
+    return datetime(2024, 1, day).timestamp()
+
+
+class TestQuery(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        existing = os.path.join(self.tmp.name, "exists")
+        os.mkdir(existing)
+        self.data = {
+            "aaaaaaaaaaaa": {"path": "/srv/web", "alias": "web-prod", "created_at": at(1)},
+            "bbbbbbbbbbbb": {"path": "/srv/web/static", "alias": "web-static", "created_at": at(5)},
+            "cccccccccccc": {"path": "/srvx/api", "alias": "api", "created_at": at(10)},
+            "dddddddddddd": {"path": existing, "alias": "Local", "created_at": at(20)},
+        }
+        self.index = QueryIndex(self.data)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_under_matches_whole_components(self):
+        self.assertEqual(self.index.search("under:/srv"), ["aaaaaaaaaaaa", "bbbbbbbbbbbb"])
+        self.assertEqual(self.index.search("under:/srv/web/"), ["aaaaaaaaaaaa", "bbbbbbbbbbbb"])
+        self.assertEqual(self.index.search("under:/srv/api/../web"), ["aaaaaaaaaaaa", "bbbbbbbbbbbb"])
+
+    def test_created_range(self):
+        self.assertEqual(
+            self.index.search("after:2024-01-02 before:2024-01-15"),
+            ["bbbbbbbbbbbb", "cccccccccccc"],
+        )
+
+    def test_alias_glob_and_text(self):
+        self.assertEqual(self.index.search("alias:web-*"), ["aaaaaaaaaaaa", "bbbbbbbbbbbb"])
+        self.assertEqual(self.index.search("alias:*i*"), ["bbbbbbbbbbbb", "cccccccccccc"])
+        self.assertEqual(self.index.search("local"), ["dddddddddddd"])
+        self.assertEqual(self.index.search("web stat"), ["bbbbbbbbbbbb"])
+
+    def test_exists_and_combinations(self):
+        self.assertEqual(self.index.search("exists:yes"), ["dddddddddddd"])
+        self.assertEqual(self.index.search("under:/srv exists:no after:2024-01-03"), ["bbbbbbbbbbbb"])
+        self.assertEqual(self.index.search("id:cc"), ["cccccccccccc"])
+
+    def test_within_restricts_results(self):
+        within = {"bbbbbbbbbbbb": self.data["bbbbbbbbbbbb"]}
+        self.assertEqual(self.index.search("web", within), ["bbbbbbbbbbbb"])
+
+    def test_invalid_terms(self):
+        with self.assertRaises(ValueError):
+            parse_query("after:yesterday")
+        with self.assertRaises(ValueError):
+            parse_query("exists:maybe")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from tests.tui_harness import run_screen, script_keys, make_dirs, summarize
+from twd import screen
+
+
+class TestSelectScreen(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {
+            "data_file": os.path.join(self.tmp.name, "data"),
+            "show_preview": False,
+            "watch": False,
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_select_after_moving_down(self):
+        dirs = make_dirs(10)
+        selected, stdscr = run_screen(self.config, dirs, script_keys("jj\n"))
+        self.assertEqual(selected["alias"], "alias2")
+        self.assertEqual(len(stdscr.frames), 3)
+
+    def test_search_filters_entries(self):
+        dirs = make_dirs(30)
+        selected, stdscr = run_screen(self.config, dirs, script_keys("salias17\n\n"))
+        self.assertEqual(selected["alias"], "alias17")
+
+    def test_delete_writes_data_file(self):
+        dirs = make_dirs(5)
+        with open(self.config["data_file"], "w") as f:
+            json.dump(dirs, f)
+        _, stdscr = run_screen(self.config, dirs, script_keys("d\nq"))
+        with open(self.config["data_file"]) as f:
+            remaining = json.load(f)
+        self.assertEqual(len(remaining), 4)
+        self.assertNotIn("000000000000", remaining)
+
+    def test_own_saves_do_not_reload(self):
+        from twd import crud
+        self.config["watch"] = True
+        dirs = make_dirs(5)
+        crud.save_data(self.config, dirs)
+
+        def wait_for_save():
+            screen.WRITER.flush(timeout=5)
+            time.sleep(0.3)  # Let the watcher settle
+
+        with mock.patch("twd.crud.load_merged", wraps=crud.load_merged) as load_merged:
+            _, stdscr = run_screen(self.config, dict(dirs), script_keys("d\n") + [wait_for_save, -1, -1, ord("q")])
+        self.assertEqual(load_merged.call_count, 0)
+        self.assertEqual(len(crud.load_data(self.config)), 4)
+
+    def test_bulk_delete_marked_entries_in_one_write(self):
+        from unittest import mock
+        from twd import crud
+        dirs = make_dirs(5)
+        with open(self.config["data_file"], "w") as f:
+            json.dump(dirs, f)
+        with mock.patch("twd.crud.save_data", wraps=crud.save_data) as save_data:
+            selected, _ = run_screen(self.config, dirs, script_keys(" j d\n\n"))
+        self.assertEqual(save_data.call_count, 1)
+        with open(self.config["data_file"]) as f:
+            remaining = json.load(f)
+        self.assertEqual(sorted(remaining), ["000000000001", "000000000003", "000000000004"])
+        self.assertEqual(selected["alias"], "alias3")  # The selection stays on its entry
+
+    def test_invert_and_realias_marked_entries(self):
+        dirs = make_dirs(4)
+        with open(self.config["data_file"], "w") as f:
+            json.dump(dirs, f)
+        _, stdscr = run_screen(self.config, dirs, script_keys(" ieproj-{n}\nq"))
+        with open(self.config["data_file"]) as f:
+            aliases = {entry_id: entry["alias"] for entry_id, entry in json.load(f).items()}
+        self.assertEqual(aliases["000000000000"], "alias0")
+        self.assertEqual(
+            [aliases[entry_id] for entry_id in ["000000000001", "000000000002", "000000000003"]],
+            ["proj-1", "proj-2", "proj-3"],
+        )
+
+    def test_tag_filter_key(self):
+        from twd import crud
+        dirs = make_dirs(5)
+        with open(self.config["data_file"], "w") as f:
+            json.dump(dirs, f)
+        for entry_id in ("000000000001", "000000000003"):
+            crud.update_tags(self.config, entry_id, add=["prod"])
+        selected, stdscr = run_screen(self.config, dirs, script_keys("#prod\nj\n"))
+        self.assertEqual(selected["alias"], "alias3")
+
+    def test_shared_entries_cannot_be_deleted(self):
+        from twd import crud
+        dirs = make_dirs(3)
+        layer = os.path.join(self.tmp.name, "shared")
+        with open(layer, "w") as f:
+            json.dump({"000000000000": dirs.pop("000000000000")}, f)
+        with open(self.config["data_file"], "w") as f:
+            json.dump(dirs, f)
+        self.config["layers"] = [layer]
+        selected, _ = run_screen(self.config, crud.load_merged(self.config), script_keys("d\n\n"))
+        self.assertEqual(selected["alias"], "alias0")
+        with open(self.config["data_file"]) as f:
+            self.assertEqual(sorted(json.load(f)), ["000000000001", "000000000002"])
+
+    def test_tab_switches_namespace(self):
+        from twd import crud
+        work = crud.namespace_config(self.config, "work")
+        crud.ensure_data_file_exists(work)
+        crud.save_data(work, {"ffffffffffff": {"path": "/srv", "alias": "srv", "created_at": 0}})
+        selected, _ = run_screen(self.config, make_dirs(3), [9, ord("\n")])
+        self.assertEqual(selected["alias"], "srv")
+
+    def test_recent_view_orders_by_last_jump(self):
+        from twd.history import open_history
+        dirs = make_dirs(5)
+        with open_history(self.config) as history:
+            for entry_id in ["000000000003", "000000000001"]:
+                history.append(dirs[entry_id]["path"])
+        selected, stdscr = run_screen(self.config, dirs, script_keys("r\n"))
+        self.assertEqual(selected["alias"], "alias1")
+        self.assertTrue(any("View: recent" in line for line in stdscr.text()))
+
+    def test_reloads_when_another_process_saves(self):
+        from twd import crud
+        self.config["watch"] = True
+        dirs = make_dirs(3)
+        crud.save_data(self.config, dirs)
+
+        def save_elsewhere():
+            crud.create_entry(self.config, crud.load_data(self.config), "/elsewhere", "aaa")
+
+        selected, _ = run_screen(self.config, dict(dirs), [save_elsewhere, -1, -1, ord("\n")])
+        self.assertEqual(selected["alias"], "aaa")
+
+    def test_renamed_directory_is_repointed_in_the_background(self):
+        from twd import crud, watch
+        self.config["watch"] = True
+        dirs = make_dirs(3)
+        crud.save_data(self.config, dirs)
+        old = dirs["000000000001"]["path"]
+
+        class MovedWatcher:
+            def __init__(self, *args):
+                self.changes = {"moved": {old: old + "-renamed"}, "missing": set(), "data": False}
+
+            def poll(self):
+                changes, self.changes = self.changes, None
+                return changes
+
+            def reset(self, data_file, paths):
+                pass
+
+            def close(self):
+                pass
+
+        threads = []
+        original_save_data = crud.save_data
+
+        def save_data(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return original_save_data(*args, **kwargs)
+
+        with mock.patch.object(watch, "create_watcher", MovedWatcher), mock.patch.object(
+            crud, "save_data", side_effect=save_data
+        ):
+            selected, _ = run_screen(self.config, dict(dirs), [-1, ord("j"), ord("\n")])
+        self.assertNotIn(threading.main_thread(), threads)
+        self.assertEqual(selected["path"], old + "-renamed")
+        self.assertEqual(crud.load_data(self.config)["000000000001"]["path"], old + "-renamed")
+
+    def test_frame_metrics(self):
+        dirs = make_dirs(50)
+        _, stdscr = run_screen(self.config, dirs, script_keys("jolq"), measure_memory=True)
+        summary = summarize(stdscr.frames)
+        self.assertEqual(summary["frames"], 4)
+        self.assertGreater(summary["mean_calls"], 0)
+        self.assertIn("max_peak_alloc", summary)
+
+    def test_preview_pane_on_wide_terminal(self):
+        self.config["show_preview"] = True
+        target = os.path.join(self.tmp.name, "target")
+        os.mkdir(target)
+        open(os.path.join(target, "marker.txt"), "w").close()
+        dirs = {"abcdefabcdef": {"path": target, "alias": "t", "created_at": 0}}
+        keys = [-1] * 20 + [ord("q")]
+        _, stdscr = run_screen(self.config, dirs, keys, width=150)
+        self.assertTrue(any("marker.txt" in line for line in stdscr.text()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import io
+import json
+import unittest
+
+from twd import stats
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        stats.PHASES.clear()
+        stats.enable()
+
+    def tearDown(self):
+        stats.enable(False)
+        stats.PHASES.clear()
+
+    def test_nothing_is_recorded_unless_enabled(self):
+        stats.enable(False)
+        for _ in range(3):
+            stats.timed("work")(lambda: None)()
+        stats.record("imports", 0)
+        self.assertEqual(stats.PHASES, [])
+
+    def test_nested_phases(self):
+        with stats.timer("outer"):
+            with stats.timer("inner"):
+                pass
+        names = [(phase["name"], phase["depth"]) for phase in stats.as_dict()["phases"]]
+        self.assertEqual(names, [("outer", 0), ("inner", 1)])
+
+    def test_reports(self):
+        stats.timed("work")(lambda: None)()
+        out = io.StringIO()
+        stats.report("json", out)
+        self.assertEqual(json.loads(out.getvalue())["phases"][0]["name"], "work")
+        out = io.StringIO()
+        stats.report("table", out)
+        self.assertIn("work", out.getvalue())
+        self.assertIn("total", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
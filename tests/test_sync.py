@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from twd import crud, sync
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.shared = os.path.join(self.tmp.name, "shared")
+        self.hosts = {}
+        for host in ("alpha", "beta"):
+            config = {"data_file": os.path.join(self.tmp.name, f"{host}.data"), "sync_host": host}
+            crud.ensure_data_file_exists(config)
+            self.hosts[host] = config
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, host):
+        return sync.sync(self.hosts[host], self.shared)
+
+    def data(self, host):
+        return crud.load_data(self.hosts[host])
+
+    def test_changes_propagate_as_deltas(self):
+        alpha = self.hosts["alpha"]
+        entry_id = crud.create_entry(alpha, self.data("alpha"), "/srv/a", "a")
+        self.sync("alpha")
+        self.assertEqual(self.sync("beta")["applied"], 1)
+        self.assertEqual(self.data("beta")[entry_id]["alias"], "a")
+
+        crud.create_entry(alpha, self.data("alpha"), "/srv/b", "b")
+        result = self.sync("alpha")
+        self.assertEqual(result["sent"], 1)
+        result = self.sync("beta")
+        self.assertEqual((result["sent"], result["received"]), (0, 1))
+
+        crud.update_tags(alpha, entry_id, add=["infra"])
+        crud.delete_entry(self.hosts["beta"], self.data("beta"), entry_id)
+        self.sync("beta")
+        self.sync("alpha")
+        self.assertNotIn(entry_id, self.data("alpha"))
+        self.assertFalse(crud.load_tags(alpha))
+        self.assertEqual(self.data("alpha"), self.data("beta"))
+
+    def test_concurrent_updates_converge(self):
+        entry_id = crud.create_entry(self.hosts["alpha"], self.data("alpha"), "/srv/a", "a")
+        self.sync("alpha")
+        self.sync("beta")
+
+        for host in ("alpha", "beta"):
+            data = self.data(host)
+            entry = dict(data[entry_id], alias=f"from-{host}")
+            crud.update_entry(self.hosts[host], data, entry_id, entry)
+
+        self.sync("alpha")
+        result = self.sync("beta")
+        self.assertEqual(result["conflicts"], [entry_id])
+        self.sync("alpha")
+        self.assertEqual(self.data("alpha"), self.data("beta"))
+        # Same clock on both sides, the higher host name wins
+        self.assertEqual(self.data("alpha")[entry_id]["alias"], "from-beta")
+
+    def test_changes_journaled_during_a_sync_are_kept(self):
+        alpha = self.hosts["alpha"]
+        self.sync("alpha")
+        first = crud.create_entry(alpha, self.data("alpha"), "/srv/a", "a")
+        changes, size = sync.read_journal(alpha)
+        self.assertEqual([change["id"] for change in changes], [first])
+        second = crud.create_entry(alpha, self.data("alpha"), "/srv/b", "b")
+        sync.trim_journal(alpha, size)
+        changes, _ = sync.read_journal(alpha)
+        self.assertEqual([change["id"] for change in changes], [second])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import json
+import tempfile
+import unittest
+
+from twd import api, crud
+from twd.tags import TagIndex, intersect, parse_tags
+
+
+class TestTags(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {"data_file": os.path.join(self.tmp.name, "data")}
+        crud.ensure_data_file_exists(self.config)
+        self.data = crud.load_data(self.config)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_intersect_merges_sorted_postings(self):
+        self.assertEqual(intersect([["a", "c", "e", "g"], ["b", "c", "g"], ["c", "d", "g", "h"]]), ["c", "g"])
+        self.assertEqual(intersect([["a", "b"], ["c"]]), [])
+        self.assertEqual(intersect([]), [])
+        tags = TagIndex()
+        tags.add("b", ["prod", "infra"])
+        tags.add("a", ["prod"])
+        self.assertEqual(tags.postings, {"prod": ["a", "b"], "infra": ["b"]})
+        self.assertEqual(tags.ids(["prod", "infra"]), ["b"])
+        self.assertEqual(tags.ids(["prod", "missing"]), [])
+
+    def test_crud_keeps_the_index_up_to_date(self):
+        first = crud.create_entry(self.config, self.data, "/srv/a", "a", tags=["infra", "prod"])
+        second = crud.create_entry(self.config, self.data, "/srv/b", "b", tags=["prod"])
+        with open(crud.get_index_file(self.config, "tags")) as f:
+            postings = json.load(f)
+        # Each tag is stored once, with its sorted entry IDs
+        self.assertEqual(postings, {"infra": [first], "prod": sorted([first, second])})
+
+        crud.update_entry(self.config, self.data, second, self.data[second], tags=["staging"])
+        self.assertEqual(crud.load_tags(self.config).tags_of(second), ["staging"])
+        crud.delete_entry(self.config, self.data, first)
+        self.assertEqual(crud.load_tags(self.config).postings, {"staging": [second]})
+
+    def test_store_tags_and_tag_queries(self):
+        store = api.Store(self.config)
+        web, _ = store.add("/srv/web", "web")
+        db, _ = store.add("/srv/db", "db")
+        store.tag("web", "Infra, prod")
+        store.tag("db", "infra")
+        self.assertEqual(store.tagged("infra,prod"), [web])
+        self.assertEqual([entry_id for entry_id, _ in store.search("tag:infra alias:d*")], [db])
+        store.untag("web", "prod")
+        self.assertEqual(store.tagged("prod"), [])
+        store.remove("db")
+        self.assertEqual(store.tags.postings, {"infra": [web]})
+
+    def test_parse_tags(self):
+        self.assertEqual(parse_tags("prod, infra,,prod"), ["infra", "prod"])
+        with self.assertRaises(ValueError):
+            parse_tags("no spaces")
+
+
+if __name__ == "__main__":
+    unittest.main()
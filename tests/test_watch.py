@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+from twd import watch
+
+
+class TestRepoint(unittest.TestCase):
+    def test_repoint_moved_directory_and_children(self):
+        data = {
+            "1": {"path": "/src/app", "alias": "app", "created_at": 0},
+            "2": {"path": "/src/app/web", "alias": "web", "created_at": 0},
+            "3": {"path": "/src/application", "alias": "other", "created_at": 0},
+        }
+        updates = watch.repoint(data, {"/src/app": "/src/app2"})
+        self.assertEqual(
+            {entry_id: entry["path"] for entry_id, entry in updates.items()},
+            {"1": "/src/app2", "2": "/src/app2/web"},
+        )
+
+
+class WatcherTests:
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.data_file = os.path.join(self.root, "data")
+        self.write_data({})
+        self.projects = os.path.join(self.root, "projects")
+        self.app = os.path.join(self.projects, "app")
+        os.makedirs(self.app)
+        self.watcher = self.create_watcher()
+
+    def tearDown(self):
+        self.watcher.close()
+        self.tmp.cleanup()
+
+    def write_data(self, data):
+        with open(self.data_file, "w") as f:
+            json.dump(data, f)
+
+    def wait(self):
+        return self.watcher.poll(now=float("inf"))
+
+    def test_no_changes(self):
+        self.assertIsNone(self.wait())
+
+    def test_data_file_change(self):
+        self.write_data({"x": {"path": "/", "alias": "x", "created_at": 0}})
+        changes = self.wait()
+        self.assertTrue(changes["data"])
+        self.assertIsNone(self.wait())
+
+    def test_deleted_directory_is_missing(self):
+        os.rmdir(self.app)
+        self.assertEqual(self.wait()["missing"], {self.app})
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+    def create_watcher(self):
+        return watch.PollingWatcher(self.data_file, [self.app], interval=0)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+    def create_watcher(self):
+        return watch.InotifyWatcher(self.data_file, [self.app])
+
+    def test_burst_is_coalesced(self):
+        for i in range(20):
+            self.write_data({str(i): {"path": "/", "alias": "x", "created_at": 0}})
+        self.assertIsNone(self.watcher.poll())  # Still settling
+        self.assertTrue(self.wait()["data"])
+        self.assertIsNone(self.wait())
+
+    def test_rename_is_reported_with_new_path(self):
+        renamed = os.path.join(self.projects, "app2")
+        os.rename(self.app, renamed)
+        changes = self.wait()
+        self.assertEqual(changes["moved"], {self.app: renamed})
+        self.assertEqual(changes["missing"], set())
+
+    def test_move_out_of_view_is_missing(self):
+        elsewhere = os.path.join(self.root, "elsewhere")
+        os.mkdir(elsewhere)
+        os.rename(self.app, os.path.join(elsewhere, "app"))
+        self.assertEqual(self.wait()["missing"], {self.app})
+
+
+if __name__ == "__main__":
+    unittest.main()
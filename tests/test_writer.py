@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from twd import crud
+from twd.writer import WriteBehind
+
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {"data_file": os.path.join(self.tmp.name, "data")}
+        crud.ensure_data_file_exists(self.config)
+        data = crud.load_data(self.config)
+        self.ids = [crud.create_entry(self.config, data, f"/srv/p{i}", f"p{i}") for i in range(3)]
+        self.writer = WriteBehind(retry_delay=0.01)
+
+    def tearDown(self):
+        self.writer.close()
+        self.tmp.cleanup()
+
+    def test_changes_are_coalesced_into_one_save(self):
+        data = crud.load_data(self.config)
+        with mock.patch("twd.crud.save_data", wraps=crud.save_data) as save_data:
+            with self.writer._cond:  # Hold the writer so all changes queue up
+                self.writer.put(self.config, {self.ids[0]: dict(data[self.ids[0]], alias="first")})
+                self.writer.put(self.config, {self.ids[0]: dict(data[self.ids[0]], alias="second")})
+                self.writer.delete(self.config, [self.ids[1]])
+                self.assertEqual(self.writer.status(), "saving")
+            self.assertTrue(self.writer.flush(5))
+        self.assertEqual(save_data.call_count, 1)
+        self.assertEqual(self.writer.status(), "saved")
+        data = crud.load_data(self.config)
+        self.assertEqual(data[self.ids[0]]["alias"], "second")
+        self.assertNotIn(self.ids[1], data)
+        self.assertEqual(data[self.ids[2]]["alias"], "p2")
+
+    def test_failed_save_is_retried(self):
+        saves = iter([False, True])
+        with mock.patch("twd.crud.save_data", side_effect=lambda config, data: next(saves)) as save_data:
+            self.writer.delete(self.config, [self.ids[0]])
+            self.assertTrue(self.writer.flush(5))
+        self.assertEqual(save_data.call_count, 2)
+        self.assertEqual(self.writer.status(), "saved")
+
+    def test_close_gives_up_after_a_failed_save(self):
+        with mock.patch("twd.crud.save_data", return_value=False):
+            self.writer.delete(self.config, [self.ids[0]])
+            self.assertFalse(self.writer.close(5))
+        self.assertIn(self.ids[0], crud.load_data(self.config))
+
+    def test_close_flushes_queued_changes(self):
+        self.writer.delete(self.config, self.ids[:2])
+        self.assertTrue(self.writer.close(5))
+        self.assertEqual(list(crud.load_data(self.config)), [self.ids[2]])
+
+    def test_wrote_tells_own_saves_from_others(self):
+        data_file = crud.get_data_file(self.config)
+        self.assertFalse(self.writer.wrote(data_file))
+        self.writer.delete(self.config, [self.ids[0]])
+        self.assertTrue(self.writer.flush(timeout=5))
+        self.assertTrue(self.writer.wrote(data_file))
+        crud.create_entry(self.config, crud.load_data(self.config), "/srv/other", "other")
+        self.assertFalse(self.writer.wrote(data_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""Headless driver for the TWD selection screen.
+
+``run_screen`` runs ``screen.display_select`` against a fake ``stdscr`` fed by a
+scripted list of key events, so the whole selection loop can be exercised and
+measured without a terminal. A frame is everything the loop does between two
+``getch`` calls; for every frame the curses calls, wall time and peak
+allocations (via ``tracemalloc``) are recorded.
+"""
+
+import curses
+import time
+import tracemalloc
+from collections import Counter
+from unittest import mock
+
+from twd import screen
+
+
+class ScriptExhausted(Exception):
+    """Raised by the fake screen when the key script has run out."""
+
+
+def script_keys(*items):
+    """Turn strings, key codes, lists of key codes and ("mouse", x, y) tuples into key events.
+
+    Callables are kept as they are and run when the screen reaches them.
+    """
+    keys = []
+    for item in items:
+        if isinstance(item, str):
+            keys.extend(ord(char) for char in item)
+        elif isinstance(item, list):
+            keys.extend(item)
+        else:
+            keys.append(item)
+    return keys
+
+
+class FakeScreen:
+    """Minimal stand-in for a curses window that records what is drawn."""
+
+    def __init__(self, keys, height=40, width=120, measure_memory=False):
+        self.keys = list(keys)
+        self.height = height
+        self.width = width
+        self.measure_memory = measure_memory
+        self.frames = []
+        self.mouse_event = None
+        self.calls = Counter()
+        self.lines = [[" "] * width for _ in range(height)]
+        self.delay = -1
+        self._frame_start = None
+
+    # Frame bookkeeping
+
+    def _start_frame(self):
+        self.calls = Counter()
+        if self.measure_memory:
+            tracemalloc.reset_peak()
+            self._memory_start = tracemalloc.get_traced_memory()[0]
+        self._frame_start = time.perf_counter()
+
+    def _end_frame(self):
+        if self._frame_start is None:
+            return
+        frame = {
+            "time": time.perf_counter() - self._frame_start,
+            "calls": sum(self.calls.values()),
+            "call_counts": dict(self.calls),
+        }
+        if self.measure_memory:
+            frame["peak_alloc"] = tracemalloc.get_traced_memory()[1] - self._memory_start
+        self.frames.append(frame)
+
+    def text(self):
+        """Return the current screen contents as a list of strings."""
+        return ["".join(line) for line in self.lines]
+
+    # curses window API used by screen.py
+
+    def _put(self, y, x, text):
+        if y < 0 or y >= self.height or x < 0 or x >= self.width:
+            raise curses.error("addstr out of bounds")
+        line = self.lines[y]
+        for i, char in enumerate(text):
+            if x + i >= self.width:
+                raise curses.error("addstr out of bounds")
+            line[x + i] = char
+
+    def addstr(self, y, x, text, attr=0):
+        self.calls["addstr"] += 1
+        self._put(y, x, text)
+
+    def addch(self, y, x, char, attr=0):
+        self.calls["addch"] += 1
+        self._put(y, x, char if isinstance(char, str) else chr(char))
+
+    def getmaxyx(self):
+        self.calls["getmaxyx"] += 1
+        return self.height, self.width
+
+    def clear(self):
+        self.calls["clear"] += 1
+        self.lines = [[" "] * self.width for _ in range(self.height)]
+
+    def refresh(self):
+        self.calls["refresh"] += 1
+
+    def keypad(self, flag):
+        self.calls["keypad"] += 1
+
+    def timeout(self, delay):
+        self.calls["timeout"] += 1
+        self.delay = delay
+
+    def getch(self):
+        self._end_frame()
+        if not self.keys:
+            raise ScriptExhausted()
+        key = self.keys.pop(0)
+        while callable(key):
+            # Script steps like changing the data file behind the screen's back
+            key()
+            if not self.keys:
+                raise ScriptExhausted()
+            key = self.keys.pop(0)
+        if key == -1 and self.delay > 0:
+            time.sleep(self.delay / 1000)  # A poll timeout, as curses would wait
+        if isinstance(key, tuple):
+            _, x, y = key
+            self.mouse_event = (0, x, y, 0, curses.BUTTON1_PRESSED)
+            key = curses.KEY_MOUSE
+        self._start_frame()
+        return key
+
+
+def run_screen(config, dirs, keys, height=40, width=120, measure_memory=False):
+    """Run the selection screen headless and return (selected entry, FakeScreen).
+
+    The selected entry is None if the screen quit or the script ran out
+    before anything was selected.
+    """
+    stdscr = FakeScreen(keys, height, width, measure_memory)
+
+    def wrapper(func, *args, **kwargs):
+        return func(stdscr, *args, **kwargs)
+
+    patches = {
+        "wrapper": wrapper,
+        "start_color": lambda: None,
+        "use_default_colors": lambda: None,
+        "has_colors": lambda: False,
+        "init_pair": lambda *args: None,
+        "color_pair": lambda pair: pair << 8,
+        "mousemask": lambda mask: (mask, 0),
+        "resizeterm": lambda *args: None,
+        "getmouse": lambda: stdscr.mouse_event,
+    }
+
+    started_tracing = measure_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        with mock.patch.multiple(curses, **patches):
+            stdscr._start_frame()
+            try:
+                selected = screen.display_select(config, dirs)
+            except ScriptExhausted:
+                selected = None
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    return selected, stdscr
+
+
+def make_dirs(count, seed_time=1700000000.0):
+    """Build a synthetic entry dict with count entries."""
+    dirs = {}
+    for i in range(count):
+        entry_id = f"{i:012x}"
+        dirs[entry_id] = {
+            "path": f"/home/user/src/project{i % 97}/module{i}",
+            "alias": f"alias{i}",
+            "created_at": seed_time + i,
+        }
+    return dirs
+
+
+def summarize(frames):
+    """Aggregate per-frame metrics into a flat summary dict."""
+    times = sorted(frame["time"] for frame in frames)
+    summary = {
+        "frames": len(frames),
+        "mean_time": sum(times) / len(times) if times else 0.0,
+        "p95_time": times[int(len(times) * 0.95)] if times else 0.0,
+        "max_time": times[-1] if times else 0.0,
+        "mean_calls": sum(frame["calls"] for frame in frames) / len(frames) if frames else 0.0,
+    }
+    if frames and "peak_alloc" in frames[0]:
+        summary["max_peak_alloc"] = max(frame["peak_alloc"] for frame in frames)
+    return summary
@@ -1,4 +1,18 @@
+import sys
+
+if __name__ == "__main__" and sys.argv[1:] == ["--here"]:
+    # Runs on every prompt, so skip the profiler, config, logging and data
+    # file setup
+    from .here import main as here_main
+
+    sys.exit(here_main())
+
+from .stats import start_profile
+
+# Start profiling before the imports when TWD_PROFILE is set
+start_profile()
+
 from .twd import main
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,331 @@
+import os
+import re
+import json
+import time
+import logging
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from . import crud
+from . import expiry
+from .entries import Entry
+from .ids import AliasIndex, IdIndex
+from .query import QueryIndex
+from .tags import TagIndex, parse_tags
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+CONFIG_FILE = os.path.join("~", ".twd", "config")
+
+
+def read_config(config_file=CONFIG_FILE):
+    """Return the settings from a TWD config file, or {} if there is none.
+
+    Missing settings are left out; crud falls back to ~/.twd/data for the
+    data file.
+    """
+    try:
+        with open(os.path.expanduser(config_file), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def validate_alias(alias):
+    """Return alias if it only contains letters, digits, dashes and underscores."""
+    if not alias or not re.match(r"^[\w-]+$", alias):
+        raise ValueError(
+            f"Invalid alias: '{alias}'. Aliases can only contain alphanumeric characters, dashes, and underscores."
+        )
+    return alias
+
+
+def split_namespace(value):
+    """Split "ns:alias" into (namespace, alias); plain values have no namespace."""
+    if value:
+        namespace, sep, rest = value.partition(":")
+        if sep and re.match(r"^[\w-]+$", namespace):
+            return namespace, rest
+    return None, value
+
+
+class Store(Mapping):
+    """The entries of one namespace, as a read-only mapping of entry ID to entry.
+
+    Stores are meant for editors and other tools running in-process, so
+    unlike importing twd.twd, using one reads no config, sets up no logging
+    and creates no files until a change is saved. The data file is loaded
+    on first use and again only when its mtime or size changed, along with
+    indexes of the paths, aliases and IDs, which changes keep up to date in
+    memory. Expired entries are left out when loading; they are removed
+    from the file by the next save or by expiry.sweep(). Each change is
+    saved right away unless autocommit is off or it is made inside
+    `with store.batch():`, which saves once at the end.
+
+    The default namespace also shows the entries of the read-only layers
+    listed in the "layers" config entry. Changes only go to the data file:
+    renaming a shared entry saves a copy that hides it, removing one raises
+    ValueError.
+    """
+
+    def __init__(self, config=None, namespace=None, autocommit=True):
+        config = config or {}
+        self.autocommit = autocommit
+        self.namespace = namespace or crud.DEFAULT_NAMESPACE
+        self.config = crud.namespace_config(config, self.namespace)
+        self.min_length = config.get("id_prefix_min_length", 4)
+        self._data = None
+        self._user = None  # The entries of the data file, _data adds the shared layers
+        self._shared = {}
+        self._stat = None
+        self._changes = {}  # entry ID -> entry, or None if deleted
+        self._batch_depth = 0
+        self._tags = None
+        self._tags_stat = None
+
+    # Loading
+
+    def _file_stat(self):
+        try:
+            st = os.stat(crud.get_data_file(self.config))
+            stat = st.st_mtime_ns, st.st_size
+        except OSError:
+            stat = None
+        if self.config.get("layers"):
+            return stat, crud.layer_stamp(self.config)
+        return stat
+
+    @property
+    def data(self):
+        """The loaded entries, reloaded if the data file changed since."""
+        return self._load()
+
+    def _load(self):
+        if self._changes and self._data is not None:
+            return self._data  # Keep uncommitted changes
+        stat = self._file_stat()
+        if self._data is None or stat != self._stat:
+            self._stat = stat
+            exists = os.path.exists(crud.get_data_file(self.config))
+            self._user = crud.load_data(self.config) if exists else {}
+            for entry_id in expiry.expired_ids(self.config, data=self._user):
+                self._user.pop(entry_id, None)
+            self._shared = crud.load_shared(self.config)
+            self._data = crud.merge_layers(self._user, self._shared)
+            self._index()
+        return self._data
+
+    def _index(self):
+        self._paths = {os.path.normpath(entry["path"]): entry_id for entry_id, entry in self._data.items()}
+        self._aliases = {}
+        for entry_id, entry in self._data.items():
+            self._aliases.setdefault(entry["alias"], set()).add(entry_id)
+        self._ids = IdIndex(self._data, self.min_length)
+        self._alias_index = None
+        self._query_index = None
+
+    def __getitem__(self, entry_id):
+        return self.data[entry_id]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    # Lookups
+
+    def matches(self, ref):
+        """Return the IDs of all entries whose alias or ID starts with ref, alias matches first."""
+        data = self._load()
+        if self._alias_index is None:
+            self._alias_index = AliasIndex(data)
+        matched = self._alias_index.match(ref)
+        alias_matches = set(matched)
+        return matched + [entry_id for entry_id in self._ids.resolve(ref) if entry_id not in alias_matches]
+
+    def resolve(self, ref):
+        """Return the ID of the one entry ref names: an exact alias, or else an alias or ID prefix.
+
+        Raises KeyError if no entry or more than one entry matches.
+        """
+        self._load()
+        exact = self._aliases.get(ref)
+        if exact and len(exact) == 1:
+            return next(iter(exact))
+        matched = self.matches(ref)
+        if not matched:
+            raise KeyError(f"No TWD with alias found: '{ref}'")
+        if len(matched) > 1:
+            raise KeyError(f"Multiple TWDs match for '{ref}': {', '.join(matched)}")
+        return matched[0]
+
+    def find_path(self, path):
+        """Return the ID of the entry saved for path, or None."""
+        self._load()
+        return self._paths.get(os.path.normpath(path))
+
+    def short_id(self, entry_id):
+        """Return the shortest prefix that identifies entry_id."""
+        self._load()
+        return self._ids.unique_prefix(entry_id)
+
+    def search(self, query=None, sort=None, descending=False, limit=None):
+        """Return (entry ID, entry) pairs matching a `twd --query` string, optionally sorted."""
+        data = self._load()
+        if query:
+            if self._query_index is None:
+                self._query_index = QueryIndex(data, self.tags)
+            data = self._query_index.filter(query)
+        return list(crud.iter_entries(data, sort, descending, limit))
+
+    @property
+    def tags(self):
+        """The TagIndex of the store, reloaded if another process changed it."""
+        try:
+            st = os.stat(crud.get_index_file(self.config, "tags"))
+            stat = st.st_mtime_ns, st.st_size
+        except OSError:
+            stat = None
+        if self._tags is None or stat != self._tags_stat:
+            self._tags = crud.load_tags(self.config) if stat is not None else TagIndex()
+            self._tags_stat = stat
+            self._query_index = None
+        return self._tags
+
+    def tagged(self, tags):
+        """Return the sorted IDs of the entries that have all of tags ("infra,prod" or a list)."""
+        data = self._load()
+        return [entry_id for entry_id in self.tags.ids(parse_tags(tags)) if entry_id in data]
+
+    def tags_of(self, entry_id):
+        return self.tags.tags_of(entry_id)
+
+    # Changes
+
+    def add(self, path, alias=None, ttl=None):
+        """Save path, or rename its entry if it is already saved under another alias.
+
+        With ttl (in seconds) the entry expires that long from now, ttl=0
+        makes it permanent again; None keeps the expiry of a saved entry.
+        Returns (entry ID, "created" | "renamed" | "renewed" | "unchanged").
+        """
+        path = os.path.realpath(os.path.abspath(os.path.expanduser(path)))
+        if alias:
+            validate_alias(alias)
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        entry_id = self.find_path(path)
+        if entry_id is None:
+            entry_id = crud.create_alias_id()
+            while entry_id in self._data:
+                entry_id = crud.create_alias_id()
+            extra = {"expires_at": expires_at} if expires_at is not None else None
+            self._put(entry_id, Entry(path, alias or "no_alias", now, extra))
+            return entry_id, "created"
+        entry = self._data[entry_id]
+        fields = dict(entry)
+        if alias:
+            fields["alias"] = alias
+        if ttl is not None:
+            fields.pop("expires_at", None)
+            if expires_at is not None:
+                fields["expires_at"] = expires_at
+        if fields == dict(entry):
+            return entry_id, "unchanged"
+        self._put(entry_id, Entry.from_mapping(fields))
+        return entry_id, "renamed" if fields["alias"] != entry["alias"] else "renewed"
+
+    def rename(self, ref, alias):
+        """Give the entry ref names a new alias; returns its ID."""
+        validate_alias(alias)
+        entry_id = self.resolve(ref)
+        self._put(entry_id, self._data[entry_id].replace(alias=alias))
+        return entry_id
+
+    def remove(self, ref):
+        """Delete the entry ref names; returns (entry ID, removed entry).
+
+        Raises ValueError for entries of a read-only layer.
+        """
+        entry_id = self.resolve(ref)
+        if entry_id not in self._user:
+            raise ValueError(f"TWD '{self._data[entry_id]['alias']}' is from a read-only layer and cannot be deleted")
+        entry = self._user.pop(entry_id)
+        if self._shared:
+            # Shared entries this one was hiding show up again
+            self._data = crud.merge_layers(self._user, self._shared)
+            self._index()
+        else:
+            self._aliases[entry["alias"]].discard(entry_id)
+            self._paths.pop(os.path.normpath(entry["path"]), None)
+            self._ids.remove(entry_id)
+            if self._alias_index is not None:
+                self._alias_index.remove(entry["alias"], entry_id)
+        self._changed(entry_id, None)
+        return entry_id, entry
+
+    def tag(self, ref, tags):
+        """Add tags to the entry ref names; returns its ID.
+
+        Tags are kept in their own index file, so they are saved right away
+        even inside a batch.
+        """
+        entry_id = self.resolve(ref)
+        crud.update_tags(self.config, entry_id, add=parse_tags(tags))
+        return entry_id
+
+    def untag(self, ref, tags=None):
+        """Remove tags (all of them if tags is None) from the entry ref names; returns its ID."""
+        entry_id = self.resolve(ref)
+        crud.update_tags(self.config, entry_id, remove=None if tags is None else parse_tags(tags))
+        return entry_id
+
+    def _put(self, entry_id, entry):
+        old = self._data.get(entry_id)
+        if old is not None:
+            self._aliases[old["alias"]].discard(entry_id)
+            self._paths.pop(os.path.normpath(old["path"]), None)
+            if self._alias_index is not None:
+                self._alias_index.remove(old["alias"], entry_id)
+        self._data[entry_id] = self._user[entry_id] = entry
+        self._aliases.setdefault(entry["alias"], set()).add(entry_id)
+        self._paths[os.path.normpath(entry["path"])] = entry_id
+        self._ids.add(entry_id)
+        if self._alias_index is not None:
+            self._alias_index.add(entry["alias"], entry_id)
+        self._changed(entry_id, entry)
+
+    def _changed(self, entry_id, entry):
+        self._changes[entry_id] = entry
+        self._query_index = None
+        if self.autocommit and not self._batch_depth:
+            self.commit()
+
+    @property
+    def uncommitted(self):
+        """Number of changed entries that are not saved yet."""
+        return len(self._changes)
+
+    @contextmanager
+    def batch(self):
+        """Save all changes made in the block with a single write at its end."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.commit()
+
+    def commit(self):
+        """Save pending changes; returns False if saving failed, keeping them pending."""
+        if not self._changes:
+            return True
+        crud.ensure_data_file_exists(self.config)
+        if not crud.commit_changes(self.config, self._user, self._changes):
+            return False
+        self._changes = {}
+        self._stat = self._file_stat()
+        return True
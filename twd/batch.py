@@ -0,0 +1,166 @@
+import os
+import json
+import shlex
+import logging
+
+from . import crud
+from .api import Store, split_namespace
+from .query import parse_duration
+from .tags import parse_tags
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+# Positional arguments of each command in the word form
+COMMANDS = {
+    "save": ("path", "alias"),
+    "delete": ("ref",),
+    "rename": ("ref", "alias"),
+    "go": ("ref",),
+    "list": ("query",),
+}
+
+
+def parse_command(line):
+    """Parse a batch line into a command dict, or None for blank lines and comments.
+
+    A line is either a JSON object like {"op": "save", "path": "/srv",
+    "alias": "srv"} or shell-style words like `save /srv srv`, where the
+    words after the command fill its arguments in order (see COMMANDS) and
+    `list` takes the rest of the line as its query.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        command = json.loads(line)
+        if not isinstance(command, dict):
+            raise ValueError("A JSON command must be an object")
+    else:
+        words = shlex.split(line)
+        op, words = words[0], words[1:]
+        if op == "list":
+            words = [" ".join(words)] if words else []
+        if op in COMMANDS and len(words) > len(COMMANDS[op]):
+            raise ValueError(f"Too many arguments for {op}")
+        command = dict(zip(COMMANDS.get(op, ()), words), op=op)
+    if command.get("op") not in COMMANDS:
+        raise ValueError(f"Unknown command: '{command.get('op')}'. Use one of {', '.join(COMMANDS)}.")
+    return command
+
+
+class Batch:
+    """Run many commands against stores that are loaded once.
+
+    Every namespace a command touches gets an api.Store on first use, with
+    autocommit off, so changes are only written (one save per store) when
+    commit() is called.
+    """
+
+    def __init__(self, config, namespace=None):
+        self.config = config
+        self.namespace = namespace
+        self._stores = {}
+
+    def _store(self, namespace):
+        namespace = namespace or self.namespace or crud.DEFAULT_NAMESPACE
+        if namespace not in self._stores:
+            self._stores[namespace] = Store(self.config, namespace, autocommit=False)
+        return self._stores[namespace]
+
+    @property
+    def uncommitted(self):
+        return sum(store.uncommitted for store in self._stores.values())
+
+    def execute(self, command):
+        """Run one parsed command and return its result."""
+        op = command["op"]
+        namespace = command.get("ns")
+        if op == "save":
+            alias_namespace, alias = split_namespace(command.get("alias"))
+            store = self._store(alias_namespace or namespace)
+            ttl = command.get("ttl")
+            seconds = parse_duration(str(ttl)) if ttl is not None else None
+            entry_id, status = store.add(command.get("path") or os.getcwd(), alias, seconds)
+            if command.get("tags"):
+                crud.update_tags(store.config, entry_id, add=parse_tags(command["tags"]))
+            return dict(describe(store, entry_id), status=status)
+        if op == "list":
+            sort = command.get("sort")
+            criteria = sort.lstrip("-") if sort else None
+            if criteria and criteria not in crud.SORT_KEYS:
+                raise ValueError(f"Invalid sort: '{sort}'. Use one of {', '.join(crud.SORT_KEYS)}.")
+            store = self._store(namespace)
+            entries = store.search(command.get("query"), criteria, bool(sort) and sort.startswith("-"), command.get("limit"))
+            return {"entries": [dict(describe(store, entry_id), created_at=entry["created_at"]) for entry_id, entry in entries]}
+
+        ref_namespace, ref = split_namespace(command.get("ref"))
+        if not ref:
+            raise ValueError(f"{op} needs an alias or ID")
+        store = self._store(ref_namespace or namespace)
+        if op == "delete":
+            entry_id, entry = store.remove(ref)
+            return {"id": entry_id, "alias": entry["alias"], "path": entry["path"]}
+        if op == "rename":
+            old_alias = store[store.resolve(ref)]["alias"]
+            return dict(describe(store, store.rename(ref, command.get("alias"))), old_alias=old_alias)
+        result = describe(store, store.resolve(ref))
+        result["exists"] = os.path.isdir(result["path"])
+        return result
+
+    def commit(self):
+        """Write the changes of every store with one save each; return commit results."""
+        results = []
+        for namespace, store in self._stores.items():
+            if store.uncommitted:
+                changes = store.uncommitted
+                results.append({"op": "commit", "ok": store.commit(), "ns": namespace, "changes": changes})
+        return results
+
+
+def describe(store, entry_id):
+    entry = store[entry_id]
+    return {"id": entry_id, "alias": entry["alias"], "path": entry["path"]}
+
+
+def run_batch(config, lines, out, namespace=None, commit_every=0):
+    """Run newline-delimited commands and write one NDJSON result per command.
+
+    Each result has the line number, op and ok, plus the command's fields
+    or an error. Commits (at the end, or once commit_every distinct entries
+    changed) are reported as {"op": "commit", ...} lines. Returns the number
+    of failed commands and commits.
+    """
+    batch = Batch(config, namespace)
+    commands = 0
+    failed = 0
+
+    def emit(result):
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+    def commit():
+        nonlocal failed
+        for result in batch.commit():
+            failed += not result["ok"]
+            emit(result)
+
+    for number, line in enumerate(lines, 1):
+        command = None
+        try:
+            command = parse_command(line)
+            if command is None:
+                continue
+            commands += 1
+            emit(dict(line=number, op=command["op"], ok=True, **batch.execute(command)))
+        except (ValueError, KeyError, TypeError) as e:
+            failed += 1
+            # str() of a KeyError is the repr of its message
+            message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            error_log.error(f"Batch line {number}: {message}")
+            emit({"line": number, "op": command and command["op"], "ok": False, "error": message})
+        if commit_every and batch.uncommitted >= commit_every:
+            commit()
+    commit()
+    log.info(f"Ran a batch of {commands} commands, {failed} failed")
+    return failed
@@ -2,13 +2,65 @@ import os
 import json
 import hashlib
 import time
+import bisect
+import heapq
+import itertools
 import logging
+import contextlib
 from collections import OrderedDict
 
+try:
+    import fcntl
+except ImportError:  # Windows, writers are not serialized there
+    fcntl = None
+
+from .stats import timed
+from .entries import Entry, entry_hook
+from .tags import TagIndex
+from . import paths
+
 log = logging.getLogger("log")
 error_log = logging.getLogger("error")
 
 
+DEFAULT_NAMESPACE = "default"
+
+SORT_KEYS = {
+    "alias": lambda item: item[1]["alias"].lower(),
+    "id": lambda item: item[0],
+    "path": lambda item: item[1]["path"].lower(),
+    "created": lambda item: item[1]["created_at"],
+}
+
+
+def write_atomic(path, text):
+    """Write text (str or bytes) to a temporary file next to path and rename it over path.
+
+    Readers see either the old or the new file, never a partly written one.
+    """
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "wb" if isinstance(text, bytes) else "w") as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+
+
+@contextlib.contextmanager
+def locked(f):
+    """Hold an exclusive lock on the open file f for the block, flushing it before unlocking.
+
+    Serializes the processes writing a shared file; a no-op on Windows.
+    """
+    if fcntl is None:
+        yield f
+        return
+    fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        f.flush()
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
 def create_alias_id():
     data = str(time.time()) + str(os.urandom(16))
     return hashlib.sha256(data.encode()).hexdigest()[:12]
@@ -18,10 +70,383 @@ def get_data_file(config):
     return os.path.expanduser(config.get("data_file", "~/.twd/data"))
 
 
+def namespace_config(config, namespace):
+    """Return the config for the shard that stores the given namespace.
+
+    The default namespace lives in the configured data file, every other
+    namespace in its own shard under ns/ next to it. All crud functions work
+    on a shard when passed its config.
+    """
+    if not namespace or namespace == DEFAULT_NAMESPACE:
+        return config
+    ns_config = dict(config)
+    ns_config["data_file"] = os.path.join(os.path.dirname(get_data_file(config)), "ns", namespace)
+    ns_config["namespace"] = namespace
+    ns_config["namespace_manifest"] = get_index_file(config, "namespaces")
+    ns_config.pop("layers", None)  # Shared layers only extend the default namespace
+    return ns_config
+
+
+def get_manifest_file(config):
+    return config.get("namespace_manifest") or get_index_file(config, "namespaces")
+
+
+def load_manifest(config):
+    """Return {namespace: {"file", "entries", "size"}} without opening any shard."""
+    manifest_file = get_manifest_file(config)
+    manifest = {}
+    if os.path.exists(manifest_file):
+        try:
+            with open(manifest_file, "r") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            error_log.error(f"Error reading namespace manifest: {e}")
+    if DEFAULT_NAMESPACE not in manifest:
+        default_file = manifest_file[: -len(".namespaces")]
+        manifest[DEFAULT_NAMESPACE] = {"file": default_file, "entries": None, "size": None}
+    return manifest
+
+
+@timed("update_manifest")
+def update_manifest(config, data):
+    """Record the entry count and size of the shard that was just saved.
+
+    The manifest is only rewritten when a namespace is new or its entry
+    count changed, and not at all while there are no other namespaces than
+    the default one.
+    """
+    manifest_file = get_manifest_file(config)
+    data_file = get_data_file(config)
+    namespace = config.get("namespace", DEFAULT_NAMESPACE)
+    if namespace == DEFAULT_NAMESPACE and not os.path.exists(manifest_file):
+        return
+    manifest = load_manifest(config)
+    if manifest.get(namespace, {}).get("entries") == len(data):
+        return
+    manifest[namespace] = {
+        "file": data_file,
+        "entries": len(data),
+        "size": os.path.getsize(data_file),
+    }
+    try:
+        write_atomic(manifest_file, json.dumps(manifest, indent=4, sort_keys=True))
+    except OSError as e:
+        error_log.error(f"Error writing namespace manifest: {e}")
+
+
+def forget_manifest(config):
+    """Drop the record of a deleted shard from the manifest, keeping the other namespaces."""
+    manifest_file = get_manifest_file(config)
+    if not os.path.exists(manifest_file):
+        return
+    manifest = load_manifest(config)
+    manifest.pop(config.get("namespace", DEFAULT_NAMESPACE), None)
+    if not any(name != DEFAULT_NAMESPACE for name in manifest):
+        os.remove(manifest_file)
+        return
+    write_atomic(manifest_file, json.dumps(manifest, indent=4, sort_keys=True))
+
+
+# Files kept next to the data file that belong to it and go away with it
+# ("paths" is no longer written, but older versions left it behind)
+INDEX_NAMES = (
+    "completion", "paths", "here", "expiry", "tags", "layers", "journal", "sync", "history", "discover",
+)
+
+
+def get_index_file(config, name):
+    """Path of a derived file that crud keeps next to the data file."""
+    return f"{get_data_file(config)}.{name}"
+
+
+@timed("write_completion_cache")
+def write_completion_cache(config, data):
+    """Write the sorted aliases and IDs that shell completion reads."""
+    cache_file = get_index_file(config, "completion")
+    words = set(data.keys())
+    words.update(
+        entry["alias"] for entry in data.values() if entry.get("alias") not in (None, "no_alias")
+    )
+    try:
+        write_atomic(cache_file, "\n".join(sorted(words)))
+    except OSError as e:
+        error_log.error(f"Error writing completion cache: {e}")
+
+
+def complete(config, prefix):
+    """Return all aliases and IDs starting with prefix from the completion cache."""
+    cache_file = get_index_file(config, "completion")
+    if not os.path.exists(cache_file):
+        write_completion_cache(config, load_merged(config))
+    try:
+        with open(cache_file, "r") as f:
+            content = f.read()
+        words = content.split("\n") if content else []
+    except OSError as e:
+        error_log.error(f"Error reading completion cache: {e}")
+        return []
+    matches = []
+    for word in words[bisect.bisect_left(words, prefix):]:
+        if not word.startswith(prefix):
+            break
+        matches.append(word)
+    return matches
+
+
+def record_change(config, op, entry_id, entry=None):
+    """Append a change to the sync journal once the store has been synced."""
+    if not os.path.exists(get_index_file(config, "sync")):
+        return
+    change = {"op": op, "id": entry_id}
+    if entry is not None:
+        change["entry"] = entry
+    try:
+        # sync trims the journal under the same lock
+        with open(get_index_file(config, "journal"), "a") as f, locked(f):
+            f.write(json.dumps(change, default=dict) + "\n")
+    except OSError as e:
+        error_log.error(f"Error writing sync journal: {e}")
+
+
+@timed("write_here_index")
+def write_here_index(config, data):
+    """Write the "path<TAB>alias" lines, sorted by path, that `twd --here` bisects.
+
+    Entries without an alias are listed by ID. Paths containing a tab or
+    newline cannot be represented and are left out.
+    """
+    index_file = get_index_file(config, "here")
+    # A tab sorts before any other character in a path, so sorting whole
+    # lines sorts them by path
+    lines = sorted(
+        f"{os.path.normpath(entry['path'])}\t{entry['alias'] if entry['alias'] != 'no_alias' else entry_id}\n".encode()
+        for entry_id, entry in data.items()
+        if "\t" not in entry["path"] and "\n" not in entry["path"]
+    )
+    try:
+        write_atomic(index_file, b"".join(lines))
+    except OSError as e:
+        error_log.error(f"Error writing here index: {e}")
+
+
+@timed("write_expiry_index")
+def write_expiry_index(config, data):
+    """Write the sorted [expires_at, entry ID] pairs of entries that expire.
+
+    A sorted list is a valid min-heap, so a sweep pops expired entries off
+    the front without looking at the others. Nothing is written while no
+    entry expires and the index on disk is missing or empty already.
+    """
+    index_file = get_index_file(config, "expiry")
+    deadlines = sorted(
+        [entry["expires_at"], entry_id] for entry_id, entry in data.items() if entry.get("expires_at") is not None
+    )
+    if not deadlines:
+        try:
+            if os.path.getsize(index_file) <= len("[]"):
+                return deadlines
+        except FileNotFoundError:
+            return deadlines
+        except OSError:
+            pass
+    try:
+        write_atomic(index_file, json.dumps(deadlines, separators=(",", ":")))
+    except OSError as e:
+        error_log.error(f"Error writing expiry index: {e}")
+    return deadlines
+
+
+def get_layers(config):
+    """Paths of the read-only layers under the data file, highest precedence first."""
+    return [os.path.expanduser(layer) for layer in config.get("layers") or []]
+
+
+def layer_stamp(config):
+    """The (path, mtime_ns, size) of every layer, None for missing ones."""
+    stamp = []
+    for layer in get_layers(config):
+        try:
+            st = os.stat(layer)
+            stamp.append([layer, st.st_mtime_ns, st.st_size])
+        except OSError:
+            stamp.append([layer, None, None])
+    return stamp
+
+
+@timed("load_shared")
+def load_shared(config):
+    """Return the merged entries of the read-only layers.
+
+    The merge is cached in data.layers with the mtime and size of every
+    layer and only redone when one of them changed. An entry of an earlier
+    layer hides entries with the same ID or path in later ones.
+    """
+    if not config.get("layers"):
+        return {}
+    stamp = layer_stamp(config)
+    cache_file = get_index_file(config, "layers")
+    try:
+        with open(cache_file, "r") as f:
+            cache = json.load(f, object_hook=entry_hook)
+        if cache.get("stamp") == stamp:
+            return cache["entries"]
+    except FileNotFoundError:
+        pass
+    except (OSError, json.JSONDecodeError, AttributeError, KeyError) as e:
+        error_log.error(f"Error reading layer cache: {e}")
+
+    shared = {}
+    seen = set()
+    for layer, mtime, _ in stamp:
+        if mtime is None:
+            continue
+        try:
+            with open(layer, "r") as f:
+                entries = json.load(f, object_hook=entry_hook)
+            if paths.is_compact(entries):
+                entries = paths.decode(entries)
+        except (OSError, json.JSONDecodeError) as e:
+            error_log.error(f"Error reading layer {layer}: {e}")
+            continue
+        for entry_id, entry in entries.items():
+            path = os.path.normpath(entry["path"])
+            if entry_id not in shared and path not in seen:
+                shared[entry_id] = entry
+                seen.add(path)
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        write_atomic(cache_file, json.dumps({"stamp": stamp, "entries": shared}, separators=(",", ":"), default=dict))
+    except OSError as e:
+        error_log.error(f"Error writing layer cache: {e}")
+    log.info(f"Merged {len(shared)} entries from {len(stamp)} layers")
+    return shared
+
+
+def merge_layers(data, shared):
+    """Return the user entries over the shared ones, user entries win by ID and by path.
+
+    Without shared entries data itself is returned.
+    """
+    if not shared:
+        return data
+    user_paths = {os.path.normpath(entry["path"]) for entry in data.values()}
+    merged = {
+        entry_id: entry
+        for entry_id, entry in shared.items()
+        if entry_id not in data and os.path.normpath(entry["path"]) not in user_paths
+    }
+    merged.update(data)
+    return merged
+
+
+def load_merged(config):
+    """Load the data file with the entries of the read-only layers under it."""
+    return merge_layers(load_data(config), load_shared(config))
+
+
+def read_only_ids(config, data):
+    """Return the IDs in data that come from a read-only layer."""
+    return {entry_id for entry_id, entry in load_shared(config).items() if data.get(entry_id) == entry}
+
+
+def load_tags(config):
+    """Return the TagIndex of a store, empty if nothing was tagged yet."""
+    try:
+        with open(get_index_file(config, "tags"), "r") as f:
+            return TagIndex(json.load(f))
+    except FileNotFoundError:
+        return TagIndex()
+    except (OSError, json.JSONDecodeError) as e:
+        error_log.error(f"Error reading tag index: {e}")
+        return TagIndex()
+
+
+def save_tags(config, tags):
+    index_file = get_index_file(config, "tags")
+    try:
+        write_atomic(index_file, json.dumps(tags.postings, separators=(",", ":"), sort_keys=True))
+    except OSError as e:
+        error_log.error(f"Error writing tag index: {e}")
+        return False
+    return True
+
+
+def update_tags(config, entry_id, add=(), remove=()):
+    """Remove and then add tags of one entry (remove=None removes all of them).
+
+    The tag index is only written if the entry's tags changed.
+    """
+    tags = load_tags(config)
+    before = tags.tags_of(entry_id)
+    tags.remove(entry_id, remove)
+    tags.add(entry_id, add)
+    if tags.tags_of(entry_id) != before:
+        save_tags(config, tags)
+    return tags
+
+
+def untag_entries(config, entry_ids):
+    """Drop deleted entries from the tag index, if the store has one."""
+    if not entry_ids or not os.path.exists(get_index_file(config, "tags")):
+        return
+    tags = load_tags(config)
+    changed = False
+    for entry_id in entry_ids:
+        changed = tags.remove(entry_id) or changed
+    if changed:
+        save_tags(config, tags)
+
+
+def dedupe_entries(config, data):
+    """Collapse entries that point to the same directory into one.
+
+    Paths are canonicalized with os.path.realpath. The oldest entry of each
+    group is kept and takes the most recent real alias and all the tags of
+    the group. All changes are written in a single save. Returns the number
+    of removed entries.
+    """
+    groups = {}
+    for entry_id, entry in data.items():
+        groups.setdefault(os.path.realpath(entry["path"]), []).append(entry_id)
+
+    removed = {}  # removed entry ID -> ID of the entry kept instead
+    updated = []
+    for path, entry_ids in groups.items():
+        entry_ids.sort(key=lambda entry_id: data[entry_id]["created_at"])
+        keep = entry_ids[0]
+        entry = data[keep]
+        aliases = [data[entry_id]["alias"] for entry_id in entry_ids if data[entry_id]["alias"] != "no_alias"]
+        alias = aliases[-1] if aliases else entry["alias"]
+        if entry["path"] != path or entry["alias"] != alias:
+            data[keep] = Entry.from_mapping(dict(entry, path=path, alias=alias))
+            updated.append(keep)
+        for entry_id in entry_ids[1:]:
+            del data[entry_id]
+            removed[entry_id] = keep
+
+    if removed or updated:
+        save_data(config, data)
+        for entry_id in updated:
+            record_change(config, "put", entry_id, data[entry_id])
+        for entry_id in removed:
+            record_change(config, "del", entry_id)
+        if os.path.exists(get_index_file(config, "tags")):
+            tags = load_tags(config)
+            changed = False
+            for entry_id, keep in removed.items():
+                changed = tags.add(keep, tags.tags_of(entry_id)) or changed
+                changed = tags.remove(entry_id) or changed
+            if changed:
+                save_tags(config, tags)
+        log.info(f"Removed {len(removed)} duplicate entries")
+    return len(removed)
+
+
 def ensure_data_file_exists(config):
     data_file = get_data_file(config)
     if not os.path.exists(data_file):
         try:
+            os.makedirs(os.path.dirname(data_file), exist_ok=True)
             with open(data_file, "w") as f:
                 json.dump({}, f)
             log.info(f"Created data file at {data_file}")
@@ -29,15 +454,18 @@ def ensure_data_file_exists(config):
             error_log.error(f"Error creating data file: {e}")
 
 
+@timed("load_data")
 def load_data(config):
     data_file = get_data_file(config)
     if not os.path.exists(data_file):
         ensure_data_file_exists(config)
     try:
         with open(data_file, "r") as f:
-            data = json.load(f)
-            log.info(f"Loaded data from {data_file}")
-            return data
+            data = json.load(f, object_hook=entry_hook)
+        if paths.is_compact(data):
+            data = paths.decode(data)
+        log.info(f"Loaded data from {data_file}")
+        return data
     except json.JSONDecodeError as e:
         error_log.error(f"Error reading data file: {e}")
         return {}
@@ -46,57 +474,173 @@ def load_data(config):
         return {}
 
 
+@timed("save_data")
 def save_data(config, data):
     data_file = get_data_file(config)
     try:
         sorted_data = OrderedDict(
             sorted(data.items(), key=lambda item: item[1]["alias"])
         )
-        with open(data_file, "w") as f:
-            json.dump(sorted_data, f, indent=4)
+        # Write next to the data file and rename, so an interrupted save
+        # (e.g. the TWD screen exiting mid-write) never leaves it truncated
+        tmp_file = f"{data_file}.tmp"
+        with open(tmp_file, "w") as f:
+            if config.get("compact_paths"):
+                # Each directory once as (parent, name), see paths.encode
+                json.dump(paths.encode(sorted_data), f, separators=(",", ":"))
+            else:
+                json.dump(sorted_data, f, indent=4, default=dict)
+        os.replace(tmp_file, data_file)
         log.info(f"Saved data to {data_file}")
     except OSError as e:
         error_log.error(f"Error writing to data file: {e}")
+        return False
+    # Shared entries can be completed and show up in prompts too
+    indexed = merge_layers(data, load_shared(config))
+    write_completion_cache(config, indexed)
+    write_here_index(config, indexed)
+    write_expiry_index(config, data)
+    update_manifest(config, data)
+    return True
 
 
-def create_entry(config, data, path, alias=None):
+@timed("create_entry")
+def create_entry(config, data, path, alias=None, tags=None):
     alias_id = create_alias_id()
-    data[alias_id] = {
-        "path": path,
-        "alias": alias if alias else "no_alias",
-        "created_at": time.time(),
-    }
+    data[alias_id] = Entry(path, alias if alias else "no_alias", time.time())
     save_data(config, data)
+    if tags:
+        update_tags(config, alias_id, add=tags)
+    record_change(config, "put", alias_id, data[alias_id])
     log.info(f"Created new entry with alias_id '{alias_id}' and path '{path}'")
     return alias_id
 
 
+@timed("create_entries")
+def create_entries(config, data, entries):
+    """Add (path, alias) pairs with a single save; returns the new IDs."""
+    created_at = time.time()
+    entry_ids = []
+    for path, alias in entries:
+        alias_id = create_alias_id()
+        while alias_id in data:
+            alias_id = create_alias_id()
+        data[alias_id] = Entry(path, alias if alias else "no_alias", created_at)
+        entry_ids.append(alias_id)
+    save_data(config, data)
+    for alias_id in entry_ids:
+        record_change(config, "put", alias_id, data[alias_id])
+    log.info(f"Created {len(entry_ids)} new entries")
+    return entry_ids
+
+
+@timed("delete_entry")
 def delete_entry(config, data, entry_id):
     if entry_id in data:
         del data[entry_id]
         save_data(config, data)
+        untag_entries(config, [entry_id])
+        record_change(config, "del", entry_id)
         log.info(f"Deleted entry with alias_id '{entry_id}'")
     else:
         error_log.error(f"Entry ID '{entry_id}' not found")
         raise KeyError(f"Entry ID {entry_id} not found")
 
 
-def update_entry(config, data, entry_id, entry):
+@timed("delete_entries")
+def delete_entries(config, data, entry_ids):
+    """Delete several entries with a single save."""
+    missing = [entry_id for entry_id in entry_ids if entry_id not in data]
+    if missing:
+        error_log.error(f"Entry IDs not found: {', '.join(missing)}")
+        raise KeyError(f"Entry IDs {', '.join(missing)} not found")
+    for entry_id in entry_ids:
+        del data[entry_id]
+    save_data(config, data)
+    untag_entries(config, entry_ids)
+    for entry_id in entry_ids:
+        record_change(config, "del", entry_id)
+    log.info(f"Deleted {len(entry_ids)} entries")
+
+
+@timed("update_entry")
+def update_entry(config, data, entry_id, entry, tags=None):
+    """Replace an entry; tags, if given, replace its tags too."""
     if entry_id in data:
-        data[entry_id] = entry
+        data[entry_id] = Entry.from_mapping(entry)
         save_data(config, data)
+        if tags is not None:
+            update_tags(config, entry_id, add=tags, remove=None)
+        record_change(config, "put", entry_id, data[entry_id])
         log.info(f"Updated entry with alias_id '{entry_id}'")
     else:
         error_log.error(f"Entry ID '{entry_id}' not found")
         raise KeyError(f"Entry ID {entry_id} not found")
 
 
+@timed("write_changes")
+def write_changes(config, data, changes):
+    """Apply {entry ID: entry, or None to delete it} with a single save.
+
+    Changes may have been made against an older copy of the store: entries
+    that were deleted in the meantime are not re-added and deleting a
+    missing entry is not an error. Returns False if the save failed.
+    """
+    applied = {}
+    for entry_id, entry in changes.items():
+        if entry is None:
+            if data.pop(entry_id, None) is not None:
+                applied[entry_id] = None
+        elif entry_id in data:
+            data[entry_id] = applied[entry_id] = Entry.from_mapping(entry)
+    return commit_changes(config, data, applied)
+
+
+@timed("commit_changes")
+def commit_changes(config, data, changes):
+    """Save data that already contains changes and journal them for sync.
+
+    changes is {entry ID: entry, or None if it was deleted}. Returns False
+    if the save failed.
+    """
+    if not save_data(config, data):
+        return False
+    untag_entries(config, [entry_id for entry_id, entry in changes.items() if entry is None])
+    for entry_id, entry in changes.items():
+        record_change(config, "del" if entry is None else "put", entry_id, entry)
+    log.info(f"Wrote {len(changes)} changed entries")
+    return True
+
+
+def iter_entries(data, sort=None, descending=False, limit=None):
+    """Yield (entry_id, entry) pairs, optionally sorted and limited.
+
+    With both sort and limit only the best limit entries are kept in a heap
+    instead of sorting the whole store.
+    """
+    items = data.items()
+    if sort is None:
+        yield from itertools.islice(items, limit)
+        return
+    key = SORT_KEYS[sort]
+    if limit is not None:
+        select = heapq.nlargest if descending else heapq.nsmallest
+        yield from select(limit, items, key=key)
+    else:
+        yield from sorted(items, key=key, reverse=descending)
+
+
 def delete_data_file(config):
     data_file = get_data_file(config)
     if os.path.exists(data_file):
         try:
             os.remove(data_file)
             log.info(f"Deleted data file at {data_file}")
+            for name in INDEX_NAMES:
+                index_file = get_index_file(config, name)
+                if os.path.exists(index_file):
+                    os.remove(index_file)
+            forget_manifest(config)
         except OSError as e:
             error_log.error(f"Error deleting data file: {e}")
             raise
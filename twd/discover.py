@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import fnmatch
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from . import crud
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+PROJECT_MARKERS = {
+    ".git",
+    ".hg",
+    ".svn",
+    "pyproject.toml",
+    "setup.py",
+    "package.json",
+    "Cargo.toml",
+    "go.mod",
+    "pom.xml",
+    "build.gradle",
+    "Gemfile",
+    "composer.json",
+    "CMakeLists.txt",
+}
+DEFAULT_IGNORE = [".*", "node_modules", "__pycache__", "venv", "site-packages", "target", "dist", "build"]
+
+_visited_lock = threading.Lock()
+
+
+def scan_directory(path, cached=None, visited=None):
+    """List one directory, or reuse the cached listing if its mtime is unchanged.
+
+    Returns [mtime_ns, is_project, subdirs], or None if the directory cannot
+    be read or its (st_dev, st_ino) is already in visited. A directory's
+    mtime changes whenever an entry is added, removed or renamed in it,
+    which is all the listing depends on.
+    """
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        error_log.error(f"Error reading {path}: {e}")
+        return None
+    if visited is not None:
+        with _visited_lock:
+            if (st.st_dev, st.st_ino) in visited:
+                return None
+            visited.add((st.st_dev, st.st_ino))
+    if cached is not None and cached[0] == st.st_mtime_ns:
+        return cached
+    is_project = False
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name in PROJECT_MARKERS:
+                    is_project = True
+                try:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                except OSError:
+                    pass  # Dangling symlink or vanished entry
+    except OSError as e:
+        error_log.error(f"Error reading {path}: {e}")
+        return None
+    return [st.st_mtime_ns, is_project, sorted(subdirs)]
+
+
+def is_ignored(name, path, ignore):
+    return any(fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern) for pattern in ignore)
+
+
+def walk(roots, max_depth=None, ignore=DEFAULT_IGNORE, cache=None, workers=None):
+    """Find project roots below roots, scanning directories on a thread pool.
+
+    A directory containing one of PROJECT_MARKERS is a project root and is
+    not descended into. Directories are identified by device and inode, so
+    symlink loops and roots nested in other roots are only scanned once.
+
+    cache maps directory paths to their listing from a previous walk.
+    Returns (sorted real paths of the project roots, cache for the next walk).
+    """
+    cache = cache or {}
+    new_cache = {}
+    found = set()
+    visited = set()
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for root in roots:
+            path = os.path.abspath(os.path.expanduser(root))
+            pending[pool.submit(scan_directory, path, cache.get(path), visited)] = (path, 0)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, depth = pending.pop(future)
+                listing = future.result()
+                if listing is None:
+                    continue
+                new_cache[path] = listing
+                _, is_project, subdirs = listing
+                if is_project:
+                    found.add(os.path.realpath(path))
+                    continue
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                for name in subdirs:
+                    subdir = os.path.join(path, name)
+                    if not is_ignored(name, subdir, ignore):
+                        pending[pool.submit(scan_directory, subdir, cache.get(subdir), visited)] = (subdir, depth + 1)
+    return sorted(found), new_cache
+
+
+def load_cache(cache_file):
+    try:
+        with open(cache_file, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        error_log.error(f"Error reading discovery cache: {e}")
+        return {}
+
+
+def save_cache(cache_file, cache):
+    try:
+        crud.write_atomic(cache_file, json.dumps(cache, separators=(",", ":")))
+    except OSError as e:
+        error_log.error(f"Error writing discovery cache: {e}")
+
+
+def merge_cache(cache, scanned):
+    """Update cache with a walk, dropping directories that no longer exist.
+
+    Listings the walk did not reach (other trees, or below the depth limit)
+    are kept unless their parent was listed again without them.
+    """
+    merged = {}
+    for path in sorted(cache):
+        if path in scanned:
+            continue
+        parent = os.path.dirname(path)
+        if parent in scanned:
+            _, is_project, subdirs = scanned[parent]
+            if is_project or os.path.basename(path) not in subdirs:
+                continue
+        elif parent in cache and parent not in merged:
+            continue  # The parent was dropped
+        merged[path] = cache[path]
+    merged.update(scanned)
+    return merged
+
+
+def make_alias(path, taken):
+    """Derive an unused alias from the directory name and reserve it in taken."""
+    base = re.sub(r"[^\w-]+", "-", os.path.basename(path)).strip("-") or "project"
+    alias = base
+    n = 2
+    while alias in taken:
+        alias = f"{base}-{n}"
+        n += 1
+    taken.add(alias)
+    return alias
+
+
+def discover(config, roots, max_depth=None, ignore=DEFAULT_IGNORE, workers=None):
+    """Find project roots below roots and save the new ones in a single write.
+
+    The directory listings are cached next to the data file, so a re-run
+    only lists the directories that changed since the last discovery.
+    Returns (number of project roots found, list of (entry ID, alias, path)
+    for the entries that were added).
+    """
+    cache_file = crud.get_index_file(config, "discover")
+    cache = load_cache(cache_file)
+    found, scanned = walk(roots, max_depth, ignore, cache, workers)
+    save_cache(cache_file, merge_cache(cache, scanned))
+
+    data = crud.load_data(config)
+    saved = {os.path.normpath(entry["path"]) for entry in data.values()}
+    taken = {entry["alias"] for entry in data.values()}
+    new = [(path, make_alias(path, taken)) for path in found if path not in saved]
+    entry_ids = crud.create_entries(config, data, new) if new else []
+    log.info(f"Discovered {len(found)} projects under {', '.join(roots)}, added {len(new)}")
+    return len(found), [(entry_id, alias, path) for entry_id, (path, alias) in zip(entry_ids, new)]
@@ -0,0 +1,111 @@
+import sys
+from collections.abc import Mapping
+
+FIELDS = ("path", "alias", "created_at")
+
+
+class Entry(Mapping):
+    """One saved directory, readable like the dict it is stored as.
+
+    Entries keep their fields in slots instead of a per-entry dict, which
+    takes less than half the memory for large stores, and aliases are
+    interned since many entries share one (often "no_alias"). Fields beyond
+    the core ones are kept in extra. Entries are not changed in place;
+    updates replace them, e.g. with entry.replace(alias=...).
+    """
+
+    __slots__ = ("path", "alias", "created_at", "extra")
+
+    def __init__(self, path, alias, created_at, extra=None):
+        self.path = path
+        self.alias = sys.intern(alias)
+        self.created_at = created_at
+        self.extra = extra or None
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        if isinstance(mapping, Entry):
+            return mapping
+        extra = {key: value for key, value in mapping.items() if key not in FIELDS}
+        return cls(mapping["path"], mapping["alias"], mapping["created_at"], extra)
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def replace(self, **changes):
+        return Entry.from_mapping(dict(self, **changes))
+
+    def __repr__(self):
+        return f"Entry({dict(self)!r})"
+
+
+def entry_hook(obj):
+    """json object_hook that decodes entries straight into Entry objects."""
+    if "path" in obj and "alias" in obj and "created_at" in obj:
+        if len(obj) == len(FIELDS):
+            return Entry(obj["path"], obj["alias"], obj["created_at"])
+        return Entry.from_mapping(obj)
+    return obj
+
+
+class EntryView(Mapping):
+    """An ordered selection of entries from a store that only holds their IDs.
+
+    Filtering and sorting return views instead of copying entries into new
+    dicts. Entries are looked up in the store on access; deleting from a
+    view only removes the ID from the view.
+    """
+
+    __slots__ = ("store", "ids", "_members")
+
+    def __init__(self, store, ids=None):
+        # A view of a view selects from the same store
+        self.store = store.store if isinstance(store, EntryView) else store
+        self.ids = list(store) if ids is None else ids
+        self._members = None
+
+    def __contains__(self, entry_id):
+        if self._members is None:
+            self._members = set(self.ids)
+        return entry_id in self._members
+
+    def __getitem__(self, entry_id):
+        if entry_id not in self:
+            raise KeyError(entry_id)
+        return self.store[entry_id]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __delitem__(self, entry_id):
+        self.ids.remove(entry_id)
+        if self._members is not None:
+            self._members.discard(entry_id)
+
+    def discard(self, entry_ids):
+        """Remove several IDs from the view in one pass."""
+        entry_ids = set(entry_ids)
+        self.ids[:] = [entry_id for entry_id in self.ids if entry_id not in entry_ids]
+        if self._members is not None:
+            self._members -= entry_ids
+
+    def id_at(self, index):
+        return self.ids[index]
+
+    def __repr__(self):
+        return f"EntryView({len(self.ids)} of {len(self.store)} entries)"
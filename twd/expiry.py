@@ -0,0 +1,68 @@
+import json
+import time
+import heapq
+import logging
+
+from . import crud
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+
+def load_deadlines(config, data=None):
+    """Return the [expires_at, entry ID] min-heap of the store.
+
+    It is read from the expiry index, which crud writes on every save that
+    involves an expiring entry, so a missing index means nothing expires.
+    An unreadable index is rebuilt, in memory only when data is passed.
+    """
+    index_file = crud.get_index_file(config, "expiry")
+    try:
+        with open(index_file, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, json.JSONDecodeError) as e:
+        error_log.error(f"Error reading expiry index: {e}")
+    if data is not None:
+        return sorted([entry["expires_at"], entry_id] for entry_id, entry in data.items() if entry.get("expires_at") is not None)
+    return crud.write_expiry_index(config, crud.load_data(config))
+
+
+def expired_ids(config, now=None, data=None):
+    """Return the IDs of entries whose deadline passed, touching only those."""
+    now = time.time() if now is None else now
+    deadlines = load_deadlines(config, data)
+    expired = []
+    while deadlines and deadlines[0][0] <= now:
+        expired.append(heapq.heappop(deadlines)[1])
+    return expired
+
+
+def is_expired(entry, now=None):
+    expires_at = entry.get("expires_at")
+    return expires_at is not None and expires_at <= (time.time() if now is None else now)
+
+
+def sweep(config, now=None):
+    """Delete the expired entries of a store with a single write; returns their IDs.
+
+    Costs one read of the small expiry index when nothing has expired.
+    """
+    now = time.time() if now is None else now
+    expired = expired_ids(config, now)
+    if not expired:
+        return []
+    data = crud.load_data(config)
+    changes = {}
+    for entry_id in expired:
+        # The entry may have been renewed since the index was written
+        if entry_id in data and is_expired(data[entry_id], now):
+            del data[entry_id]
+            changes[entry_id] = None
+    if changes:
+        crud.commit_changes(config, data, changes)
+    else:
+        crud.write_expiry_index(config, data)
+    log.info(f"Removed {len(changes)} expired entries")
+    return list(changes)
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import mmap
+import time
+
+# crud (and with it most of twd) is only imported to rebuild a stale index,
+# `twd --here` runs on every prompt
+
+
+def find_line(index, key):
+    """Bisect the sorted "path<TAB>alias" lines of index for path key; return the alias or None."""
+    lo, hi = 0, len(index)
+    # lo and hi are always at the start of a line
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = index.rfind(b"\n", 0, mid) + 1
+        end = index.find(b"\n", start)
+        if end < 0:
+            end = len(index)
+        tab = index.find(b"\t", start, end)
+        path = index[start:tab if tab >= 0 else end]
+        if path < key:
+            lo = end + 1
+        elif path > key:
+            hi = start
+        else:
+            return index[tab + 1:end].decode() if tab >= 0 else None
+    return None
+
+
+def lookup(index_file, path):
+    """Return the alias of the deepest saved directory containing path, or None.
+
+    Each ancestor of path is looked up by bisecting the memory-mapped index,
+    so a lookup takes O(depth * log entries) and never reads the whole file.
+    """
+    try:
+        with open(index_file, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as index:
+                path = os.path.normpath(path)
+                while True:
+                    alias = find_line(index, os.fsencode(path))
+                    if alias is not None:
+                        return alias
+                    parent = os.path.dirname(path)
+                    if parent == path:
+                        return None
+                    path = parent
+    except FileNotFoundError:
+        return None
+
+
+def has_expired(expiry_file, now=None):
+    """True if the first deadline of the expiry index (a sorted [expires_at, ID] list) has passed."""
+    try:
+        with open(expiry_file, "r") as f:
+            deadlines = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return bool(deadlines) and deadlines[0][0] <= (time.time() if now is None else now)
+
+
+def here(config, path=None):
+    """Return the alias of the deepest bookmark containing path (default: the current directory)."""
+    if path is None:
+        path = os.getcwd()
+    path = os.path.realpath(path)
+    # Same as crud.get_data_file and crud.get_index_file
+    data_file = os.path.expanduser(config.get("data_file", "~/.twd/data"))
+    index_file = f"{data_file}.here"
+    try:
+        data_mtime = os.path.getmtime(data_file)
+    except OSError:
+        return None  # No data file, no bookmarks, whatever index is left over
+    try:
+        stale = os.path.getmtime(index_file) < data_mtime
+    except OSError:
+        stale = True
+    if has_expired(f"{data_file}.expiry"):
+        # Expired bookmarks are still in the index until a sweep rewrites it
+        from . import expiry
+
+        stale = not expiry.sweep(config) and stale
+    if stale:
+        # Written by an older version or the data file was edited by hand
+        from . import crud
+
+        crud.write_here_index(config, crud.load_merged(config))
+    return lookup(index_file, path)
+
+
+def main():
+    """`twd --here` without loading the rest of the command line, for prompts."""
+    try:
+        with open(os.path.expanduser(os.path.join("~", ".twd", "config")), "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}  # Like the full command line, fall back to the defaults
+    alias = here(config)
+    if alias is None:
+        return 1
+    sys.stdout.write(alias + "\n")
+    return 0
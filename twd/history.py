@@ -0,0 +1,118 @@
+import os
+import mmap
+import time
+import struct
+import logging
+
+from . import crud
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+MAGIC = b"TWDH"
+# magic, capacity, slot size, number of records ever written
+HEADER = struct.Struct("<4sIIQ")
+HEADER_SIZE = 32
+# timestamp, length of the encoded path that follows
+SLOT_HEADER = struct.Struct("<dH")
+DEFAULT_CAPACITY = 1000
+DEFAULT_SLOT_SIZE = 512
+
+
+def get_history_file(config):
+    return crud.get_index_file(config, "history")
+
+
+class History:
+    """Recent jumps in a fixed-size, memory-mapped ring buffer.
+
+    The file is a header followed by capacity slots of slot_size bytes, each
+    holding a timestamp and a path. A record overwrites the oldest slot and
+    bumps the counter in the header, so it costs the same no matter how many
+    jumps came before and the file never grows. Reads walk the slots from
+    the newest one and decode only as many as they need.
+
+    An existing file keeps the capacity and slot size it was created with.
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, slot_size=DEFAULT_SLOT_SIZE):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) < HEADER_SIZE:
+            self._create(capacity, slot_size)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.capacity, self.slot_size, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or len(self._map) < HEADER_SIZE + self.capacity * self.slot_size:
+            self.close()
+            raise ValueError(f"Not a TWD history file: {path}")
+
+    def _create(self, capacity, slot_size):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        header = HEADER.pack(MAGIC, capacity, slot_size, 0)
+        crud.write_atomic(self.path, header.ljust(HEADER_SIZE + capacity * slot_size, b"\0"))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return min(self._count(), self.capacity)
+
+    def _count(self):
+        return HEADER.unpack_from(self._map, 0)[3]
+
+    def append(self, path, when=None):
+        """Record a jump to path; returns False if the path does not fit a slot."""
+        encoded = path.encode("utf-8", "surrogateescape")
+        if SLOT_HEADER.size + len(encoded) > self.slot_size:
+            log.info(f"Not recording history for path longer than {self.slot_size} bytes: {path}")
+            return False
+        with crud.locked(self._file):
+            count = self._count()
+            offset = HEADER_SIZE + (count % self.capacity) * self.slot_size
+            SLOT_HEADER.pack_into(self._map, offset, time.time() if when is None else when, len(encoded))
+            start = offset + SLOT_HEADER.size
+            self._map[start:start + len(encoded)] = encoded
+            # The slot is complete before the counter makes it visible
+            HEADER.pack_into(self._map, 0, MAGIC, self.capacity, self.slot_size, count + 1)
+        return True
+
+    def __iter__(self):
+        """Yield (path, timestamp) from the newest record to the oldest."""
+        count = self._count()
+        for i in range(count - 1, max(count - self.capacity, 0) - 1, -1):
+            offset = HEADER_SIZE + (i % self.capacity) * self.slot_size
+            when, length = SLOT_HEADER.unpack_from(self._map, offset)
+            length = min(length, self.slot_size - SLOT_HEADER.size)
+            start = offset + SLOT_HEADER.size
+            yield self._map[start:start + length].decode("utf-8", "surrogateescape"), when
+
+    def recent(self, limit=None, exclude=()):
+        """Return the most recent distinct (path, timestamp) pairs, newest first."""
+        seen = set(exclude)
+        result = []
+        for path, when in self:
+            if limit is not None and len(result) >= limit:
+                break
+            if path not in seen:
+                seen.add(path)
+                result.append((path, when))
+        return result
+
+
+def open_history(config):
+    """Open the history next to the data file, or None if it is disabled."""
+    capacity = config.get("history_size", DEFAULT_CAPACITY)
+    if not capacity:
+        return None
+    try:
+        return History(get_history_file(config), capacity)
+    except (OSError, ValueError) as e:
+        error_log.error(f"Error opening history: {e}")
+        return None
@@ -0,0 +1,85 @@
+import bisect
+
+from .query import prefix_range
+
+
+def common_prefix_length(a, b):
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+class IdIndex:
+    """Sorted entry IDs for bisect lookups and shortest unique prefixes.
+
+    Like git does for commit hashes, every ID is shown with the shortest
+    prefix (at least min_length characters) that no other ID shares. Since
+    the IDs are sorted, that only depends on the two neighbours of an ID, so
+    it is computed on demand and inserts and deletes only have to keep the
+    list sorted.
+    """
+
+    def __init__(self, ids=(), min_length=4):
+        self.ids = sorted(ids)
+        self.min_length = min_length
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, entry_id):
+        i = bisect.bisect_left(self.ids, entry_id)
+        return i < len(self.ids) and self.ids[i] == entry_id
+
+    def add(self, entry_id):
+        if entry_id not in self:
+            bisect.insort(self.ids, entry_id)
+
+    def remove(self, entry_id):
+        i = bisect.bisect_left(self.ids, entry_id)
+        if i < len(self.ids) and self.ids[i] == entry_id:
+            del self.ids[i]
+
+    def unique_prefix(self, entry_id):
+        """Return the shortest prefix of entry_id that matches no other ID."""
+        i = bisect.bisect_left(self.ids, entry_id)
+        shared = 0
+        if i > 0:
+            shared = common_prefix_length(self.ids[i - 1], entry_id)
+        j = i + 1 if i < len(self.ids) and self.ids[i] == entry_id else i
+        if j < len(self.ids):
+            shared = max(shared, common_prefix_length(self.ids[j], entry_id))
+        return entry_id[: max(self.min_length, shared + 1)]
+
+    def resolve(self, prefix):
+        """Return all IDs starting with prefix."""
+        start, end = prefix_range(self.ids, prefix)
+        return self.ids[start:end]
+
+
+class AliasIndex:
+    """Sorted (alias, entry ID) pairs for alias prefix lookups.
+
+    Built once per loaded store and kept sorted with bisect on changes, so
+    a lookup never sorts.
+    """
+
+    def __init__(self, data=None):
+        self.pairs = sorted((entry["alias"], entry_id) for entry_id, entry in (data or {}).items())
+
+    def add(self, alias, entry_id):
+        i = bisect.bisect_left(self.pairs, (alias, entry_id))
+        if i == len(self.pairs) or self.pairs[i] != (alias, entry_id):
+            self.pairs.insert(i, (alias, entry_id))
+
+    def remove(self, alias, entry_id):
+        i = bisect.bisect_left(self.pairs, (alias, entry_id))
+        if i < len(self.pairs) and self.pairs[i] == (alias, entry_id):
+            del self.pairs[i]
+
+    def match(self, prefix):
+        """Return the IDs of entries whose alias starts with prefix, ordered by alias."""
+        start = bisect.bisect_left(self.pairs, (prefix,))
+        end = bisect.bisect_left(self.pairs, (prefix + "\uffff",))
+        return [entry_id for _, entry_id in self.pairs[start:end]]
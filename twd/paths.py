@@ -0,0 +1,164 @@
+import sys
+
+from .entries import Entry
+
+# Version marker of the compact data file written with "compact_paths"
+FORMAT = 2
+ELLIPSIS = "..."
+
+
+def components(path):
+    """Split a path into the list of its directory names."""
+    return [name for name in path.split("/") if name]
+
+
+def join(parts):
+    return "/" + "/".join(parts)
+
+
+def shorten(parts, mode):
+    """Shorten path components for display; mode 0 = full, 1 = medium, 2 = short.
+
+    Medium keeps the first 2 and last 2 components, short the first and
+    the last one, with ELLIPSIS in between.
+    """
+    if mode == 1 and len(parts) > 4:
+        return parts[:2] + [ELLIPSIS] + parts[-2:]
+    if mode == 2 and len(parts) > 2:
+        return [parts[0], ELLIPSIS, parts[-1]]
+    return parts
+
+
+def display_length(parts):
+    """Length of the joined form of parts, without joining them."""
+    return sum(map(len, parts)) + len(parts) if parts else 1
+
+
+class DirNode:
+    __slots__ = ("parent", "name", "children", "entries")
+
+    def __init__(self, parent, name):
+        self.parent = parent
+        self.name = name
+        self.children = None
+        self.entries = None
+
+    @property
+    def path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return join(reversed(parts))
+
+
+class PathTrie:
+    """Saved paths as a tree of directories, each name stored once and interned.
+
+    Every node is a (parent, name) pair, so paths sharing a prefix share its
+    nodes. Entry IDs are kept on the node of their directory, which makes
+    "all entries under X" a walk of the subtree below X.
+    """
+
+    def __init__(self, data=None):
+        self.root = DirNode(None, "")
+        for entry_id, entry in (data or {}).items():
+            self.add(entry_id, entry["path"])
+
+    def node(self, path, create=False):
+        """Return the node of path, or None if no saved path goes through it."""
+        node = self.root
+        for name in components(path):
+            child = node.children.get(name) if node.children else None
+            if child is None:
+                if not create:
+                    return None
+                if node.children is None:
+                    node.children = {}
+                name = sys.intern(name)
+                child = node.children[name] = DirNode(node, name)
+            node = child
+        return node
+
+    def add(self, entry_id, path):
+        node = self.node(path, create=True)
+        if node.entries is None:
+            node.entries = []
+        node.entries.append(entry_id)
+        return node
+
+    def remove(self, entry_id, path):
+        """Forget entry_id at path and prune the directories nothing is saved below any more."""
+        node = self.node(path)
+        if node is None or not node.entries or entry_id not in node.entries:
+            return
+        node.entries.remove(entry_id)
+        while node.parent is not None and not node.entries and not node.children:
+            del node.parent.children[node.name]
+            if not node.parent.children:
+                node.parent.children = None
+            node = node.parent
+
+    def under(self, path):
+        """Return the IDs of the entries saved at path or below it."""
+        node = self.node(path)
+        if node is None:
+            return []
+        result = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.entries:
+                result.extend(node.entries)
+            if node.children:
+                stack.extend(node.children.values())
+        return result
+
+
+def encode(data):
+    """Return the compact form of a store for the data file.
+
+    Directories become [parent index, name] pairs in "dirs", parents before
+    their children and -1 for the root, and each entry refers to the index
+    of its directory as "dir" instead of repeating the full path. Paths that
+    do not survive the round trip (relative ones, trailing slashes) keep
+    their "path".
+    """
+    dirs = []
+    index = {}
+    entries = {}
+    for entry_id, entry in data.items():
+        fields = dict(entry)
+        path = fields.pop("path")
+        parts = components(path)
+        if join(parts) != path:
+            entries[entry_id] = dict(fields, path=path)
+            continue
+        parent = -1
+        for name in parts:
+            key = (parent, name)
+            if key not in index:
+                index[key] = len(dirs)
+                dirs.append([parent, name])
+            parent = index[key]
+        entries[entry_id] = dict(fields, dir=parent)
+    return {"format": FORMAT, "dirs": dirs, "entries": entries}
+
+
+def decode(obj):
+    """Rebuild {entry ID: Entry} from the compact form written by encode."""
+    paths = []
+    for parent, name in obj["dirs"]:
+        paths.append(f"{paths[parent] if parent >= 0 else ''}/{sys.intern(name)}")
+    data = {}
+    for entry_id, fields in obj["entries"].items():
+        if "dir" in fields:
+            directory = fields.pop("dir")
+            fields["path"] = paths[directory] if directory >= 0 else "/"
+        data[entry_id] = Entry.from_mapping(fields)
+    return data
+
+
+def is_compact(obj):
+    return isinstance(obj, dict) and obj.get("format") == FORMAT and "entries" in obj
@@ -0,0 +1,149 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+
+def read_git_branch(path):
+    """Return the checked out git branch for path, or None if not in a repo."""
+    current = path
+    while True:
+        git_path = os.path.join(current, ".git")
+        head_file = None
+        if os.path.isdir(git_path):
+            head_file = os.path.join(git_path, "HEAD")
+        elif os.path.isfile(git_path):
+            # Worktrees and submodules store a pointer to the real git dir
+            try:
+                with open(git_path, "r") as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if line.startswith("gitdir:"):
+                git_dir = line[len("gitdir:"):].strip()
+                if not os.path.isabs(git_dir):
+                    git_dir = os.path.join(current, git_dir)
+                head_file = os.path.join(git_dir, "HEAD")
+        if head_file:
+            try:
+                with open(head_file, "r") as f:
+                    head = f.readline().strip()
+            except OSError:
+                return None
+            if head.startswith("ref: refs/heads/"):
+                return head[len("ref: refs/heads/"):]
+            return head[:7] if head else None
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+class DirectoryPreview:
+    """Load directory listings off the UI thread.
+
+    Only the most recently requested path is ever loaded; requests that are
+    superseded before the worker picks them up are dropped, and a listing in
+    progress is abandoned as soon as a newer path is requested. Finished
+    previews are kept in an LRU cache keyed by (path, mtime), so revisiting a
+    directory is free until its contents change.
+    """
+
+    def __init__(self, cache_size=64, max_items=200):
+        self.cache_size = cache_size
+        self.max_items = max_items
+        self._cache = OrderedDict()
+        self._cond = threading.Condition()
+        self._wanted = None
+        self._result = None
+        self._thread = None
+        self._stopped = False
+
+    def request(self, path):
+        """Ask for a preview of path and return it if it is already loaded."""
+        with self._cond:
+            if self._result is not None and self._result["path"] == path:
+                return self._result
+            if self._wanted != path:
+                self._wanted = path
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        return None
+
+    def pending(self):
+        """Return True while a requested preview has not been delivered yet."""
+        with self._cond:
+            return self._wanted is not None
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _is_stale(self, path):
+        return self._stopped or (self._wanted is not None and self._wanted != path)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._wanted is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                path = self._wanted
+            preview = self._load(path)
+            with self._cond:
+                if preview is not None and self._wanted == path:
+                    self._result = preview
+                    self._wanted = None
+
+    def _load(self, path):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError as e:
+            return {"path": path, "branch": None, "items": [], "truncated": False, "error": str(e)}
+
+        key = (path, mtime)
+        with self._cond:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        items = []
+        truncated = False
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if self._is_stale(path):
+                        return None
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    items.append((not is_dir, entry.name.lower(), entry.name + ("/" if is_dir else "")))
+        except OSError as e:
+            return {"path": path, "branch": None, "items": [], "truncated": False, "error": str(e)}
+
+        items.sort()
+        if len(items) > self.max_items:
+            items = items[: self.max_items]
+            truncated = True
+        preview = {
+            "path": path,
+            "branch": read_git_branch(path),
+            "items": [name for _, _, name in items],
+            "truncated": truncated,
+            "error": None,
+        }
+
+        with self._cond:
+            self._cache[key] = preview
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return preview
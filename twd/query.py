@@ -0,0 +1,196 @@
+import os
+import re
+import time
+import bisect
+import fnmatch
+import logging
+from datetime import datetime
+
+from .entries import EntryView
+from .paths import PathTrie
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+RELATIVE_TIME = re.compile(r"^(\d+)([smhdw])$")
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_time(value):
+    """Parse an ISO date/datetime, epoch seconds or a relative age like 7d."""
+    match = RELATIVE_TIME.match(value)
+    if match:
+        return time.time() - int(match.group(1)) * TIME_UNITS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"Invalid time: '{value}'. Use an ISO date like 2024-01-31, epoch seconds or an age like 7d."
+        )
+
+
+def parse_duration(value):
+    """Parse a duration like 90s, 30m, 2h, 7d or 1w, or plain seconds, into seconds."""
+    match = RELATIVE_TIME.match(value)
+    if match:
+        return int(match.group(1)) * TIME_UNITS[match.group(2)]
+    try:
+        seconds = float(value)
+    except ValueError:
+        seconds = -1
+    if seconds < 0:
+        raise ValueError(f"Invalid duration: '{value}'. Use seconds or a duration like 30m, 2h or 7d.")
+    return seconds
+
+
+def normalize_dir(path):
+    """Path with exactly one trailing slash, so prefixes match whole components."""
+    return path.rstrip("/") + "/"
+
+
+def parse_query(query):
+    """Split a query string into a list of (field, value) terms.
+
+    Supported terms are under:PATH, after:TIME, before:TIME, alias:GLOB,
+    id:PREFIX, tag:TAG and exists:yes|no. Any other word matches aliases
+    containing it, case-insensitively. All terms must match.
+    """
+    terms = []
+    for word in query.split():
+        field, sep, value = word.partition(":")
+        if sep and field in ("under", "after", "before", "alias", "id", "tag", "exists"):
+            if field in ("after", "before"):
+                value = parse_time(value)
+            elif field == "exists":
+                if value not in ("yes", "no"):
+                    raise ValueError(f"Invalid exists filter: '{value}'. Use exists:yes or exists:no.")
+                value = value == "yes"
+            elif field == "under":
+                value = normalize_dir(os.path.abspath(os.path.expanduser(value)))
+            elif field == "alias":
+                value = value.lower()
+            elif field == "tag":
+                if not value:
+                    raise ValueError("Invalid tag filter: 'tag:' needs a tag name.")
+                value = value.lower()
+            terms.append((field, value))
+        else:
+            terms.append(("text", word.lower()))
+    return terms
+
+
+def prefix_range(keys, prefix):
+    """Return the (start, end) slice of sorted keys that start with prefix."""
+    start = bisect.bisect_left(keys, prefix)
+    end = bisect.bisect_left(keys, prefix + "\uffff")
+    return start, end
+
+
+class QueryIndex:
+    """Sorted indexes over a store for answering queries without full scans.
+
+    Lowercased aliases, IDs and creation times are each kept in a sorted
+    list next to the matching entry IDs, so alias prefixes, ID prefixes and
+    time ranges are answered with bisect. Paths are kept in a PathTrie,
+    where they are a subtree walk. Each of these is built on the first term
+    that needs it, so a one-off query only pays for its own fields. Only
+    terms that cannot be indexed (substrings, globs starting with a
+    wildcard, existence checks) are evaluated per candidate, and only on the
+    candidates the indexed terms left over. Tag terms are answered by the
+    store's TagIndex, all of them with one merge of their posting lists.
+    """
+
+    def __init__(self, data, tags=None):
+        self.data = data
+        self.tags = tags
+        self._paths = None
+        self._sorted = {}
+
+    def _sorted_by(self, field):
+        """Return (sorted keys, entry IDs in the same order) for "alias", "created" or "id"."""
+        if field not in self._sorted:
+            if field == "id":
+                ids = sorted(self.data)
+                self._sorted[field] = ids, ids
+                return ids, ids
+            if field == "alias":
+                pairs = sorted((entry["alias"].lower(), entry_id) for entry_id, entry in self.data.items())
+            else:
+                pairs = sorted((entry["created_at"], entry_id) for entry_id, entry in self.data.items())
+            self._sorted[field] = [key for key, _ in pairs], [entry_id for _, entry_id in pairs]
+        return self._sorted[field]
+
+    def _candidates(self, field, value):
+        """Return the set of IDs matched by an indexed term, or None if it is not indexable."""
+        if field == "under":
+            if self._paths is None:
+                self._paths = PathTrie(self.data)
+            return set(self._paths.under(value))
+        if field == "after":
+            keys, ids = self._sorted_by("created")
+            return set(ids[bisect.bisect_left(keys, value) :])
+        if field == "before":
+            keys, ids = self._sorted_by("created")
+            return set(ids[: bisect.bisect_left(keys, value)])
+        if field == "id":
+            keys, ids = self._sorted_by("id")
+            start, end = prefix_range(keys, value)
+            return set(ids[start:end])
+        if field == "alias":
+            literal = re.split(r"[*?\[]", value, maxsplit=1)[0]
+            if literal:
+                keys, ids = self._sorted_by("alias")
+                start, end = prefix_range(keys, literal)
+                return {ids[i] for i in range(start, end) if fnmatch.fnmatchcase(keys[i], value)}
+        return None
+
+    def _matches(self, entry, field, value):
+        if field == "text":
+            return value in entry["alias"].lower()
+        if field == "alias":
+            return fnmatch.fnmatchcase(entry["alias"].lower(), value)
+        if field == "exists":
+            return os.path.isdir(entry["path"]) == value
+        return True
+
+    def search(self, query, within=None):
+        """Return the IDs matching query, optionally restricted to the IDs in within."""
+        terms = parse_query(query) if isinstance(query, str) else query
+        candidates = None
+        remaining = []
+        tags = [value for field, value in terms if field == "tag"]
+        if tags:
+            candidates = set(self.tags.ids(tags)) if self.tags is not None else set()
+            terms = [(field, value) for field, value in terms if field != "tag"]
+        for field, value in terms:
+            ids = self._candidates(field, value)
+            if ids is None:
+                remaining.append((field, value))
+            elif candidates is None or len(ids) < len(candidates):
+                candidates = ids if candidates is None else ids & candidates
+            else:
+                candidates &= ids
+        if candidates is None:
+            candidates = within if within is not None else self.data.keys()
+        elif within is not None:
+            candidates = candidates & set(within)
+
+        # Existence checks touch the filesystem, so run them last
+        remaining.sort(key=lambda term: term[0] == "exists")
+        result = []
+        for entry_id in candidates:
+            entry = self.data.get(entry_id)
+            if entry is None:
+                continue  # Deleted since the index was built
+            if all(self._matches(entry, field, value) for field, value in remaining):
+                result.append(entry_id)
+        result.sort()
+        return result
+
+    def filter(self, query, within=None):
+        """Return a view of the matching entries ordered by ID."""
+        return EntryView(self.data, self.search(query, within))
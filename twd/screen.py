@@ -1,7 +1,18 @@
 import curses
+import itertools
+import re
+import signal
 import time
 import os
 from . import crud
+from .preview import DirectoryPreview
+from .query import QueryIndex, parse_query
+from .ids import IdIndex
+from .entries import Entry, EntryView
+from .writer import WriteBehind
+from . import history
+from . import paths
+from . import watch
 import logging
 
 log = logging.getLogger("log")
@@ -12,6 +23,19 @@ DIRS = None
 filtered_DIRS = None
 search_query = ""
 original_DIRS = None
+PREVIEW = None
+QUERY_INDEX = None
+last_query = ""
+NAMESPACE = None
+NAMESPACES = []
+SHARDS = {}
+STORE_CONFIG = None
+ID_INDEX = None
+WATCHER = None
+WRITER = None
+MISSING = set()
+READ_ONLY = set()
+SAVE_STATUS = {"saving": "Saving...", "failed": "Save failed, retrying", "saved": "Saved"}
 
 # Color pair constants
 COLOR_DEFAULT = 1
@@ -76,24 +100,9 @@ def shorten_path(path, mode):
     """
     if mode == 0 or not path:
         return path
-    
-    # Split path into segments
-    segments = [seg for seg in path.split('/') if seg]  # Remove empty segments
-    
-    if len(segments) <= 2:
-        return path  # Too short to meaningfully shorten
-    
-    if mode == 1:  # Medium: keep first 2 and last 2 segments
-        if len(segments) <= 4:
-            return path
-        return '/' + '/'.join(segments[:2]) + '/.../' + '/'.join(segments[-2:])
-    
-    elif mode == 2:  # Short: keep first 1 and last 1 segment
-        if len(segments) <= 2:
-            return path
-        return '/' + segments[0] + '/.../' + segments[-1]
-    
-    return path
+    parts = paths.components(path)
+    shortened = paths.shorten(parts, mode)
+    return path if shortened is parts else paths.join(shortened)
 
 def draw_hr(stdscr, y, mode=None):
     """Draw a horizontal rule with bold attribute."""
@@ -105,12 +114,19 @@ def draw_hr(stdscr, y, mode=None):
         pass  # Ignore errors if the line is too long
 
 def draw_path(stdscr, y, x, path, max_len, text_color, slash_color, selected=False):
-    """Draw the path with different colors for text and slashes."""
+    """Draw the path with different colors for text and slashes.
+
+    path is a string or a list of components (see paths.components), which
+    is drawn one component at a time instead of one character at a time.
+    """
     _, max_cols = stdscr.getmaxyx()
     attr = curses.A_REVERSE if selected else 0
-    pos = x
     # Limit max_len to fit within terminal width
     max_len = min(max_len, max_cols - x - 1)
+    if not isinstance(path, str):
+        draw_components(stdscr, y, x, path, max_len, curses.color_pair(text_color) | attr | curses.A_BOLD, curses.color_pair(slash_color) | attr | curses.A_BOLD)
+        return
+    pos = x
     for char in path:
         if pos - x >= max_len or pos >= max_cols - 1:
             break
@@ -130,29 +146,189 @@ def draw_path(stdscr, y, x, path, max_len, text_color, slash_color, selected=Fal
             break
         pos += 1
 
+def draw_components(stdscr, y, x, parts, max_len, text_attr, slash_attr):
+    pos = x
+    end = x + max(max_len, 0)
+    for name in parts or [""]:
+        if pos >= end:
+            break
+        try:
+            stdscr.addstr(y, pos, "/", slash_attr)
+            pos += 1
+            if name and pos < end:
+                stdscr.addstr(y, pos, name[:end - pos], text_attr)
+                pos += min(len(name), end - pos)
+        except curses.error:
+            return  # Stop if we hit a boundary
+    if pos < end:
+        try:
+            stdscr.addstr(y, pos, " " * (end - pos), text_attr)
+        except curses.error:
+            pass
+
+def draw_preview(stdscr, top, bottom, x, width, path, preview):
+    """Draw the directory preview pane between rows top and bottom."""
+    text_x = x + 2
+    text_width = width - 3
+    for y in range(top, bottom):
+        try:
+            stdscr.addstr(y, x, "│", curses.color_pair(COLOR_BORDER) | curses.A_BOLD)
+        except curses.error:
+            pass
+
+    lines = [(os.path.basename(path.rstrip("/")) or path, COLOR_HEADER)]
+    if preview is None:
+        lines.append(("Loading...", COLOR_DEFAULT))
+    elif preview["error"]:
+        lines.append((preview["error"], COLOR_WARNING))
+    else:
+        if preview["branch"]:
+            lines.append((f"git: {preview['branch']}", COLOR_ID))
+        for name in preview["items"]:
+            lines.append((name, COLOR_PATH_TEXT if name.endswith("/") else COLOR_DEFAULT))
+        if not preview["items"]:
+            lines.append(("(empty)", COLOR_DEFAULT))
+        if preview["truncated"]:
+            lines.append(("...", COLOR_DEFAULT))
+
+    for i, (text, color) in enumerate(lines):
+        y = top + i
+        if y >= bottom:
+            break
+        try:
+            stdscr.addstr(y, text_x, text[:text_width], curses.color_pair(color) | curses.A_BOLD)
+        except curses.error:
+            pass
+
 def filter_dirs_by_search(query):
-    """Filter directories based on search query."""
-    global filtered_DIRS
-    filtered_DIRS = (
-        {k: v for k, v in DIRS.items() if query.lower() in v["alias"].lower()}
-        if query
-        else DIRS
-    )
+    """Filter directories based on search query.
+
+    The query uses the same syntax as `twd --query`. While only plain words
+    are typed, each keystroke narrows the previous results instead of
+    searching the whole store again.
+    """
+    global filtered_DIRS, QUERY_INDEX, last_query
+    if not query:
+        filtered_DIRS = EntryView(DIRS)
+        last_query = ""
+        return
+    try:
+        terms = parse_query(query)
+    except ValueError:
+        return  # Incomplete filter while typing, keep the current results
+    if QUERY_INDEX is None:
+        QUERY_INDEX = QueryIndex(DIRS, crud.load_tags(STORE_CONFIG))
+    within = None
+    if last_query and query.startswith(last_query) and all(field == "text" for field, _ in terms):
+        within = filtered_DIRS
+    filtered_DIRS = QUERY_INDEX.filter(terms, within)
+    last_query = query
+
+def available_tags(prefix):
+    """Return the tags of the shown namespace that start with prefix."""
+    global QUERY_INDEX
+    if QUERY_INDEX is None:
+        QUERY_INDEX = QueryIndex(DIRS, crud.load_tags(STORE_CONFIG))
+    return [tag for tag in QUERY_INDEX.tags.counts() if tag.startswith(prefix)]
+
+def switch_namespace(step):
+    """Move to the next (or previous) namespace, loading its shard on first use."""
+    global NAMESPACE, STORE_CONFIG, DIRS, filtered_DIRS, original_DIRS, QUERY_INDEX, last_query, search_query
+    global ID_INDEX
+    NAMESPACE = NAMESPACES[(NAMESPACES.index(NAMESPACE) + step) % len(NAMESPACES)]
+    STORE_CONFIG = crud.namespace_config(CONFIG, NAMESPACE)
+    if NAMESPACE not in SHARDS:
+        SHARDS[NAMESPACE] = crud.load_merged(STORE_CONFIG)
+    DIRS = SHARDS[NAMESPACE]
+    READ_ONLY.clear()
+    READ_ONLY.update(crud.read_only_ids(STORE_CONFIG, DIRS))
+    ID_INDEX = IdIndex(DIRS, CONFIG.get("id_prefix_min_length", 4))
+    filtered_DIRS = EntryView(DIRS)
+    original_DIRS = DIRS
+    QUERY_INDEX = None
+    last_query = ""
+    search_query = ""
+    if WATCHER is not None:
+        WATCHER.reset(crud.get_data_file(STORE_CONFIG), [entry["path"] for entry in DIRS.values()])
+
+def apply_changes(changes):
+    """Reload the store after another process changed it, re-point renamed directories."""
+    global DIRS, original_DIRS, ID_INDEX, QUERY_INDEX, last_query
+    MISSING.update(changes["missing"])
+    if changes["data"] and WRITER.wrote(crud.get_data_file(STORE_CONFIG)):
+        changes["data"] = False  # Our own save, the loaded entries already have it
+    updates = {}
+    if changes["moved"]:
+        moved = watch.repoint(crud.load_data(STORE_CONFIG), changes["moved"])
+        updates = {entry_id: Entry.from_mapping(entry) for entry_id, entry in moved.items()}
+        if updates:
+            WRITER.put(STORE_CONFIG, updates)
+            log.info(f"Re-pointed {len(updates)} entries to renamed directories")
+        MISSING.difference_update(changes["moved"])
+        changes["data"] = True
+    if changes["data"]:
+        DIRS = crud.load_merged(STORE_CONFIG)
+        DIRS.update(updates)  # Queued, not saved yet
+        SHARDS[NAMESPACE] = DIRS
+        READ_ONLY.clear()
+        READ_ONLY.update(crud.read_only_ids(STORE_CONFIG, DIRS))
+        original_DIRS = DIRS
+        ID_INDEX = IdIndex(DIRS, CONFIG.get("id_prefix_min_length", 4))
+        QUERY_INDEX = None
+        last_query = ""
+    WATCHER.reset(crud.get_data_file(STORE_CONFIG), [entry["path"] for entry in DIRS.values()])
+
+def delete_entries(entry_ids):
+    """Drop entries from the loaded shard and indexes and queue deleting them.
+
+    Entries of read-only layers are skipped; returns the IDs that were deleted.
+    """
+    global QUERY_INDEX, last_query
+    entry_ids = [entry_id for entry_id in entry_ids if entry_id not in READ_ONLY]
+    if not entry_ids:
+        return entry_ids
+    WRITER.delete(STORE_CONFIG, entry_ids)
+    for entry_id in entry_ids:
+        DIRS.pop(entry_id, None)
+        ID_INDEX.remove(entry_id)
+    QUERY_INDEX = None
+    last_query = ""
+    return entry_ids
+
+def realias_entries(entry_ids, template):
+    """Re-alias entries and queue saving them; {name} is the directory name and {n} counts from 1."""
+    global QUERY_INDEX, last_query
+    updates = {}
+    for n, entry_id in enumerate(entry_ids, 1):
+        if entry_id not in DIRS or entry_id in READ_ONLY:
+            continue
+        name = os.path.basename(DIRS[entry_id]["path"].rstrip("/"))
+        alias = template.replace("{name}", name).replace("{n}", str(n))
+        alias = re.sub(r"[^\w-]+", "-", alias).strip("-")
+        if alias:
+            updates[entry_id] = Entry.from_mapping(dict(DIRS[entry_id], alias=alias))
+    if updates:
+        DIRS.update(updates)
+        WRITER.put(STORE_CONFIG, updates)
+        QUERY_INDEX = None
+        last_query = ""
+    return len(updates)
+
+def recent_entries(dirs):
+    """Return the entries of dirs that were jumped to, most recent jump first."""
+    recent = history.open_history(CONFIG)
+    if recent is None:
+        return {}
+    ids_by_path = {entry["path"]: entry_id for entry_id, entry in dirs.items()}
+    with recent:
+        paths = recent.recent()
+    return EntryView(dirs, [ids_by_path[path] for path, _ in paths if path in ids_by_path])
 
 def sort_entries(entries_dict, criteria, descending):
-    """Sort entries based on the specified criteria and order."""
-    items = list(entries_dict.items())
-    
-    if criteria == "alias":
-        items.sort(key=lambda x: x[1]["alias"].lower(), reverse=descending)
-    elif criteria == "id":
-        items.sort(key=lambda x: x[0], reverse=descending)
-    elif criteria == "path":
-        items.sort(key=lambda x: x[1]["path"].lower(), reverse=descending)
-    elif criteria == "created":
-        items.sort(key=lambda x: x[1]["created_at"], reverse=descending)
-    
-    return {k: v for k, v in items}
+    """Return a view of the entries sorted by the specified criteria and order."""
+    return EntryView(
+        entries_dict, [entry_id for entry_id, _ in crud.iter_entries(entries_dict, criteria, descending)]
+    )
 
 def display_select_screen(stdscr, save_config_func=None):
     """Display the selection screen with a candy-themed TUI."""
@@ -169,6 +345,10 @@ def display_select_screen(stdscr, save_config_func=None):
     action = None
     search_mode = False
     post_search_mode = False
+    recent_mode = False
+    alias_mode = False
+    alias_input = ""
+    marked = set()  # IDs of entries marked for batch actions
     running = True
     last_resize_time = 0  # Track last resize time for debouncing
 
@@ -185,6 +365,19 @@ def display_select_screen(stdscr, save_config_func=None):
     filtered_DIRS = sort_entries(filtered_DIRS, sort_criteria, sort_descending)
 
     while running:
+        # Pick up entries added or deleted by other shells. While our own
+        # changes are being saved the reload would show the old entries, so
+        # wait until they are on disk
+        changes = WATCHER.poll() if WATCHER is not None and not WRITER.pending() else None
+        if changes:
+            apply_changes(changes)
+            marked &= DIRS.keys()
+            if recent_mode:
+                filtered_DIRS = recent_entries(DIRS)
+            else:
+                filter_dirs_by_search(search_query)
+                filtered_DIRS = sort_entries(filtered_DIRS, sort_criteria, sort_descending)
+
         max_items = len(filtered_DIRS)
         stdscr.clear()
 
@@ -203,8 +396,14 @@ def display_select_screen(stdscr, save_config_func=None):
         except curses.error:
             pass  # Ignore boundary errors
 
+        # The preview pane takes the right third of wide terminals only
+        preview_width = 0
+        if PREVIEW is not None and width >= CONFIG.get("preview_min_width", 100):
+            preview_width = width // 3
+
         inner_height = height - 2
-        inner_width = width - 2
+        inner_width = width - 2 - preview_width
+        mark_width = 2 if marked else 0  # Column for the mark of marked entries
 
         # Display current directory and size readout on the same line
         dir_text = f"Current directory: {os.getcwd()}"
@@ -234,11 +433,15 @@ def display_select_screen(stdscr, save_config_func=None):
             selected_entry = -1  # Indicate nothing is selected
         else:
             max_alias_len = max(max(len(entry["alias"]) for entry in filtered_DIRS.values()), 5)
-            max_id_len = max(max(len(alias_id) for alias_id in filtered_DIRS.keys()), 2)
+            # IDs are shown as their shortest unique prefix, sized for the visible rows
+            visible_ids = itertools.islice(filtered_DIRS, max(inner_height - 11, 0))
+            max_id_len = max([len(ID_INDEX.unique_prefix(alias_id)) for alias_id in visible_ids] + [2])
             # Calculate max_path_len based on shortened paths
-            shortened_paths = [shorten_path(entry["path"], path_display_mode) for entry in filtered_DIRS.values()]
-            max_path_len = max(max(len(path) for path in shortened_paths), 4)
-            max_path_len = min(max_path_len, inner_width - max_alias_len - max_id_len - 10)  # Adjust for other columns and padding
+            max_path_len = max(
+                max(paths.display_length(paths.shorten(paths.components(entry["path"]), path_display_mode)) for entry in filtered_DIRS.values()),
+                4,
+            )
+            max_path_len = min(max_path_len, inner_width - max_alias_len - max_id_len - 10 - mark_width)  # Adjust for other columns and padding
             # Ensure selected_entry is within bounds if items were removed
             selected_entry = selected_entry % max_items if max_items > 0 else 0
             if selected_entry == -1 and max_items > 0:
@@ -264,7 +467,7 @@ def display_select_screen(stdscr, save_config_func=None):
         if show_created_column:
             header_parts.append("CREATED AT")
 
-        header_text = "  ".join(header_parts)  # Join with 2 spaces padding
+        header_text = " " * mark_width + "  ".join(header_parts)  # Join with 2 spaces padding
         try:
             stdscr.addstr(3, 1, header_text[:inner_width - 1], curses.color_pair(COLOR_HEADER) | curses.A_BOLD)
         except curses.error:
@@ -276,16 +479,24 @@ def display_select_screen(stdscr, save_config_func=None):
         line_start = 5
         entry_rows = {}  # Map row numbers to entry indices for mouse clicks
         if filtered_DIRS:  # Only draw entries if there are any
-            for entry_id, entry in enumerate(filtered_DIRS.values()):
+            for entry_id, (full_id, entry) in enumerate(filtered_DIRS.items()):
                 if line_start >= inner_height - 6:  # Adjusted for two-line controls
                     break
                 alias = entry["alias"].ljust(max_alias_len)
-                alias_id = list(filtered_DIRS.keys())[entry_id].ljust(max_id_len)
+                alias_id = ID_INDEX.unique_prefix(full_id).ljust(max_id_len)
                 created_at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["created_at"]))
 
                 current_x = 1
                 attr = curses.A_REVERSE if entry_id == selected_entry else 0
 
+                # Mark
+                if mark_width:
+                    try:
+                        stdscr.addstr(line_start, current_x, "* " if full_id in marked else "  ", curses.color_pair(COLOR_WARNING) | attr | curses.A_BOLD)
+                    except curses.error:
+                        pass
+                    current_x += mark_width
+
                 # Alias
                 try:
                     stdscr.addstr(line_start, current_x, alias[:inner_width - current_x], curses.color_pair(COLOR_ALIAS) | attr | curses.A_BOLD)
@@ -312,9 +523,10 @@ def display_select_screen(stdscr, save_config_func=None):
                     current_x += 2
 
                 # Path (shortened based on display mode)
-                shortened_path = shorten_path(entry["path"], path_display_mode)
+                shortened_path = paths.shorten(paths.components(entry["path"]), path_display_mode)
                 try:
-                    draw_path(stdscr, line_start, current_x, shortened_path, max_path_len, COLOR_PATH_TEXT, COLOR_PATH_SLASH, selected=(entry_id == selected_entry))
+                    path_color = COLOR_WARNING if entry["path"] in MISSING else COLOR_PATH_TEXT
+                    draw_path(stdscr, line_start, current_x, shortened_path, max_path_len, path_color, COLOR_PATH_SLASH, selected=(entry_id == selected_entry))
                 except curses.error:
                     pass
                 current_x += max_path_len
@@ -341,11 +553,27 @@ def display_select_screen(stdscr, save_config_func=None):
 
         # Controls with bright colors, split into two lines
         controls_y = height - 7  # Adjusted for three lines
+
+        if preview_width and pre_selected_path:
+            preview_path = os.path.abspath(os.path.expanduser(pre_selected_path))
+            draw_preview(
+                stdscr, 3, controls_y, width - 1 - preview_width, preview_width,
+                preview_path, PREVIEW.request(preview_path),
+            )
         draw_hr(stdscr, controls_y)
         
         # Sorting status line
         sort_indicator = "↓" if sort_descending else "↑"
         sort_text = f"Sort: {sort_criteria} {sort_indicator} | Path: {path_modes[path_display_mode]} | Cols: "
+        if len(NAMESPACES) > 1:
+            sort_text = f"NS: {NAMESPACE} ({NAMESPACES.index(NAMESPACE) + 1}/{len(NAMESPACES)}) | " + sort_text
+        if recent_mode:
+            sort_text = "View: recent | " + sort_text
+        if marked:
+            sort_text = f"Marked: {len(marked)} | " + sort_text
+        save_status = WRITER.status()
+        if save_status:
+            sort_text = f"{SAVE_STATUS[save_status]} | " + sort_text
         sort_text += "id " if show_id_column else ""
         sort_text += "created" if show_created_column else ""
         try:
@@ -362,11 +590,11 @@ def display_select_screen(stdscr, save_config_func=None):
             toggle_key_positions = {}  # No toggle keys in search mode
         else:
             controls_text = (
-                "ctrls: ↑/k=up  ↓/j=down  enter/click=select  d/backspace=delete\n"
-                "q=quit  s=search  n=toggle id  t=toggle created  p=toggle path  o=cycle sort  l=toggle order"
+                "ctrls: ↑/k=up  ↓/j=down  enter/click=select  d/backspace=delete  space=mark  a=mark all  i=invert  e=alias\n"
+                "q=quit  s=search  #=tag  n=toggle id  t=toggle created  p=toggle path  o=cycle sort  l=toggle order  tab=namespace  r=recent"
                 if not post_search_mode
-                else "ctrls: ↑/k=up  ↓/j=down  enter/click=select  d/backspace=delete\n"
-                     "q=exit search  s=search  n=toggle id  t=toggle created  p=toggle path  o=cycle sort  l=toggle order"
+                else "ctrls: ↑/k=up  ↓/j=down  enter/click=select  d/backspace=delete  space=mark  a=mark all  i=invert  e=alias\n"
+                     "q=exit search  s=search  n=toggle id  t=toggle created  p=toggle path  o=cycle sort  l=toggle order  tab=namespace"
             )
             # Split controls text into lines and render each
             controls_lines = controls_text.split("\n")
@@ -388,19 +616,40 @@ def display_select_screen(stdscr, save_config_func=None):
 
         if search_mode:
             try:
-                stdscr.addstr(action_area_y + 1, 1, f"Search: {search_query}"[:inner_width - 1], curses.color_pair(COLOR_ACTION) | curses.A_BOLD)
+                search_msg = f"Search: {search_query}"
+                last_word = search_query.split(" ")[-1]
+                if last_word.startswith("tag:"):
+                    search_msg += f"  (tags: {' '.join(available_tags(last_word[4:].lower())) or 'none'})"
+                stdscr.addstr(action_area_y + 1, 1, search_msg[:inner_width - 1], curses.color_pair(COLOR_ACTION) | curses.A_BOLD)
+            except curses.error:
+                pass
+        elif alias_mode:
+            target = f"{len(marked)} marked entries" if marked else "entry"
+            alias_msg = f"Alias for {target} ({{name}} = directory, {{n}} = number): {alias_input}"
+            try:
+                stdscr.addstr(action_area_y + 1, 1, alias_msg[:inner_width - 1], curses.color_pair(COLOR_ACTION) | curses.A_BOLD)
             except curses.error:
                 pass
         elif confirm_mode and action == "delete":
-            entry = filtered_DIRS[list(filtered_DIRS.keys())[selected_entry]]
+            entry = filtered_DIRS[filtered_DIRS.id_at(selected_entry)]
             delete_msg = f"Delete entry '{entry['alias']}' ({entry['path']})? [enter/q]"
+            if marked:
+                delete_msg = f"Delete {len(marked)} marked entries? [enter/q]"
             try:
                 stdscr.addstr(action_area_y + 1, 1, delete_msg[:inner_width - 1], curses.color_pair(COLOR_WARNING) | curses.A_BOLD)
             except curses.error:
                 pass
+        elif pre_selected_path in MISSING:
+            try:
+                stdscr.addstr(action_area_y + 1, 1, f"Directory was moved or deleted: {pre_selected_path}"[:inner_width - 1], curses.color_pair(COLOR_WARNING) | curses.A_BOLD)
+            except curses.error:
+                pass
         elif pre_selected_path:
+            command_msg = f"Command: cd {os.path.abspath(os.path.expanduser(pre_selected_path))}"
+            if 0 <= selected_entry < len(filtered_DIRS) and filtered_DIRS.id_at(selected_entry) in READ_ONLY:
+                command_msg += "  (shared, read-only)"
             try:
-                stdscr.addstr(action_area_y + 1, 1, f"Command: cd {os.path.abspath(os.path.expanduser(pre_selected_path))}"[:inner_width - 1], curses.color_pair(COLOR_ACTION) | curses.A_BOLD)
+                stdscr.addstr(action_area_y + 1, 1, command_msg[:inner_width - 1], curses.color_pair(COLOR_ACTION) | curses.A_BOLD)
             except curses.error:
                 pass
         else:  # Display help/info when no results and not in other modes
@@ -415,12 +664,22 @@ def display_select_screen(stdscr, save_config_func=None):
         except curses.error:
             pass
 
+        # Poll while a preview is loading or changes are being saved so they
+        # show up without a keypress, and regularly while watching for changes
+        if (preview_width and PREVIEW.pending()) or WRITER.pending():
+            stdscr.timeout(50)
+        else:
+            stdscr.timeout(250 if WATCHER is not None else -1)
+
         # Handle key and mouse events
         try:
             key = stdscr.getch()
         except curses.error:
             continue  # Handle interrupted getch (e.g., during resize)
 
+        if key == -1:
+            continue  # Poll timeout, redraw with the loaded preview or changes
+
         # Handle resize events with debouncing
         if key == curses.KEY_RESIZE:
             current_time = time.time()
@@ -485,7 +744,7 @@ def display_select_screen(stdscr, save_config_func=None):
                         # Update selected entry to highlight it
                         selected_entry = entry_rows[y]
                         # Immediately select the entry (mimic Enter key)
-                        selected_entry_id = list(filtered_DIRS.keys())[selected_entry]
+                        selected_entry_id = filtered_DIRS.id_at(selected_entry)
                         return filtered_DIRS[selected_entry_id]
             except curses.error:
                 pass  # Ignore mouse errors (e.g., invalid mouse event)
@@ -498,6 +757,50 @@ def display_select_screen(stdscr, save_config_func=None):
             if key == ord("\n"):  # Cannot select if no items
                 continue
 
+        if alias_mode:
+            if key == ord("\n"):
+                # Marked entries in the order they are shown, then any outside the filter
+                targets = [entry_id for entry_id in filtered_DIRS if entry_id in marked]
+                targets += sorted(marked.difference(targets))
+                if not marked and max_items > 0:
+                    targets = [filtered_DIRS.id_at(selected_entry)]
+                if alias_input and targets:
+                    realias_entries(targets, alias_input)
+                    marked.clear()
+                alias_mode = False
+            elif key == 27:
+                alias_mode = False
+            elif key == curses.KEY_BACKSPACE or key == 127:
+                alias_input = alias_input[:-1]
+            elif 32 <= key <= 126:
+                alias_input += chr(key)
+            continue
+
+        if not search_mode and not confirm_mode and max_items > 0:
+            # Marking and batch actions work the same with and without a search
+            if key == ord(" "):
+                selected_entry_id = filtered_DIRS.id_at(selected_entry)
+                marked.symmetric_difference_update({selected_entry_id})
+                selected_entry = min(selected_entry + 1, max_items - 1)
+                continue
+            elif key == ord("a"):
+                if marked.issuperset(filtered_DIRS):
+                    marked.difference_update(filtered_DIRS)
+                else:
+                    marked.update(filtered_DIRS)
+                continue
+            elif key == ord("i"):
+                marked.symmetric_difference_update(filtered_DIRS)
+                continue
+            elif key == ord("e"):
+                alias_mode = True
+                alias_input = ""
+                continue
+            elif key == ord("d") or key == curses.KEY_BACKSPACE:
+                confirm_mode = True
+                action = "delete"
+                continue
+
         if search_mode:
             if key == ord("\n"):
                 search_mode = False
@@ -528,8 +831,14 @@ def display_select_screen(stdscr, save_config_func=None):
                 selected_entry = min(max_items - 1, selected_entry + 1)
             elif key == ord("\n"):
                 if max_items > 0:  # Only return if there's something to select
-                    selected_entry_id = list(filtered_DIRS.keys())[selected_entry]
+                    selected_entry_id = filtered_DIRS.id_at(selected_entry)
                     return filtered_DIRS[selected_entry_id]
+            elif key in (9, curses.KEY_BTAB) and len(NAMESPACES) > 1:
+                switch_namespace(-1 if key == curses.KEY_BTAB else 1)
+                filtered_DIRS = sort_entries(filtered_DIRS, sort_criteria, sort_descending)
+                marked.clear()
+                post_search_mode = False
+                selected_entry = 0
             elif key == ord("n"):
                 show_id_column = not show_id_column
                 # Save config if save_config_func is provided
@@ -572,18 +881,18 @@ def display_select_screen(stdscr, save_config_func=None):
         elif confirm_mode:
             if key == ord("\n") and action == "delete":
                 if max_items > 0:  # Ensure there's an item to delete
-                    selected_entry_id = list(filtered_DIRS.keys())[selected_entry]
-                    data = crud.load_data(CONFIG)
-                    try:
-                        crud.delete_entry(CONFIG, data, selected_entry_id)
-                        del filtered_DIRS[selected_entry_id]
-                        # Adjust selected_entry after deletion
-                        if selected_entry >= len(filtered_DIRS) and len(filtered_DIRS) > 0:
-                            selected_entry = len(filtered_DIRS) - 1
-                        elif len(filtered_DIRS) == 0:
-                            selected_entry = -1  # No items left
-                    except KeyError:
-                        error_log.error(f"Entry ID {selected_entry_id} not found during deletion attempt")
+                    selected_entry_id = filtered_DIRS.id_at(selected_entry)
+                    targets = list(marked) if marked else [selected_entry_id]
+                    # One write for all targets, the view is updated in place
+                    filtered_DIRS.discard(delete_entries(targets))
+                    marked.clear()
+                    # Adjust selected_entry after deletion
+                    if selected_entry_id in filtered_DIRS:
+                        selected_entry = filtered_DIRS.ids.index(selected_entry_id)
+                    elif selected_entry >= len(filtered_DIRS) and len(filtered_DIRS) > 0:
+                        selected_entry = len(filtered_DIRS) - 1
+                    elif len(filtered_DIRS) == 0:
+                        selected_entry = -1  # No items left
                 confirm_mode = False
             else:
                 confirm_mode = False
@@ -594,20 +903,39 @@ def display_select_screen(stdscr, save_config_func=None):
                 selected_entry = (selected_entry + 1) % max_items if max_items > 0 else -1
             elif key == ord("\n"):
                 if max_items > 0:
-                    selected_entry_id = list(filtered_DIRS.keys())[selected_entry]
+                    selected_entry_id = filtered_DIRS.id_at(selected_entry)
                     return filtered_DIRS[selected_entry_id]
             elif key == ord("q"):
+                if recent_mode:
+                    recent_mode = False
+                    filtered_DIRS = sort_entries(original_DIRS, sort_criteria, sort_descending)
+                    selected_entry = 0
+                    continue
                 return None
-            elif key == ord("d") or key == curses.KEY_BACKSPACE:
-                if max_items > 0:  # Only allow delete if there are items
-                    confirm_mode = True
-                    action = "delete"
-            elif key == ord("s"):
+            elif key == ord("r"):
+                # Recent view: saved entries in the order they were last jumped to
+                recent_mode = not recent_mode
+                if recent_mode:
+                    filtered_DIRS = recent_entries(DIRS)
+                else:
+                    filtered_DIRS = sort_entries(original_DIRS, sort_criteria, sort_descending)
+                selected_entry = 0
+            elif key == ord("s") or key == ord("#"):
                 search_mode = True
+                recent_mode = False
                 selected_entry = 0  # Reset selection on entering search
                 search_query = ""  # Clear previous search query
                 filter_dirs_by_search(search_query)  # Reset filtered_DIRS to all
                 filtered_DIRS = sort_entries(filtered_DIRS, sort_criteria, sort_descending)
+                if key == ord("#"):
+                    search_query = "tag:"  # Filter by tag, typed like a search
+            elif key in (9, curses.KEY_BTAB) and len(NAMESPACES) > 1:
+                switch_namespace(-1 if key == curses.KEY_BTAB else 1)
+                filtered_DIRS = sort_entries(filtered_DIRS, sort_criteria, sort_descending)
+                marked.clear()
+                post_search_mode = False
+                recent_mode = False
+                selected_entry = 0
             elif key == ord("n"):
                 show_id_column = not show_id_column
                 # Save config if save_config_func is provided
@@ -648,12 +976,61 @@ def display_select_screen(stdscr, save_config_func=None):
                     updated_config["sort_descending"] = sort_descending
                     save_config_func(updated_config)
 
-def display_select(config, dirs, save_config_func=None):
+def exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+def display_select(config, dirs, save_config_func=None, namespace=None):
     """Wrapper to run the TUI."""
-    global CONFIG, DIRS, filtered_DIRS, search_query, original_DIRS
+    global CONFIG, DIRS, filtered_DIRS, search_query, original_DIRS, PREVIEW, QUERY_INDEX, last_query
+    global NAMESPACE, NAMESPACES, SHARDS, STORE_CONFIG, ID_INDEX, WATCHER, WRITER
     CONFIG = config
+    ID_INDEX = IdIndex(dirs, config.get("id_prefix_min_length", 4))
+    NAMESPACE = namespace or crud.DEFAULT_NAMESPACE
+    NAMESPACES = sorted(set(crud.load_manifest(config)) | {NAMESPACE})
+    SHARDS = {NAMESPACE: dirs}
+    STORE_CONFIG = crud.namespace_config(config, NAMESPACE)
     DIRS = dirs
-    filtered_DIRS = DIRS
+    filtered_DIRS = EntryView(DIRS)
     original_DIRS = DIRS
     search_query = ""
-    return curses.wrapper(display_select_screen, save_config_func)
+    QUERY_INDEX = None
+    last_query = ""
+    PREVIEW = (
+        DirectoryPreview(
+            cache_size=config.get("preview_cache_size", 64),
+            max_items=config.get("preview_max_items", 200),
+        )
+        if config.get("show_preview", True)
+        else None
+    )
+    MISSING.clear()
+    READ_ONLY.clear()
+    READ_ONLY.update(crud.read_only_ids(STORE_CONFIG, dirs))
+    WATCHER = (
+        watch.create_watcher(
+            crud.get_data_file(STORE_CONFIG),
+            [entry["path"] for entry in dirs.values()],
+            config.get("watch_interval", 1.0),
+        )
+        if config.get("watch", True)
+        else None
+    )
+    WRITER = WriteBehind()
+    # Turn SIGTERM and SIGHUP (e.g. the terminal closing) into an exit that
+    # runs the finally block below, so queued changes are still saved
+    handlers = {}
+    for signum in filter(None, (getattr(signal, "SIGTERM", None), getattr(signal, "SIGHUP", None))):
+        try:
+            handlers[signum] = signal.signal(signum, exit_on_signal)
+        except ValueError:
+            pass  # Not in the main thread
+    try:
+        return curses.wrapper(display_select_screen, save_config_func)
+    finally:
+        WRITER.close()
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        if PREVIEW is not None:
+            PREVIEW.stop()
+        if WATCHER is not None:
+            WATCHER.close()
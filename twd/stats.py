@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import functools
+import contextlib
+
+PROCESS_START = time.perf_counter()
+
+# Finished phases as (start, depth, name, seconds), in the order they ended.
+# Nothing is recorded until enable() is called, so long-running users of
+# crud and api.Store don't collect phases nobody reports
+PHASES = []
+ENABLED = False
+_depth = 0
+_profiler = None
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+@contextlib.contextmanager
+def timer(name):
+    """Time the enclosed block as a phase; nested phases are indented in reports."""
+    global _depth
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    depth = _depth
+    _depth += 1
+    try:
+        yield
+    finally:
+        _depth -= 1
+        PHASES.append((start, depth, name, time.perf_counter() - start))
+
+
+def timed(name):
+    """Decorator form of timer."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(name, start):
+    """Record a phase that started at the given perf_counter value and ends now."""
+    if ENABLED:
+        PHASES.append((start, _depth, name, time.perf_counter() - start))
+
+
+def phases():
+    """Return the recorded phases ordered by start time."""
+    return sorted(PHASES)
+
+
+def as_dict():
+    return {
+        "total": time.perf_counter() - PROCESS_START,
+        "phases": [
+            {"name": name, "depth": depth, "seconds": seconds}
+            for _, depth, name, seconds in phases()
+        ],
+    }
+
+
+def format_table():
+    rows = [("  " * depth + name, seconds) for _, depth, name, seconds in phases()]
+    rows.append(("total", time.perf_counter() - PROCESS_START))
+    width = max(len(name) for name, _ in rows)
+    lines = [f"{'Phase'.ljust(width)}  {'ms':>9}", "-" * (width + 11)]
+    lines += [f"{name.ljust(width)}  {seconds * 1000:9.3f}" for name, seconds in rows]
+    return "\n".join(lines)
+
+
+def report(fmt, out=None):
+    """Print the phases as a table or JSON, to stderr so command output stays clean."""
+    out = out or sys.stderr
+    if fmt == "json":
+        out.write(json.dumps(as_dict()) + "\n")
+    else:
+        out.write(format_table() + "\n")
+
+
+def start_profile():
+    """Start cProfile if TWD_PROFILE is set; calling it again is a no-op."""
+    global _profiler
+    if _profiler is not None or not os.environ.get("TWD_PROFILE"):
+        return
+    import cProfile
+
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+
+def stop_profile():
+    """Stop cProfile and dump pstats data to the TWD_PROFILE path."""
+    global _profiler
+    if _profiler is None:
+        return
+    _profiler.disable()
+    _profiler.dump_stats(os.environ["TWD_PROFILE"])
+    _profiler = None
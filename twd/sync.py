@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import socket
+import logging
+
+from . import crud
+from .entries import Entry
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+
+def get_host(config):
+    """Name this host is known by in the sync directory."""
+    host = config.get("sync_host") or socket.gethostname()
+    return re.sub(r"[^\w.-]", "_", host)
+
+
+def load_state(config):
+    """Load the sync state, or None if this store was never synced."""
+    state_file = crud.get_index_file(config, "sync")
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        error_log.error(f"Error reading sync state: {e}")
+        return None
+
+
+def save_state(config, state):
+    crud.write_atomic(crud.get_index_file(config, "sync"), json.dumps(state))
+
+
+def read_journal(config):
+    """Return the changes crud recorded since the last sync and the number of bytes they take.
+
+    A line that is still being written is left for the next sync.
+    """
+    journal_file = crud.get_index_file(config, "journal")
+    changes = []
+    size = 0
+    if not os.path.exists(journal_file):
+        return changes, size
+    with open(journal_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            size += len(line)
+            changes.append(json.loads(line))
+    return changes, size
+
+
+def trim_journal(config, size):
+    """Drop the first size bytes of the journal, keeping what was appended since it was read.
+
+    Runs under the lock crud.record_change takes, so no append is lost.
+    """
+    journal_file = crud.get_index_file(config, "journal")
+    try:
+        f = open(journal_file, "r+b")
+    except FileNotFoundError:
+        return
+    with f, crud.locked(f):
+        f.seek(size)
+        rest = f.read()
+        f.seek(0)
+        f.write(rest)
+        f.truncate()
+
+
+def read_remote(sync_dir, host, offsets):
+    """Read the changes other hosts appended since the stored offsets.
+
+    Only complete lines are consumed, so a log another host is still
+    writing is picked up where it was left on the next sync.
+    """
+    changes = []
+    for name in sorted(os.listdir(sync_dir)):
+        if not name.endswith(".ndjson") or name[: -len(".ndjson")] == host:
+            continue
+        remote_host = name[: -len(".ndjson")]
+        with open(os.path.join(sync_dir, name), "rb") as f:
+            f.seek(offsets.get(remote_host, 0))
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offsets[remote_host] = offsets.get(remote_host, 0) + len(line)
+                changes.append(json.loads(line))
+    return changes
+
+
+def newer(change, version):
+    """True if change wins over the (clock, host) version last applied."""
+    return version is None or (change["clock"], change["host"]) > tuple(version)
+
+
+def sync(config, sync_dir):
+    """Exchange changes with the shared sync directory and merge them.
+
+    Every host appends its own changes to SYNC_DIR/<host>.ndjson, each
+    tagged with the entry ID and a Lamport clock, and remembers how far it
+    has read the logs of the other hosts. A sync therefore only reads and
+    writes the changes made since the previous one. For every entry the
+    change with the highest (clock, host) wins, so all hosts converge on
+    the same store no matter in which order they sync. Entries changed both
+    locally and remotely since the last sync are reported as conflicts.
+
+    Returns a summary dict with the number of changes sent, received and
+    applied and the list of conflicts.
+    """
+    os.makedirs(sync_dir, exist_ok=True)
+    host = get_host(config)
+    state = load_state(config)
+    # Read before the data, so every journaled change is also in it
+    local, journal_size = read_journal(config)
+    data = crud.load_data(config)
+
+    if state is None:
+        # First sync, everything in the store is a local change
+        state = {"clock": 0, "offsets": {}, "versions": {}}
+        local = [{"op": "put", "id": entry_id, "entry": entry} for entry_id, entry in data.items()]
+
+    remote = read_remote(sync_dir, host, state["offsets"])
+
+    clock = state["clock"]
+    for change in local:
+        clock += 1
+        change["clock"] = clock
+        change["host"] = host
+    clock = max([clock] + [change["clock"] for change in remote])
+
+    local_ids = {change["id"] for change in local}
+    versions = state["versions"]
+    changed = False
+    applied = 0
+    conflicts = []
+    deleted = []
+
+    for change in local:
+        versions[change["id"]] = [change["clock"], host]
+
+    for change in sorted(remote, key=lambda change: (change["clock"], change["host"])):
+        entry_id = change["id"]
+        if entry_id in local_ids:
+            conflicts.append(entry_id)
+        if not newer(change, versions.get(entry_id)):
+            continue
+        versions[entry_id] = [change["clock"], change["host"]]
+        if change["op"] == "put":
+            data[entry_id] = Entry.from_mapping(change["entry"])
+        elif data.pop(entry_id, None) is not None:
+            deleted.append(entry_id)
+        changed = True
+        applied += 1
+
+    if local:
+        log_file = os.path.join(sync_dir, f"{host}.ndjson")
+        with open(log_file, "a") as f:
+            for change in local:
+                f.write(json.dumps(change, default=dict) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    if changed:
+        crud.save_data(config, data)
+        crud.untag_entries(config, deleted)
+
+    state["clock"] = clock
+    save_state(config, state)
+    trim_journal(config, journal_size)
+
+    conflicts = sorted(set(conflicts))
+    log.info(
+        f"Synced with {sync_dir}: sent {len(local)}, received {len(remote)}, "
+        f"applied {applied}, conflicts {len(conflicts)}"
+    )
+    return {
+        "sent": len(local),
+        "received": len(remote),
+        "applied": applied,
+        "conflicts": conflicts,
+    }
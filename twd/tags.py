@@ -0,0 +1,114 @@
+import re
+import bisect
+
+
+def parse_tags(value):
+    """Split "infra,prod" (or a list of tags) into sorted, lowercased, unique tags."""
+    words = value.split(",") if isinstance(value, str) else value
+    tags = set()
+    for tag in words:
+        tag = tag.strip().lower()
+        if not tag:
+            continue
+        if not re.match(r"^[\w.-]+$", tag):
+            raise ValueError(
+                f"Invalid tag: '{tag}'. Tags can only contain alphanumeric characters, dots, dashes, and underscores."
+            )
+        tags.add(tag)
+    return sorted(tags)
+
+
+def intersect(postings):
+    """Return the IDs in all of the sorted lists, merging the shortest lists first."""
+    if not postings:
+        return []
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        merged = []
+        i = j = 0
+        while i < len(result) and j < len(other):
+            if result[i] == other[j]:
+                merged.append(result[i])
+                i += 1
+                j += 1
+            elif result[i] < other[j]:
+                i += 1
+            else:
+                j += 1
+        result = merged
+        if not result:
+            break
+    return list(result)
+
+
+class TagIndex:
+    """Tags of a store as tag -> sorted list of entry IDs.
+
+    This index is where tags are stored (crud keeps it in the data.tags
+    file next to the data file): each tag is written once with the IDs of
+    its entries instead of being repeated in every entry. Changes update
+    the posting lists in place with bisect, so tagging or deleting an entry
+    never rebuilds the index.
+    """
+
+    def __init__(self, postings=None):
+        self.postings = postings or {}
+
+    def __bool__(self):
+        return bool(self.postings)
+
+    def add(self, entry_id, tags):
+        """Tag an entry; returns True if any tag was new for it."""
+        changed = False
+        for tag in tags:
+            ids = self.postings.setdefault(tag, [])
+            i = bisect.bisect_left(ids, entry_id)
+            if i == len(ids) or ids[i] != entry_id:
+                ids.insert(i, entry_id)
+                changed = True
+        return changed
+
+    def remove(self, entry_id, tags=None):
+        """Untag an entry, from all of its tags if tags is None; returns True if it had any of them."""
+        changed = False
+        for tag in list(self.postings) if tags is None else tags:
+            ids = self.postings.get(tag)
+            if not ids:
+                continue
+            i = bisect.bisect_left(ids, entry_id)
+            if i < len(ids) and ids[i] == entry_id:
+                del ids[i]
+                changed = True
+                if not ids:
+                    del self.postings[tag]
+        return changed
+
+    def tags_of(self, entry_id):
+        """Return the sorted tags of one entry."""
+        tags = []
+        for tag, ids in self.postings.items():
+            i = bisect.bisect_left(ids, entry_id)
+            if i < len(ids) and ids[i] == entry_id:
+                tags.append(tag)
+        return sorted(tags)
+
+    def by_entry(self):
+        """Return {entry ID: sorted tags} for all tagged entries."""
+        result = {}
+        for tag in sorted(self.postings):
+            for entry_id in self.postings[tag]:
+                result.setdefault(entry_id, []).append(tag)
+        return result
+
+    def ids(self, tags):
+        """Return the sorted IDs of the entries that have all of tags."""
+        postings = []
+        for tag in tags:
+            if tag not in self.postings:
+                return []
+            postings.append(self.postings[tag])
+        return intersect(postings)
+
+    def counts(self):
+        return {tag: len(ids) for tag, ids in sorted(self.postings.items())}
@@ -4,100 +4,64 @@ import json
 import time
 import re
 import logging
+import sys
 import tempfile
 from importlib.metadata import version, PackageNotFoundError
 from collections import OrderedDict
 
+_IMPORT_START = time.perf_counter()
 
 # Flexible imports - try multiple approaches
 try:
     # Try relative imports first (when run as part of package)
     from .logger import initialize_logging
     from .screen import display_select # <--- This is the actual TUI function
+    from . import sync
+    from . import stats
+    from . import history
+    from . import discover
+    from . import batch
+    from . import api
+    from . import here
+    from . import expiry
+    from .query import parse_duration
+    from .tags import parse_tags
     from . import crud
 except ImportError:
     try:
         # Try absolute imports (when installed as package)
         from twd.logger import initialize_logging
         from twd.screen import display_select # <--- This is the actual TUI function
+        import twd.sync as sync
+        import twd.stats as stats
+        import twd.history as history
+        import twd.discover as discover
+        import twd.batch as batch
+        import twd.api as api
+        import twd.here as here
+        import twd.expiry as expiry
+        from twd.query import parse_duration
+        from twd.tags import parse_tags
         import twd.crud as crud
     except ImportError:
-        try:
-            # Try local imports (when running from same directory)
-            from logger import initialize_logging
-            from screen import display_select # <--- This is the actual TUI function
-            import crud
-        except ImportError:
-            # Create stub functions if modules aren't available
-            # THIS IS THE STUB THAT'S LIKELY BEING CALLED IF THE TUI DOESN'T SHOW
-            def initialize_logging(config):
-                """Stub function for when logger module is not available"""
-                pass
-
-            def display_select(config, dirs, save_config_func=None): # Added save_config_func for stub consistency
-                """Stub function for when screen module is not available"""
-                # Simple fallback - just return the first directory
-                log.warning("Screen module not imported, using fallback TUI.")
-                if dirs:
-                    return list(dirs.values())[0]
-                return None
-
-            # Create a simple crud stub
-            class CrudStub:
-                def ensure_data_file_exists(self, config):
-                    """Ensure data file exists"""
-                    data_file = config.get('data_file')
-                    if not os.path.exists(data_file):
-                        os.makedirs(os.path.dirname(data_file), exist_ok=True)
-                        with open(data_file, 'w') as f:
-                            json.dump({}, f)
-
-                def load_data(self, config_obj_or_path):
-                    """Load data from file"""
-                    data_file = self.get_data_file(config_obj_or_path)
-                    if os.path.exists(data_file):
-                        try:
-                            with open(data_file, 'r') as f:
-                                return json.load(f)
-                        except (json.JSONDecodeError, OSError):
-                            return {}
-                    return {}
-
-                def save_data(self, config_obj_or_path, data):
-                    """Save data to file"""
-                    data_file = self.get_data_file(config_obj_or_path)
-                    os.makedirs(os.path.dirname(data_file), exist_ok=True)
-                    with open(data_file, 'w') as f:
-                        json.dump(data, f, indent=2)
-
-                def create_entry(self, config, data, path, alias=None):
-                    """Create a new entry"""
-                    import time
-                    import uuid
-
-                    alias_id = alias or str(uuid.uuid4())[:8]
-                    data[alias_id] = {
-                        'path': path,
-                        'alias': alias or alias_id,
-                        'created_at': time.time()
-                    }
-
-                    self.save_data(config, data)
-                    return alias_id
-
-                def delete_data_file(self, config):
-                    """Delete the data file"""
-                    data_file = self.get_data_file(config)
-                    if os.path.exists(data_file):
-                        os.remove(data_file)
-                
-                def get_data_file(self, config_obj_or_path):
-                    if isinstance(config_obj_or_path, dict):
-                        return os.path.expanduser(config_obj_or_path.get("data_file", "~/.twd/data"))
-                    return os.path.expanduser(config_obj_or_path)
-
-
-            crud = CrudStub()
+        # Try local imports (when running from same directory)
+        from logger import initialize_logging
+        from screen import display_select # <--- This is the actual TUI function
+        import sync
+        import stats
+        import history
+        import discover
+        import batch
+        import api
+        import here
+        import expiry
+        from query import parse_duration
+        from tags import parse_tags
+        import crud
+
+if os.environ.get("TWD_PROFILE") or any(arg == "--stats" or arg.startswith("--stats=") for arg in sys.argv[1:]):
+    stats.enable()
+stats.record("imports", _IMPORT_START)
 
 log = logging.getLogger("log")
 error_log = logging.getLogger("error")
@@ -117,6 +81,18 @@ DEFAULT_CONFIG = {
     "log_backup_count": 3,
     "show_id_column": True,
     "show_created_column": True,
+    "id_prefix_min_length": 4,
+    "log_timings": False,
+    "history_size": 1000,
+    "default_ttl": None,
+    "layers": [],
+    "compact_paths": False,
+    "watch": True,
+    "watch_interval": 1.0,
+    "show_preview": True,
+    "preview_min_width": 100,
+    "preview_cache_size": 64,
+    "preview_max_items": 200,
 }
 
 
@@ -151,10 +127,15 @@ def save_config(config_data):
         error_log.error(f"Unexpected error saving config: {e}")
 
 
-CONFIG = load_config()
-initialize_logging(CONFIG)
+with stats.timer("load_config"):
+    CONFIG = load_config()
+if CONFIG.get("log_timings"):
+    stats.enable()
+with stats.timer("initialize_logging"):
+    initialize_logging(CONFIG)
 
-crud.ensure_data_file_exists(CONFIG)
+with stats.timer("ensure_data_file"):
+    crud.ensure_data_file_exists(CONFIG)
 
 
 def ensure_log_error_files():
@@ -177,7 +158,8 @@ def ensure_log_error_files():
             error_log.error(f"Error creating error file: {e}")
 
 
-ensure_log_error_files()
+with stats.timer("ensure_log_files"):
+    ensure_log_error_files()
 
 
 def get_temp_file_path(suffix):
@@ -196,12 +178,42 @@ def get_absolute_path(path):
 
 def validate_alias(alias):
     """Ensure the alias contains only valid characters."""
-    if not re.match(r"^[\w-]+$", alias):
+    try:
+        return api.validate_alias(alias)
+    except ValueError:
         error_log.error(f"Invalid alias provided: {alias}")
-        raise ValueError(
-            f"Invalid alias: '{alias}'. Aliases can only contain alphanumeric characters, dashes, and underscores."
-        )
-    return alias
+        raise
+
+
+split_namespace = api.split_namespace
+
+
+@stats.timed("handoff")
+def write_handoff(path):
+    """Hand the target path to the calling shell function.
+
+    The shell function from `--shell` passes a private pipe as file
+    descriptor TWD_FD, so concurrent jumps from different shells never share
+    a file. The path is written first, followed by a "clear" line if the
+    screen should be cleared. Without TWD_FD the legacy temp files are
+    written for shell functions generated by older versions.
+    """
+    clear = CONFIG["clear_after_screen"]
+    handoff_fd = os.environ.get("TWD_FD")
+    if handoff_fd:
+        try:
+            os.write(int(handoff_fd), (path + ("\nclear" if clear else "")).encode())
+        except (ValueError, OSError) as e:
+            error_log.error(f"Error writing to handoff descriptor {handoff_fd}: {e}")
+        return
+
+    twd_path_file = get_temp_file_path("path")
+    with open(twd_path_file, "w") as f:
+        f.write(path)
+    if clear:
+        twd_clear_file = get_temp_file_path("clear")
+        with open(twd_clear_file, "w") as f:
+            f.write(path)
 
 
 def output_handler(
@@ -211,77 +223,152 @@ def output_handler(
 
     if CONFIG["output_behaviour"] == 1 or simple_output:
         if path:
-            twd_path_file = get_temp_file_path("path")
-            with open(twd_path_file, "w") as f:
-                f.write(path)
-            if CONFIG["clear_after_screen"]:
-                twd_clear_file = get_temp_file_path("clear")
-                with open(twd_clear_file, "w") as f:
-                    f.write(path)
+            write_handoff(path)
             if output:
                 print(path)
     elif CONFIG["output_behaviour"] == 2:
         if path:
-            twd_path_file = get_temp_file_path("path")
-            with open(twd_path_file, "w") as f:
-                f.write(path)
-            if CONFIG["clear_after_screen"]:
-                twd_clear_file = get_temp_file_path("clear")
-                with open(twd_clear_file, "w") as f:
-                    f.write(path)
+            write_handoff(path)
         if output:
             print(message)
 
 
-def save_directory(path=None, alias=None, output=True, simple_output=False):
+def format_expiry(entry):
+    if entry.get("expires_at") is None:
+        return ""
+    return f" until {time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['expires_at']))}"
+
+
+def save_directory(
+    path=None, alias=None, output=True, simple_output=False, namespace=None, ttl=None, tags=None, untags=None
+):
     if path is None:
         path = os.getcwd()
     else:
         path = get_absolute_path(path)
+    path = os.path.realpath(path)
 
+    alias_namespace, alias = split_namespace(alias)
+    namespace = alias_namespace or namespace
     if alias:
         alias = validate_alias(alias)
 
-    data = crud.load_data(CONFIG)
-    alias_id = crud.create_entry(CONFIG, data, path, alias)
+    # Temporary entries expire after ttl (e.g. "2h"), "0" saves permanently
+    ttl = ttl if ttl is not None else CONFIG.get("default_ttl")
+    seconds = parse_duration(str(ttl)) if ttl is not None else None
+    tags = parse_tags(tags) if tags else []
+    untags = parse_tags(untags) if untags else []
+
+    # Saving a directory again updates its entry instead of adding a duplicate
+    store = api.Store(CONFIG, namespace)
+    alias_id, status = store.add(path, alias, seconds)
+    until = format_expiry(store[alias_id])
+    if tags or untags:
+        entry_tags = crud.update_tags(store.config, alias_id, add=tags, remove=untags).tags_of(alias_id)
+        until += f" [{', '.join(entry_tags)}]" if entry_tags else " [no tags]"
+    if status == "renamed":
+        message = f"Renamed TWD for {path} to '{alias}'{until}"
+    elif status == "renewed":
+        message = f"TWD for {path} now kept{until or ' permanently'}"
+    elif status == "unchanged":
+        message = f"TWD for {path} already saved with alias '{store[alias_id]['alias']}'{until}"
+    else:
+        message = f"Saved TWD to {path} with alias '{alias or alias_id}'{until}"
 
-    output_handler(
-        f"Saved TWD to {path} with alias '{alias or alias_id}'",
-        path,
-        output,
-        simple_output,
+    output_handler(message, path, output, simple_output)
+
+
+def record_jump(path):
+    """Append a jump to the history ring buffer for `twd -`."""
+    with stats.timer("history"):
+        recent = history.open_history(CONFIG)
+        if recent is None:
+            return
+        try:
+            with recent:
+                recent.append(path)
+        except OSError as e:
+            error_log.error(f"Error recording history: {e}")
+
+
+def jump_back(steps=1, output=True, simple_output=False):
+    """Go to the directory visited `steps` jumps ago, skipping the current one."""
+    recent = history.open_history(CONFIG)
+    if recent is None:
+        output_handler("History is disabled", None, output, simple_output)
+        return 1
+    with recent:
+        entries = recent.recent(steps, exclude={os.path.realpath(os.getcwd())})
+    if len(entries) < steps:
+        output_handler(f"No directory {steps} jumps back", None, output, simple_output)
+        return 1
+    TWD = entries[steps - 1][0]
+    if not os.path.exists(TWD):
+        error_log.error(f"Directory does not exist: {TWD}")
+        output_handler(f"Directory does not exist: {TWD}", None, output, simple_output)
+        return 1
+    record_jump(TWD)
+    output_handler(f"cd {TWD}", TWD, output, simple_output, message_type=1)
+    return 0
+
+
+def discover_directories(roots, max_depth=None, ignore=None, output=True, simple_output=False, namespace=None):
+    store_config = crud.namespace_config(CONFIG, namespace)
+    found, added = discover.discover(
+        store_config, roots, max_depth, discover.DEFAULT_IGNORE + (ignore or [])
     )
+    output_handler(f"Found {found} projects, saved {len(added)} new TWDs", None, output, simple_output)
+    for _, alias, path in added:
+        output_handler(f"{alias}  {path}", None, output, simple_output)
+
 
+def batch_commands(source, commit_every=0, namespace=None, out=None):
+    """Run newline-delimited commands from source ("-" for stdin) against one loaded store."""
+    out = out or sys.stdout
+    try:
+        if source == "-":
+            failed = batch.run_batch(CONFIG, sys.stdin, out, namespace, commit_every)
+        else:
+            with open(os.path.expanduser(source), "r") as f:
+                failed = batch.run_batch(CONFIG, f, out, namespace, commit_every)
+    except OSError as e:
+        error_log.error(f"Error reading batch file {source}: {e}")
+        print(f"Error reading batch file {source}: {e}")
+        return 1
+    return 1 if failed else 0
 
-def load_directory():
-    data = crud.load_data(CONFIG)
+
+def dedupe_directory(output=True, simple_output=False, namespace=None):
+    store_config = crud.namespace_config(CONFIG, namespace)
+    removed = crud.dedupe_entries(store_config, crud.load_data(store_config))
+    output_handler(f"Removed {removed} duplicate TWDs", None, output, simple_output)
+
+
+def load_directory(namespace=None):
+    data = api.Store(CONFIG, namespace).data
     return data if data else None
 
 
-def show_main(alias=None, output=True, simple_output=False):
-    dirs = load_directory()
+def show_main(alias=None, output=True, simple_output=False, namespace=None):
+    alias_namespace, alias = split_namespace(alias)
+    namespace = alias_namespace or namespace
+    store = api.Store(CONFIG, namespace)
+    dirs = store.data or None
+    if dirs is None and not alias and len(crud.load_manifest(CONFIG)) > 1:
+        dirs = {}  # Other namespaces can still be browsed in the screen
     if dirs is None:
         output_handler("No TWD found", None, output, simple_output)
         return 1
     else:
         if alias:
-            matched_dirs = []
-
-            for entry_id, entry in dirs.items():
-                if (
-                    "alias" in entry
-                    and entry["alias"]
-                    and entry["alias"].startswith(alias)
-                ):
-                    entry["id"] = entry_id
-                    matched_dirs.append(entry)
-                elif entry_id.startswith(alias):
-                    entry["id"] = entry_id
-                    matched_dirs.append(entry)
+            with stats.timer("match"):
+                matched_ids = store.matches(alias)
+                matched_dirs = [dirs[entry_id] for entry_id in matched_ids]
 
             if len(matched_dirs) == 1:
                 TWD = matched_dirs[0]["path"]
                 if os.path.exists(TWD):
+                    record_jump(TWD)
                     output_handler(
                         f"cd {TWD}", TWD, output, simple_output, message_type=1
                     )
@@ -296,9 +383,10 @@ def show_main(alias=None, output=True, simple_output=False):
                 output_handler(
                     f"Multiple TWDs match for '{alias}':", None, output, simple_output
                 )
-                for match in matched_dirs:
+                for entry_id in matched_ids:
+                    match = dirs[entry_id]
                     output_handler(
-                        f"{match['alias']}  {match['id']}  {match['path']}",
+                        f"{match['alias']}  {store.short_id(entry_id)}  {match['path']}",
                         None,
                         output,
                         simple_output,
@@ -310,13 +398,17 @@ def show_main(alias=None, output=True, simple_output=False):
 
         # Pass save_config function to display_select.
         # This function will be called by screen.py when column toggles occur.
-        selected_dir = display_select(CONFIG, dirs, save_config_func=save_config)
+        with stats.timer("screen"):
+            selected_dir = display_select(
+                CONFIG, dirs, save_config_func=save_config, namespace=namespace
+            )
         if selected_dir is None:
             output_handler("No TWD selected", None, output, simple_output)
             return 0
         else:
             TWD = selected_dir["path"]
             if os.path.exists(TWD):
+                record_jump(TWD)
                 output_handler(f"cd {TWD}", TWD, output, simple_output, message_type=1)
                 return 0
             else:
@@ -327,35 +419,148 @@ def show_main(alias=None, output=True, simple_output=False):
                 return 1
 
 
-def show_directory(output=True, simple_output=False):
-    dirs = load_directory()
-    if not dirs:
+def parse_sort(sort):
+    """Split a --sort value like "-created" into (criteria, descending)."""
+    if not sort:
+        return None, False
+    descending = sort.startswith("-")
+    criteria = sort.lstrip("-")
+    if criteria not in crud.SORT_KEYS:
+        raise ValueError(
+            f"Invalid sort: '{sort}'. Use one of {', '.join(crud.SORT_KEYS)}, optionally prefixed with '-'."
+        )
+    return criteria, descending
+
+
+def show_directory(
+    output=True, simple_output=False, sort=None, limit=None, query=None, namespace=None
+):
+    store = api.Store(CONFIG, namespace)
+    if not store:
         output_handler("No TWD set", None, output, simple_output)
         return
 
-    if not dirs:
-        max_alias_len = 0
-        max_id_len = 0
-        max_path_len = 0
-    else:
-        max_alias_len = max(len(entry["alias"]) for entry in dirs.values()) if dirs else 0
-        max_id_len = max(len(alias_id) for alias_id in dirs.keys()) if dirs else 0
-        max_path_len = max(len(entry["path"]) for entry in dirs.values()) if dirs else 0
+    criteria, descending = parse_sort(sort)
+    entries = store.search(query, criteria, descending, limit)
+    short_ids = {alias_id: store.short_id(alias_id) for alias_id, _ in entries}
+    entry_tags = store.tags.by_entry()
 
+    max_alias_len = max(len(entry["alias"]) for _, entry in entries) if entries else 0
+    max_id_len = max(max(len(short_id) for short_id in short_ids.values()), 2) if entries else 0
+    max_path_len = max(len(entry["path"]) for _, entry in entries) if entries else 0
 
     header = f"{'Alias'.ljust(max_alias_len)}  {'ID'.ljust(max_id_len)}  {'Path'.ljust(max_path_len)}  Created At"
+    if entry_tags:
+        header += "           Tags"
     print(header)
     print("-" * len(header))
 
-    for alias_id, entry in dirs.items():
+    for alias_id, entry in entries:
         alias = entry["alias"].ljust(max_alias_len)
         path = entry["path"].ljust(max_path_len)
         created_at = time.strftime(
             "%Y-%m-%d %H:%M:%S", time.localtime(entry["created_at"])
         )
-        alias_id_str = alias_id.ljust(max_id_len)
+        alias_id_str = short_ids[alias_id].ljust(max_id_len)
+        tags = f"  {','.join(entry_tags[alias_id])}" if alias_id in entry_tags else ""
         output_handler(
-            f"{alias}  {alias_id_str}  {path}  {created_at}",
+            f"{alias}  {alias_id_str}  {path}  {created_at}{tags}",
+            None,
+            output,
+            simple_output,
+        )
+
+
+def non_negative_int(value):
+    """argparse type for counts like --limit."""
+    try:
+        number = int(value)
+    except ValueError:
+        number = -1
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"invalid count: '{value}' (use 0 or a positive number)")
+    return number
+
+
+def escape_field(value):
+    """Escape tabs, newlines and backslashes for TSV output."""
+    return (
+        value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    )
+
+
+def stream_directory(fmt, sort=None, limit=None, query=None, namespace=None, out=None):
+    """Stream entries in a machine-readable format without per-row logging.
+
+    Formats are "json" (one array), "ndjson" (one object per line), "tsv"
+    (id, alias, path, created_at per line) and "0" (the TSV fields with
+    records terminated by NUL instead of a newline).
+    """
+    out = out or sys.stdout
+    criteria, descending = parse_sort(sort)
+    store = api.Store(CONFIG, namespace)
+    entries = store.search(query, criteria, descending, limit)
+    entry_tags = store.tags.by_entry() if fmt in ("json", "ndjson") else {}
+
+    try:
+        if fmt in ("json", "ndjson"):
+            separator = ",\n" if fmt == "json" else "\n"
+            if fmt == "json":
+                out.write("[\n")
+            first = True
+            for alias_id, entry in entries:
+                if not first:
+                    out.write(separator)
+                first = False
+                out.write(json.dumps({
+                    "id": alias_id,
+                    "alias": entry["alias"],
+                    "path": entry["path"],
+                    "created_at": entry["created_at"],
+                    "tags": entry_tags.get(alias_id, []),
+                }))
+            if fmt == "json":
+                out.write("\n]\n")
+            elif not first:
+                out.write("\n")
+        else:
+            terminator = "\0" if fmt == "0" else "\n"
+            for alias_id, entry in entries:
+                out.write(
+                    f"{alias_id}\t{escape_field(entry['alias'])}\t{escape_field(entry['path'])}\t{entry['created_at']}{terminator}"
+                )
+        out.flush()
+    except BrokenPipeError:
+        if out is not sys.stdout:
+            raise
+        # The reader (e.g. head) went away, silence the flush at exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+    log.info(f"Listed entries as {fmt}")
+
+
+def show_tags(output=True, simple_output=False, namespace=None):
+    """List the tags of a namespace with the number of entries that have each."""
+    store = api.Store(CONFIG, namespace)
+    counts = {tag: len(store.tagged([tag])) for tag in store.tags.counts()}
+    if not counts:
+        output_handler("No tags set", None, output, simple_output)
+        return
+    max_tag_len = max(len(tag) for tag in counts)
+    for tag, count in counts.items():
+        output_handler(f"{tag.ljust(max_tag_len)}  {str(count).rjust(6)} entries", None, output, simple_output)
+
+
+def show_namespaces(output=True, simple_output=False):
+    """List namespaces from the manifest, opening only shards it has no entry count for."""
+    manifest = crud.load_manifest(CONFIG)
+    max_name_len = max(len(name) for name in manifest)
+    for name, info in sorted(manifest.items()):
+        entries = info["entries"]
+        if entries is None:
+            entries = len(crud.load_data(crud.namespace_config(CONFIG, name))) if os.path.exists(info["file"]) else "?"
+        output_handler(
+            f"{name.ljust(max_name_len)}  {str(entries).rjust(6)} entries  {info['file']}",
             None,
             output,
             simple_output,
@@ -381,6 +586,33 @@ This feature is to prevent accidental execution.""",
     output_handler("TWD File deleted and TWD unset", None, output, simple_output)
 
 
+def sync_directory(sync_dir, output=True, simple_output=False, namespace=None):
+    store_config = crud.namespace_config(CONFIG, namespace)
+    try:
+        result = sync.sync(store_config, os.path.expanduser(sync_dir))
+    except (OSError, ValueError) as e:
+        error_log.error(f"Error syncing with {sync_dir}: {e}")
+        output_handler(f"Error syncing with {sync_dir}: {e}", None, output, simple_output)
+        return 1
+    output_handler(
+        f"Synced with {sync_dir}: sent {result['sent']}, received {result['received']}, "
+        f"applied {result['applied']}",
+        None,
+        output,
+        simple_output,
+    )
+    state = sync.load_state(store_config)
+    for entry_id in result["conflicts"]:
+        clock, host = state["versions"][entry_id]
+        output_handler(
+            f"Conflict on {entry_id}: kept the change from {host} (clock {clock})",
+            None,
+            output,
+            simple_output,
+        )
+    return 0
+
+
 def setup(alias):
     bashrc_path = os.path.expanduser("~/.bashrc")
     alias = "twd" if not alias else alias
@@ -392,6 +624,35 @@ def setup(alias):
     print(f"source {bashrc_path}")
 
 
+def completion_script(shell, name):
+    """Return a completion function for shell that reads the alias cache directly."""
+    cache_file = crud.get_index_file(CONFIG, "completion")
+    if shell == "bash":
+        return rf"""_{name}_complete() {{
+            local cur="${{COMP_WORDS[COMP_CWORD]}}" word;
+            COMPREPLY=();
+            [ -r "{cache_file}" ] || return 0;
+            while IFS= read -r word || [ -n "$word" ]; do
+                case "$word" in "$cur"*) COMPREPLY+=("$word");; esac;
+            done < "{cache_file}";
+        }};
+        complete -F _{name}_complete {name};"""
+    elif shell == "zsh":
+        return rf"""_{name}_complete() {{
+            local -a words;
+            [[ -r "{cache_file}" ]] && words=("${{(@f)$(<"{cache_file}")}}");
+            compadd -a words;
+        }};
+        (( $+functions[compdef] )) && compdef _{name}_complete {name};"""
+    elif shell == "fish":
+        return rf"""function __{name}_complete
+            test -r "{cache_file}"; or return;
+            while read -l word; echo $word; end < "{cache_file}";
+        end
+        complete -c {name} -f -a '(__{name}_complete)'"""
+    raise ValueError(f"Unsupported shell: {shell}")
+
+
 def get_package_version():
     try:
         return version("twd_m4sc0")
@@ -399,7 +660,7 @@ def get_package_version():
         error_log.error(f"Package version not found: {e}")
         return "Unknown version"
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(
         description="Temporarily save and navigate to working directories."
     )
@@ -408,7 +669,9 @@ def main():
         "--setup", nargs="?", const="twd", help="Automatic setup in the .bashrc file"
     )
 
-    parser.add_argument("directory", nargs="?", help="Directory to save")
+    parser.add_argument(
+        "directory", nargs="?", help="Directory to save, or - / -N to go back N jumps"
+    )
     parser.add_argument(
         "alias", nargs="?", help="Alias for the saved directory (optional)"
     )
@@ -419,14 +682,44 @@ def main():
         help="Save the current or specified directory",
     )
     parser.add_argument("-d", "--dir", nargs="?", help="Directory to save")
+    parser.add_argument(
+        "--ttl",
+        metavar="DURATION",
+        help="Let the saved directory expire after DURATION (e.g. 30m, 2h, 7d), 0 keeps it permanently",
+    )
+    parser.add_argument(
+        "--tag",
+        metavar="TAGS",
+        help="Comma-separated tags to add with -s, otherwise list entries that have all of them",
+    )
+    parser.add_argument("--untag", metavar="TAGS", help="Comma-separated tags to remove with -s")
+    parser.add_argument("--tags", action="store_true", help="List tags and their entry counts")
     parser.add_argument("-a", "--ali", nargs="?", help="Alias for the saved directory")
     parser.add_argument(
         "-g", "--go", nargs="?", const=" ", help="Go to the saved directory"
     )
     parser.add_argument("-l", "--list", action="store_true", help="Show saved TWD")
+    parser.add_argument(
+        "--format",
+        choices=["json", "ndjson", "tsv", "0"],
+        help="Stream --list in a machine-readable format",
+    )
+    parser.add_argument(
+        "--sort",
+        help="Sort --list by alias, id, path or created, use e.g. --sort=-created for descending",
+    )
+    parser.add_argument("--limit", type=non_negative_int, help="Only list the first LIMIT entries")
+    parser.add_argument(
+        "-q",
+        "--query",
+        help="List entries matching filters like 'under:/srv after:2024-01-01 alias:web* exists:yes'",
+    )
     parser.add_argument(
         "-u", "--unset", action="store_true", help="Unset the saved TWD"
     )
+    parser.add_argument(
+        "--sync", metavar="DIR", help="Exchange changes with a directory shared between hosts"
+    )
     parser.add_argument(
         "-v",
         "--version",
@@ -434,9 +727,60 @@ def main():
         version=f"TWD Version: v{get_package_version()}",
     )
     parser.add_argument("-f", "--force", action="store_true", help="Force an action")
+    parser.add_argument(
+        "--ns", metavar="NAMESPACE", help="Namespace to save to, list or browse (default: default)"
+    )
+    parser.add_argument(
+        "--namespaces", action="store_true", help="List namespaces and their entry counts"
+    )
+    parser.add_argument(
+        "--discover",
+        nargs="+",
+        metavar="ROOT",
+        help="Find project roots (git repos, pyproject.toml, package.json, ...) below ROOT and save them",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=5, help="How deep --discover descends below each ROOT (default: 5)"
+    )
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        metavar="GLOB",
+        help="Directory name or path glob --discover skips, can be repeated",
+    )
+    parser.add_argument(
+        "--dedupe", action="store_true", help="Merge entries that point to the same directory"
+    )
+    parser.add_argument(
+        "--here",
+        action="store_true",
+        help="Print the alias of the deepest saved directory containing the current one, for prompts",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="Run save/delete/rename/go/list commands, one per line, from FILE or stdin and print NDJSON results",
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=non_negative_int,
+        default=0,
+        metavar="N",
+        help="Save --batch changes once N distinct entries changed instead of once at the end",
+    )
     parser.add_argument(
         "--shell", nargs="?", const="twd", help="Output shell function for integration"
     )
+    parser.add_argument(
+        "--completion",
+        choices=["bash", "zsh", "fish"],
+        help="Output a completion function for the given shell (optionally followed by the command name)",
+    )
+    parser.add_argument(
+        "--complete", metavar="PREFIX", help="Print aliases and IDs starting with PREFIX"
+    )
     parser.add_argument(
         "--simple-output", action="store_true", help="Only print essential output"
     )
@@ -446,29 +790,49 @@ def main():
         help="Prevents the console from sending output",
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="table",
+        choices=["table", "json"],
+        help="Print how long each phase of the command took (to stderr)",
+    )
+    return parser
+
+
+def run(args):
     output = not args.no_output
     simple_output = args.simple_output
 
     if args.shell:
-        # Get the actual temporary directory path from Python's tempfile module
-        actual_temp_dir = tempfile.gettempdir()
-        twd_path_file = os.path.join(actual_temp_dir, "twd_path")
-        twd_clear_file = os.path.join(actual_temp_dir, "twd_clear")
-
+        # The target path comes back on a private pipe (fd 3) while stdout
+        # stays on the terminal (fd 4), so no files or extra processes are
+        # involved. Every statement ends with ';' because `--setup` evals
+        # this unquoted, which joins all lines into one.
         print(rf"""function {args.shell}() {{
-            python3 -m twd "$@";
-            if [ -f {twd_path_file} ]; then
-                cd "$(cat {twd_path_file})";
-                /bin/rm -f {twd_path_file};
-            fi;
-            if [ -f {twd_clear_file} ]; then
-                clear;
-                /bin/rm -f {twd_clear_file};
+            local twd_out twd_status twd_path;
+            {{ twd_out=$(TWD_FD=3 python3 -m twd "$@" 3>&1 1>&4 4>&-); twd_status=$?; }} 4>&1;
+            if [ -n "$twd_out" ]; then
+                twd_path=${{twd_out%$'\n'clear}};
+                cd "$twd_path";
+                if [ "$twd_path" != "$twd_out" ]; then
+                    clear;
+                fi;
             fi;
+            return $twd_status;
         }}""")
         return 0
 
+    if args.completion:
+        print(completion_script(args.completion, args.directory or "twd"))
+        return 0
+
+    if args.complete is not None:
+        expiry.sweep(CONFIG)
+        for word in crud.complete(CONFIG, args.complete):
+            print(word)
+        return 0
+
     if args.setup:
         setup(args.setup)
         return 0
@@ -476,27 +840,99 @@ def main():
     directory = args.directory or args.dir
     alias = args.alias or args.ali
 
+    namespace = args.ns
+    try:
+        if namespace:
+            validate_alias(namespace)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    # Drop expired entries before anything reads the store
+    with stats.timer("expiry"):
+        expiry.sweep(crud.namespace_config(CONFIG, namespace))
+
     # Handle each case explicitly
     if args.save:
-        save_directory(directory, alias, output, simple_output)
+        try:
+            save_directory(directory, alias, output, simple_output, namespace, args.ttl, args.tag, args.untag)
+        except ValueError as e:
+            print(e)
+            return 1
         return 0
     elif args.go is not None:
         # Handle -g/--go flag
         go_alias = args.go.strip() if args.go.strip() else None
-        return show_main(go_alias, output, simple_output)
-    elif args.list:
-        show_directory(output, simple_output)
+        return show_main(go_alias, output, simple_output, namespace)
+    elif args.namespaces:
+        show_namespaces(output, simple_output)
+        return 0
+    elif args.tags:
+        show_tags(output, simple_output, namespace)
+        return 0
+    elif args.discover:
+        discover_directories(args.discover, args.depth, args.ignore, output, simple_output, namespace)
+        return 0
+    elif args.dedupe:
+        dedupe_directory(output, simple_output, namespace)
         return 0
+    elif args.here:
+        alias = here.here(crud.namespace_config(CONFIG, namespace))
+        if alias is None:
+            return 1
+        print(alias)
+        return 0
+    elif args.batch:
+        return batch_commands(args.batch, args.commit_every, namespace)
+    elif args.list or args.query is not None or args.tag:
+        try:
+            # --tag a,b lists the same as --query "tag:a tag:b"
+            query = " ".join([f"tag:{tag}" for tag in parse_tags(args.tag or "")] + [args.query or ""]).strip()
+            if args.format:
+                stream_directory(args.format, args.sort, args.limit, query, namespace)
+            else:
+                show_directory(output, simple_output, args.sort, args.limit, query, namespace)
+        except ValueError as e:
+            error_log.error(str(e))
+            print(e)
+            return 1
+        return 0
+    elif args.sync:
+        return sync_directory(args.sync, output, simple_output, namespace)
     elif args.unset:
         unset_directory(output, simple_output, args.force)
         return 0
+    elif directory and re.match(r"^-([1-9]\d*)?$", directory):
+        # `twd -` goes back one jump like `cd -`, `twd -N` goes back N jumps
+        return jump_back(int(directory[1:] or 1), output, simple_output)
     elif directory and not args.save:
         # If directory is provided without -s flag, treat as alias for navigation
-        return show_main(directory, output, simple_output)
+        return show_main(directory, output, simple_output, namespace)
     else:
         # No arguments provided, show the main TUI
-        return show_main(None, output, simple_output)
+        return show_main(None, output, simple_output, namespace)
+
+
+def main():
+    # TWD_PROFILE=path dumps a cProfile of the whole invocation
+    stats.start_profile()
+    try:
+        with stats.timer("parse_args"):
+            parser = build_parser()
+            args = parser.parse_args()
+            listing = not args.save and (args.list or args.query is not None or args.tag)
+            if args.format and not listing:
+                parser.error("--format only applies to listing, use it with -l, --query or --tag")
+        with stats.timer("command"):
+            code = run(args)
+    finally:
+        stats.stop_profile()
+    if args.stats:
+        stats.report(args.stats)
+    if CONFIG.get("log_timings"):
+        log.info(f"timing {json.dumps(stats.as_dict())}")
+    return code
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,208 @@
+import os
+import sys
+import time
+import struct
+import ctypes
+import ctypes.util
+import logging
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+# From <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+DATA_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+DIR_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+
+
+def empty_changes():
+    return {"data": False, "missing": set(), "moved": {}}
+
+
+def repoint(data, moved):
+    """Return {entry ID: entry} for entries below a moved directory, with new paths."""
+    updates = {}
+    for entry_id, entry in data.items():
+        path = entry["path"]
+        for old, new in moved.items():
+            if path == old or path.startswith(old + os.sep):
+                updates[entry_id] = dict(entry, path=new + path[len(old):])
+                break
+    return updates
+
+
+class PollingWatcher:
+    """Detect changes by comparing stat results, at most once per interval.
+
+    Used where inotify is not available. Renamed directories cannot be told
+    apart from deleted ones, so both are reported as missing.
+    """
+
+    def __init__(self, data_file, paths, interval=1.0):
+        self.interval = interval
+        self.reset(data_file, paths)
+
+    def reset(self, data_file, paths):
+        self.data_file = os.path.abspath(data_file)
+        self.paths = set(paths)
+        self._data_stat = self._stat(self.data_file)
+        self._missing = {path for path in self.paths if not os.path.isdir(path)}
+        self._last_check = time.monotonic()
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def poll(self, now=None):
+        """Return the changes since the last report, or None if there are none."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_check < self.interval:
+            return None
+        self._last_check = now
+        changes = empty_changes()
+        data_stat = self._stat(self.data_file)
+        if data_stat != self._data_stat:
+            self._data_stat = data_stat
+            changes["data"] = True
+        missing = {path for path in self.paths if not os.path.isdir(path)}
+        changes["missing"] = missing - self._missing
+        self._missing = missing
+        return changes if changes["data"] or changes["missing"] else None
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Watch the data file and bookmarked directories with Linux inotify.
+
+    The data file is watched through its directory, so it is noticed however
+    it is rewritten. Bookmarked directories are watched through their parent
+    directories, where a rename shows up as a MOVED_FROM/MOVED_TO pair with
+    a shared cookie, which gives the new path. Events are collected until
+    none arrived for settle seconds and then reported together, so a burst
+    of writes causes a single reload.
+    """
+
+    def __init__(self, data_file, paths, settle=0.15):
+        self.settle = settle
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._watches = {}
+        self.reset(data_file, paths)
+
+    def reset(self, data_file, paths):
+        for wd in self._watches:
+            self._rm_watch(self.fd, wd)
+        self._watches = {}  # wd -> directory
+        self._names = {}  # directory -> bookmarked names in it
+        self.data_file = os.path.abspath(data_file)
+        self.paths = set(paths)
+        self._pending = empty_changes()
+        self._moves = {}  # cookie -> old path
+        self._last_event = None
+
+        data_dir, data_name = os.path.split(self.data_file)
+        self._data_name = data_name
+        for path in self.paths:
+            parent, name = os.path.split(path.rstrip(os.sep))
+            if name:
+                self._names.setdefault(parent, set()).add(name)
+        masks = {parent: DIR_MASK | IN_ONLYDIR for parent in self._names}
+        masks[data_dir] = masks.get(data_dir, 0) | DATA_MASK
+        for directory, mask in masks.items():
+            wd = self._add_watch(self.fd, os.fsencode(directory), mask)
+            if wd >= 0:
+                self._watches[wd] = directory
+
+    def _read(self):
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            self._handle(self._watches.get(wd), mask, cookie, name)
+        return True
+
+    def _handle(self, directory, mask, cookie, name):
+        if mask & IN_Q_OVERFLOW:
+            # Events were dropped, reload and check every bookmark
+            self._pending["data"] = True
+            self._pending["missing"].update(path for path in self.paths if not os.path.isdir(path))
+            self._last_event = time.monotonic()
+            return
+        if directory is None:
+            return
+        if name == self._data_name and mask & DATA_MASK and os.path.join(directory, name) == self.data_file:
+            self._pending["data"] = True
+        elif mask & IN_MOVED_TO and cookie in self._moves:
+            self._pending["moved"][self._moves.pop(cookie)] = os.path.join(directory, name)
+        elif mask & IN_ISDIR and name in self._names.get(directory, ()):
+            path = os.path.join(directory, name)
+            if mask & IN_MOVED_FROM:
+                self._moves[cookie] = path
+            elif mask & IN_DELETE:
+                self._pending["missing"].add(path)
+            else:
+                return
+        else:
+            return
+        self._last_event = time.monotonic()
+
+    def poll(self, now=None):
+        """Return the coalesced changes once events stopped arriving, else None."""
+        while self._read():
+            pass
+        if self._last_event is None:
+            return None
+        now = time.monotonic() if now is None else now
+        if now - self._last_event < self.settle:
+            return None
+        # A move out of the watched directories has no MOVED_TO
+        self._pending["missing"].update(self._moves.values())
+        changes = self._pending
+        self._pending = empty_changes()
+        self._moves = {}
+        self._last_event = None
+        return changes
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def create_watcher(data_file, paths, interval=1.0):
+    """Return an inotify watcher on Linux, or a polling watcher elsewhere."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(data_file, paths)
+        except (OSError, AttributeError) as e:
+            error_log.error(f"inotify not available, polling for changes: {e}")
+    return PollingWatcher(data_file, paths, interval)
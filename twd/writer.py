@@ -0,0 +1,139 @@
+import os
+import time
+import threading
+import logging
+
+from . import crud
+
+log = logging.getLogger("log")
+error_log = logging.getLogger("error")
+
+
+def file_stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+class WriteBehind:
+    """Save changes made in the TWD screen on a background thread.
+
+    The screen changes its loaded entries right away and queues the same
+    change here. Changes queued while a save is running are coalesced per
+    entry (the latest one wins) and written together with one load and one
+    save per store, so the screen never waits on a slow disk. A failed save
+    keeps its changes queued and is retried after retry_delay seconds.
+    flush() waits until everything queued is on disk; close() gives up on
+    the first failed save instead, so exiting never hangs on a broken disk.
+    wrote() tells a watcher event caused by its own save from another
+    process writing.
+    """
+
+    def __init__(self, retry_delay=1.0):
+        self.retry_delay = retry_delay
+        self._cond = threading.Condition()
+        self._queued = {}  # data file -> (store config, {entry ID: entry or None})
+        self._writing = False
+        self._failed = False
+        self._saved = 0
+        self._stamps = {}  # data file -> (mtime_ns, size) right after our last save
+        self._closing = False
+        self._stopped = False
+        self._thread = None
+
+    def put(self, config, entries):
+        """Queue replacing entries ({entry ID: entry})."""
+        self._queue(config, entries)
+
+    def delete(self, config, entry_ids):
+        """Queue deleting entries."""
+        self._queue(config, dict.fromkeys(entry_ids))
+
+    def _queue(self, config, changes):
+        with self._cond:
+            _, queued = self._queued.setdefault(crud.get_data_file(config), (config, {}))
+            queued.update(changes)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self):
+        """Return True while queued changes are not on disk yet."""
+        with self._cond:
+            return bool(self._queued) or self._writing
+
+    def status(self):
+        """Return "saving", "failed", "saved" or None if nothing was queued yet."""
+        with self._cond:
+            if self._failed:
+                return "failed"
+            if self._queued or self._writing:
+                return "saving"
+            return "saved" if self._saved else None
+
+    def wrote(self, data_file):
+        """Return True if data_file is still exactly as our last save left it."""
+        with self._cond:
+            stamp = self._stamps.get(data_file)
+        return stamp is not None and stamp == file_stamp(data_file)
+
+    def flush(self, timeout=None):
+        """Wait until queued changes are saved; return False if they are not."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self._queued or self._writing) and not self._stopped:
+                if self._closing and self._failed and not self._writing:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return not (self._queued or self._writing)
+
+    def close(self, timeout=None):
+        """Flush and stop the writer thread; return False if changes were left unsaved."""
+        with self._cond:
+            self._closing = True
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if not flushed:
+            error_log.error(f"Exiting with unsaved changes to {', '.join(self._queued)}")
+        return flushed
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queued and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                batch, self._queued = self._queued, {}
+                self._writing = True
+            failed = {}
+            for data_file, (config, changes) in batch.items():
+                try:
+                    saved = crud.write_changes(config, crud.load_data(config), changes)
+                except Exception as e:
+                    error_log.error(f"Error saving changes to {data_file}: {e}")
+                    saved = False
+                if not saved:
+                    failed[data_file] = (config, changes)
+                else:
+                    with self._cond:
+                        self._stamps[data_file] = file_stamp(data_file)
+            with self._cond:
+                for data_file, (config, changes) in failed.items():
+                    # Changes queued since then are newer and win
+                    _, queued = self._queued.get(data_file, (config, {}))
+                    self._queued[data_file] = (config, dict(changes, **queued))
+                self._writing = False
+                self._failed = bool(failed)
+                self._saved += len(batch) - len(failed)
+                self._cond.notify_all()
+                if failed:
+                    self._cond.wait(self.retry_delay)